@@ -5,10 +5,16 @@ from typing import Literal
 
 import numpy as np
 import pandas as pd
+import plotly.io as pio
 from matplotlib import pyplot as plt
 
 import h2pp
 from h2pp.optimizer import optimize_h2pp
+from h2pp.sweep import apply_overrides, evaluate_configs, sweep
+
+# Disable MathJax for Kaleido so that we will not get the "loading MathJax..." message on our PDF exports
+# (h2pp.tco setzt dies erst beim ersten Plot, die Plots der Simulationsergebnisse werden aber ggfs. vorher exportiert)
+pio.kaleido.scope.mathjax = None
 
 
 def increase_mean_and_variance_in_netztransparenz_power_price_file(strompreis_file_path, streckungsfaktor,
@@ -258,19 +264,17 @@ def calc_and_plot_sensitivity(the_parsed_config_json, original_folder_path, x_va
 def plot_sensitivity_multipe_scenarios(the_scenario_config_dicts, original_folder_path, scenario_labels, x_values, key_path_x,
                                        plot_title, plot_x_label,
                                        exp_name, file_name_prefix,
-                                       hide_grid=False):
+                                       hide_grid=False, max_workers=None):
     """
         Plot in the same figure one graph for each scenario, where the property (x_values) in key_path is altered
         Quite similar to calc_and_plot_pair_sensitivity
     """
-    all_graphs = []
-    for config_dict in the_scenario_config_dicts:
-
-        c_dict = copy.deepcopy(config_dict)
-
-        tcos = calc_tco_sensitivity(c_dict, original_folder_path, x_values, key_path_x)
-        list_of_tco_npvs = [tco.npv_total / 1e6 for tco in tcos]
-        all_graphs.append(list_of_tco_npvs)
+    # Alle Punkte aller Szenarien in einem Prozesspool auswerten (siehe h2pp.sweep)
+    configs = [apply_overrides(config_dict, {tuple(key_path_x): x}) for config_dict in the_scenario_config_dicts
+               for x in x_values]
+    npvs = [result["npv_total"] / 1e6 for result in
+            evaluate_configs(configs, _config_file_path_in(original_folder_path), max_workers=max_workers)]
+    all_graphs = [npvs[i * len(x_values):(i + 1) * len(x_values)] for i in range(len(the_scenario_config_dicts))]
 
     # Now plot in matplotlib the x_values against the list_of_tco_npvs
     # Plotting
@@ -295,7 +299,7 @@ def plot_sensitivity_multipe_scenarios(the_scenario_config_dicts, original_folde
     plt.title(plot_title)  # Title will only be on the displayed plot, not in the saved PDF one.
     plt.show()
 def calc_and_plot_pair_sensitivity(the_parsed_config_json, original_folder_path, x_values, z_values, key_path_x, key_path_z, plot_title, plot_x_label, plot_z_label,
-                                   exp_name, file_name_prefix):
+                                   exp_name, file_name_prefix, max_workers=None):
     """
     Function to calculate and plot a sensitivity analysis for two parameters.
     x_values contains the values for the x-axis, for modifying the first parameter.
@@ -315,15 +319,9 @@ def calc_and_plot_pair_sensitivity(the_parsed_config_json, original_folder_path,
     @return:
     """
 
-    all_graphs = []
-    for z_value in z_values:
-        copied_json = copy.deepcopy(the_parsed_config_json)  # Copy the dictionary to avoid changing the original
-        set_nested_value(copied_json, key_path_z, z_value)
-
-        tcos = calc_tco_sensitivity(copied_json, original_folder_path, x_values, key_path_x)
-        list_of_tco_npvs = [tco.npv_total / 1e6 for tco in tcos]
-        all_graphs.append(list_of_tco_npvs)
-
+    results = sweep(the_parsed_config_json, _config_file_path_in(original_folder_path),
+                    axes={tuple(key_path_z): z_values, tuple(key_path_x): x_values}, max_workers=max_workers)
+    all_graphs = [list(npvs / 1e6) for npvs in results["npv_total"].to_numpy().reshape(len(z_values), len(x_values))]
 
     # Now plot in matplotlib the x_values against the list_of_tco_npvs
     # Plotting
@@ -348,31 +346,22 @@ def calc_and_plot_pair_sensitivity(the_parsed_config_json, original_folder_path,
     plt.show()
 
 
-def calc_tco_sensitivity(the_parsed_config_json, file_path, x_values, key_path, optimizer_mode: Literal["normal", "battery_ref", "power_grid_only_ref"]="normal"):
+def calc_tco_sensitivity(the_parsed_config_json, file_path, x_values, key_path, optimizer_mode: Literal["normal", "battery_ref", "power_grid_only_ref"]="normal",
+                         max_workers=None):
 
     """
-    file path is the folder path where the original json was stored; so that the file links in the file will work
+    file path is the folder path where the original json was stored; so that the file links in the file will work.
+    The values are evaluated in memory and in parallel (see h2pp.sweep), no temporary files are written.
     """
-    list_of_tcos = []
-
-    for value in x_values:
-        # Setting a value dynamically using a list of keys
-
-        copied_json = copy.deepcopy(the_parsed_config_json)  # Copy the dictionary to avoid changing the original
-        set_nested_value(copied_json, key_path, value)
-
-        # write the altered file to a temporary file in the file_path:
-        output_file_path = os.path.join(file_path, "__tempA_sensitivity_analysis.json")
-        print(copied_json)
-        with open(output_file_path, "w") as user_file:  # may NOT exist or will be overwritten
-            json.dump(copied_json, user_file, indent=4)
-
-        tco_obj = h2pp.optimizer.optimize_h2pp(output_file_path, mode=optimizer_mode)[0]
+    results = sweep(the_parsed_config_json, _config_file_path_in(file_path), axes={tuple(key_path): x_values},
+                    mode=optimizer_mode, max_workers=max_workers)
 
-        print(value, tco_obj.npv_total)
+    for value, npv_total in zip(x_values, results["npv_total"]):
+        print(value, npv_total)
 
-        os.remove(output_file_path)
+    return list(results["tco"])
 
-        list_of_tcos.append(tco_obj)
 
-    return list_of_tcos
+def _config_file_path_in(folder_path):
+    # Für die relativen Pfadangaben in der Konfiguration wird nur der Ordner benötigt; die Datei muss nicht existieren.
+    return os.path.join(folder_path, "sensitivity_analysis.json")
@@ -11,7 +11,9 @@ import plotly.express as px
 from dash import Dash, html, dcc, DiskcacheManager, CeleryManager, Input, Output, State, callback, dash_table
 import plotly.graph_objects as go
 
-from h2pp.optimizer import optimize_h2pp
+# Läuft der dauerhafte Prozesspool als Dienst (python -m h2pp.worker_pool), werden die Optimierungen dort ausgeführt
+# (Module bereits importiert, Aufbereitung zwischengespeichert); sonst wie optimize_h2pp in diesem Prozess
+from h2pp.worker_pool import optimize_h2pp_via_service
 from h2pp.generators import Jahreszeit
 import datetime
 import base64
@@ -944,21 +946,21 @@ def update_result_plot(n_clicks, hide_electrolyzer_checkbox_value, eta_electroly
 
         # 1. H2Powerplant simulation and optimization
         # Start the optimization in a new thread
-        tco_h2pp, figs = optimize_h2pp(file_path, mode="normal", pop_size=pop_size, n_gen=n_gen)
+        tco_h2pp, figs = optimize_h2pp_via_service(file_path, mode="normal", pop_size=pop_size, n_gen=n_gen)
         the_fig_summer = figs[Jahreszeit.SOMMER.name]
         the_fig_transitional = figs[Jahreszeit.UEBERGANG.name]
         the_fig_winter = figs[Jahreszeit.WINTER.name]
         the_fig_tco_base = tco_h2pp.plot_stacked_bar_over_period()
 
         # 2. Battery Reference Case simulation
-        tco_batt, batt_result = optimize_h2pp(file_path, mode="battery_ref")
+        tco_batt, batt_result = optimize_h2pp_via_service(file_path, mode="battery_ref")
         the_batt_ref_fig_summer = batt_result[Jahreszeit.SOMMER.name]
         the_batt_ref_fig_transitional = batt_result[Jahreszeit.UEBERGANG.name]
         the_batt_ref_fig_winter = batt_result[Jahreszeit.WINTER.name]
         the_batt_ref_fig_tco = tco_batt.plot_stacked_bar_over_period()
 
         # 3. Status Quo Reference Case simulation
-        tco_sq, status_quo_result = optimize_h2pp(file_path, mode="power_grid_only_ref")
+        tco_sq, status_quo_result = optimize_h2pp_via_service(file_path, mode="power_grid_only_ref")
         the_status_quo_ref_fig_summer = status_quo_result[Jahreszeit.SOMMER.name]
         the_status_quo_ref_fig_transitional = status_quo_result[Jahreszeit.UEBERGANG.name]
         the_status_quo_ref_fig_winter = status_quo_result[Jahreszeit.WINTER.name]
@@ -0,0 +1,280 @@
+'''
+
+Batch-Läufe von Szenarien mit fortsetzbarer Ergebnisablage (SQLite).
+
+Aufruf: python -m h2pp.batch scenarios.json [--store ergebnisse.sqlite] [--max-workers N] [--dry-run] [--profile DIR]
+
+Die Szenariodatei (JSON) beschreibt die Läufe deklarativ, Pfade relativ zur Szenariodatei:
+
+{
+  "store": "ergebnisse.sqlite",                     (optional, Standard: Szenariodatei mit Endung .sqlite)
+  "max_workers": 8,                                 (optional, Standard: Anzahl der CPUs)
+  "pop_size": 50, "n_gen": 100,                     (optional, für mode "normal")
+  "scenarios": [
+    {
+      "name": "Basis",
+      "base_config": "Fallstudie EUREF Duesseldorf/generated_ts_config_euref_dus.json",
+      "overrides": {"nur_beschaffungskosten": true, "electrolyzer.fixed_p": 228},    (optional, siehe sweep.py)
+      "axes": {"aufschlag_strom_manuell_ct": [0, 5, 10]},                              (optional, Gitter)
+      "modes": ["normal", "battery_ref", "power_grid_only_ref"]                        (optional, Standard: ["normal"])
+    }
+  ]
+}
+
+Jeder Lauf (Szenario x Gitterpunkt x mode) wird über einen Hash seiner vollständigen Konfiguration, des Ordners der
+Konfigurationsdatei, der referenzierten Dateien (Pfad, Änderungszeit, Größe), des modes und der Parameter des genetischen
+Algorithmus identifiziert. Fertige Läufe werden sofort in die Ablage geschrieben (Tabelle
+results) und beim erneuten Start übersprungen, ein unterbrochener Batch setzt also dort fort, wo er aufgehört hat.
+Fehlgeschlagene Läufe werden mit Traceback in der Tabelle errors vermerkt und beim nächsten Start wiederholt. Gleiche
+Konfigurationen aus verschiedenen Ordnern sind damit verschiedene Läufe; wird eine referenzierte Datei (bspw. eine
+CSV-Zeitreihe) geändert, werden die betroffenen Läufe erneut gerechnet.
+
+load_results liest die Ablage als DataFrame (inkl. der EvaluationResult-Objekte, bspw. für die Plots der TCO).
+
+'''
+
+import argparse
+import datetime
+import hashlib
+import itertools
+import json
+import os
+import pickle
+import sqlite3
+import sys
+from typing import Dict, List
+
+import pandas as pd
+
+from h2pp import instrumentation
+from h2pp.optimizer import referenced_files
+from h2pp.sweep import MULTI_FIDELITY_COLUMNS, apply_overrides, column_name, iter_evaluations
+
+RESULT_COLUMNS = {
+    "scenario_hash": "TEXT PRIMARY KEY",
+    "name": "TEXT",
+    "mode": "TEXT",
+    "overrides": "TEXT",
+    "p_el": "REAL",
+    "p_fc": "REAL",
+    "m_tank": "REAL",
+    "compress_before_storing": "INTEGER",
+    "c_battery": "REAL",
+    "npv_total": "REAL",
+    "npv_capex": "REAL",
+    "npv_opex": "REAL",
+    "npv_breakdown": "TEXT",
+    "peak_power_year_kW": "REAL",
+    "total_consumption_year_kwh": "REAL",
+    "aufschlaege_strom_total_eur_per_kwh": "REAL",
+    "leistungspreis_summe": "REAL",
+    "finished_at": "TEXT",
+    "evaluation_result": "BLOB",
+}
+
+
+def scenario_hash(config: Dict, config_file_path: str, mode: str, pop_size: int, n_gen: int) -> str:
+    """
+    @param config_file_path: Pfad der JSON Datei der Konfiguration (relative Pfade in config beziehen sich auf ihren
+        Ordner)
+    @return: Hash eines Laufs (vollständige, nicht aufbereitete Konfiguration, Ordner der Konfigurationsdatei,
+        referenzierte Dateien mit Änderungszeit und Größe, mode und ggfs. Parameter des genetischen Algorithmus)
+    """
+    config_dir = os.path.dirname(os.path.abspath(config_file_path))
+    key = {"config": config, "config_dir": config_dir, "files": referenced_files(config, config_dir), "mode": mode,
+           "pop_size": pop_size if mode == "normal" else None, "n_gen": n_gen if mode == "normal" else None}
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def expand_scenarios(batch_config: Dict, batch_file_path: str) -> List[Dict]:
+    """
+    Erzeugt die Läufe einer Szenariodatei (siehe Modulbeschreibung).
+
+    @return: Liste von dicts (name, mode, overrides, config, config_file_path, scenario_hash), ohne doppelte Läufe
+    """
+    batch_dir = os.path.dirname(os.path.abspath(batch_file_path))
+    pop_size = batch_config.get("pop_size", 50)
+    n_gen = batch_config.get("n_gen", 100)
+
+    runs = {}
+    for scenario in batch_config["scenarios"]:
+        if "name" not in scenario or "base_config" not in scenario:
+            raise ValueError(f"Every scenario needs a 'name' and a 'base_config': {scenario}")
+
+        config_file_path = os.path.normpath(os.path.join(batch_dir, scenario["base_config"]))
+        with open(config_file_path) as user_file:
+            base_config = json.load(user_file)
+
+        axes = scenario.get("axes", {})
+        for values in itertools.product(*axes.values()):
+            overrides = {**scenario.get("overrides", {}), **dict(zip(axes.keys(), values))}
+            config = apply_overrides(base_config, overrides)
+            for mode in scenario.get("modes", ["normal"]):
+                run_hash = scenario_hash(config, config_file_path, mode, pop_size, n_gen)
+                runs.setdefault(run_hash, {
+                    "name": scenario["name"],
+                    "mode": mode,
+                    "overrides": {column_name(key_path): value for key_path, value in overrides.items()},
+                    "config": config,
+                    "config_file_path": config_file_path,
+                    "scenario_hash": run_hash,
+                })
+
+    return list(runs.values())
+
+
+def open_store(store_path: str) -> sqlite3.Connection:
+    """
+    Öffnet die Ablage (und legt die Tabellen results und errors an, falls nötig).
+    """
+    connection = sqlite3.connect(store_path)
+    connection.execute(f"CREATE TABLE IF NOT EXISTS results "
+                       f"({', '.join(f'{name} {sql_type}' for name, sql_type in RESULT_COLUMNS.items())})")
+    connection.execute("CREATE TABLE IF NOT EXISTS errors "
+                       "(scenario_hash TEXT, name TEXT, mode TEXT, overrides TEXT, traceback TEXT, failed_at TEXT)")
+    connection.commit()
+    return connection
+
+
+def completed_hashes(connection: sqlite3.Connection) -> set:
+    return {row[0] for row in connection.execute("SELECT scenario_hash FROM results")}
+
+
+def _now() -> str:
+    return datetime.datetime.now().isoformat(timespec="seconds")
+
+
+def _store_result(connection: sqlite3.Connection, run: Dict, eval_res, design: Dict):
+    npv_breakdown = eval_res.tco.sum_cash_flows_npv
+    row = {
+        "scenario_hash": run["scenario_hash"],
+        "name": run["name"],
+        "mode": run["mode"],
+        "overrides": json.dumps(run["overrides"], default=str),
+        **{key: design[key] for key in ["p_el", "p_fc", "m_tank", "c_battery"]},
+        "compress_before_storing": int(bool(design["compress_before_storing"])),
+        "npv_total": eval_res.tco.npv_total,
+        "npv_capex": float(sum(npv_breakdown.get("CAPEX", {}).values())),
+        "npv_opex": float(sum(npv_breakdown.get("OPEX", {}).values())),
+        "npv_breakdown": json.dumps(npv_breakdown, default=float),
+        "peak_power_year_kW": eval_res.peak_power_year_kW,
+        "total_consumption_year_kwh": eval_res.total_consumption_year_kwh,
+        "aufschlaege_strom_total_eur_per_kwh": eval_res.aufschlaege_strom_total_eur_per_kwh,
+        "leistungspreis_summe": eval_res.leistungspreis_summe,
+        "finished_at": _now(),
+        "evaluation_result": pickle.dumps(eval_res),
+    }
+    connection.execute(f"INSERT OR REPLACE INTO results ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                       list(row.values()))
+    connection.commit()
+
+
+def _store_error(connection: sqlite3.Connection, run: Dict, error_traceback: str):
+    connection.execute("INSERT INTO errors VALUES (?, ?, ?, ?, ?, ?)",
+                       (run["scenario_hash"], run["name"], run["mode"], json.dumps(run["overrides"], default=str),
+                        error_traceback, _now()))
+    connection.commit()
+
+
+def run_batch(batch_file_path: str, store_path: str = None, max_workers=None, dry_run=False) -> int:
+    """
+    Führt alle noch nicht in der Ablage enthaltenen Läufe einer Szenariodatei aus (siehe Modulbeschreibung).
+
+    @param store_path: Pfad der Ablage; Standard: "store" der Szenariodatei bzw. Szenariodatei mit Endung .sqlite
+    @param max_workers: Anzahl der Prozesse; Standard: "max_workers" der Szenariodatei bzw. Anzahl der CPUs
+    @param dry_run: True, um nur die offenen Läufe auszugeben
+    @return: Anzahl der fehlgeschlagenen Läufe
+    """
+    with open(batch_file_path) as batch_file:
+        batch_config = json.load(batch_file)
+
+    batch_dir = os.path.dirname(os.path.abspath(batch_file_path))
+    if store_path is None:
+        store_path = os.path.join(batch_dir, batch_config["store"]) if "store" in batch_config \
+            else os.path.splitext(batch_file_path)[0] + ".sqlite"
+    if max_workers is None:
+        max_workers = batch_config.get("max_workers")
+
+    runs = expand_scenarios(batch_config, batch_file_path)
+    done = set()
+    if os.path.exists(store_path):
+        connection = open_store(store_path)
+        done = completed_hashes(connection)
+        connection.close()
+    open_runs = [run for run in runs if run["scenario_hash"] not in done]
+    print(f"{len(runs)} runs, {len(runs) - len(open_runs)} already in {store_path}, {len(open_runs)} to do.")
+
+    if dry_run:
+        for run in open_runs:
+            print(f"  {run['name']} ({run['mode']}) {run['overrides']}")
+        return 0
+
+    n_failed = 0
+    connection = open_store(store_path)
+    try:
+        evaluations = iter_evaluations([(run["config"], run["config_file_path"], run["mode"]) for run in open_runs],
+                                       max_workers=max_workers, pop_size=batch_config.get("pop_size", 50),
+                                       n_gen=batch_config.get("n_gen", 100), catch_errors=True)
+        for n_finished, (i, (eval_res, design, error_traceback)) in enumerate(evaluations, start=1):
+            run = open_runs[i]
+            if error_traceback is not None:
+                n_failed += 1
+                _store_error(connection, run, error_traceback)
+                print(f"[{n_finished}/{len(open_runs)}] FAILED {run['name']} ({run['mode']}) {run['overrides']}:\n"
+                      f"{error_traceback}")
+            else:
+                _store_result(connection, run, eval_res, design)
+                print(f"[{n_finished}/{len(open_runs)}] {run['name']} ({run['mode']}) {run['overrides']}: "
+                      f"NPV {eval_res.tco.npv_total:.0f} EUR")
+    finally:
+        connection.close()
+
+    return n_failed
+
+
+def load_results(store_path: str) -> pd.DataFrame:
+    """
+    @return: DataFrame mit einer Zeile je fertigem Lauf der Ablage; overrides und npv_breakdown als dicts,
+        evaluation_result als EvaluationResult; bei Läufen mit "multi_fidelity" zusätzlich die beobachtete Abweichung
+        (sweep.MULTI_FIDELITY_COLUMNS)
+    """
+    connection = sqlite3.connect(store_path)
+    try:
+        results = pd.read_sql_query("SELECT * FROM results ORDER BY finished_at", connection)
+    finally:
+        connection.close()
+
+    for column in ["overrides", "npv_breakdown"]:
+        results[column] = results[column].map(json.loads)
+    results["compress_before_storing"] = results["compress_before_storing"].astype(bool)
+    results["evaluation_result"] = results["evaluation_result"].map(pickle.loads)
+    reports = results["evaluation_result"].map(lambda eval_res: eval_res.multi_fidelity_report)
+    if reports.notna().any():
+        for key in MULTI_FIDELITY_COLUMNS:
+            results[key] = reports.map(lambda report: None if report is None else report[key])
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m h2pp.batch",
+                                     description="Runs the scenarios of a scenario file (JSON) and stores every "
+                                                 "finished run in a SQLite store. Runs already in the store are "
+                                                 "skipped, so an interrupted batch can simply be restarted.")
+    parser.add_argument("scenario_file", help="scenario file (JSON), see h2pp/batch.py")
+    parser.add_argument("--store", default=None, help="SQLite store (default: 'store' of the scenario file or "
+                                                      "<scenario file>.sqlite)")
+    parser.add_argument("--max-workers", type=int, default=None, help="number of processes (default: all CPUs)")
+    parser.add_argument("--dry-run", action="store_true", help="only list the runs that are not in the store yet")
+    parser.add_argument("--profile", default=None, metavar="DIRECTORY",
+                        help="profile the batch with cProfile and a stack sampler: writes main.prof/main.collapsed "
+                             "and worker_<pid>.prof/.collapsed per worker process into DIRECTORY")
+    args = parser.parse_args(argv)
+
+    with instrumentation.profile(os.path.join(args.profile, "main") if args.profile else None):
+        n_failed = run_batch(args.scenario_file, store_path=args.store, max_workers=args.max_workers,
+                             dry_run=args.dry_run)
+    return 1 if n_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
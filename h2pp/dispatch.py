@@ -0,0 +1,321 @@
+'''
+
+Schnelle Einsatzplanung ohne Solver für Topologien, bei denen das LP aus run_simulation eine einfache Struktur hat.
+
+- Ohne Elektrolyseur, Brennstoffzelle, Tank und Batterie (Referenzfall "power_grid_only_ref") ist jeder Zeitschritt
+  eine unabhängige Bilanz: Die Netto-Last am AC- bzw. DC-Bus wird (unter Berücksichtigung der Inverterverluste) aus
+  dem Netz gekauft bzw. ins Netz verkauft, der Wasserstoffbedarf bei 350 / 700 bar wird am Markt gekauft. Das Optimum
+  des LPs lässt sich daher direkt angeben (run_simulation_grid_only).
+- Im Batterie-Referenzfall ("battery_ref") ist die Batterie der einzige Speicher. Der Einsatz wird über eine
+  dynamische Programmierung auf einem diskretisierten Ladezustand bestimmt (battery_dispatch_dp), vektorisiert über
+  beliebig viele Batteriekapazitäten. Das Ergebnis ist eine Näherung des LP-Optimums (Diskretisierung des
+  Ladezustands), daher muss dieses Verfahren explizit gewählt werden.
+
+Die Auswahl des Verfahrens erfolgt in simulate() über den Konfigurationsparameter "dispatch_method":
+- "auto" (Standard): direkte Berechnung, wo sie exakt ist (Referenzfall ohne Speicher), sonst LP
+- "dp": wie "auto", zusätzlich dynamische Programmierung im Batterie-Referenzfall
+- "lp": immer das LP (bspw. zur Validierung)
+
+'''
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from h2pp import instrumentation
+from h2pp.generators import (BATTERY_C_RATE, BATTERY_INFLOW_CONVERSION_FACTOR, BATTERY_OUTFLOW_CONVERSION_FACTOR,
+                             Jahreszeit, convert_kg_H2_to_kWh)
+from h2pp.simulation import run_simulation, electricity_market_prices
+
+DISPATCH_METHODS = ["auto", "dp", "lp"]
+
+# Anzahl der Stufen des diskretisierten Ladezustands (zwischen soc_min und soc_max) für die dynamische Programmierung,
+# kann über "dispatch_soc_steps" im "battery" dict der Konfiguration überschrieben werden
+DEFAULT_DISPATCH_SOC_STEPS = 201
+
+
+def dispatch_method(sim_config_dict) -> str:
+    """
+    @return: Das in der Konfiguration gewählte Verfahren für die Einsatzplanung (siehe DISPATCH_METHODS)
+    """
+    method = sim_config_dict.get("dispatch_method", "auto")
+    if method not in DISPATCH_METHODS:
+        raise ValueError(f"Invalid dispatch_method {method} in the config file. Must be one of {DISPATCH_METHODS}.")
+    return method
+
+
+def is_grid_only_topology(sim_config_dict, p_el=None, p_fc=None, m_tank=None, c_battery=None) -> bool:
+    """
+    Prüft, ob das Energiesystem keine zeitliche Kopplung hat und damit ohne Solver berechnet werden kann
+    (run_simulation_grid_only).
+
+    Voraussetzungen: kein Elektrolyseur, keine Brennstoffzelle, kein Tank, keine Batterie, keine lokale
+    Wasserstofferzeugung (diese müsste über die Verdichter verteilt werden) und keine Begrenzung des Strombezugs
+    (strombezug_begrenzen, kann im LP zu Infeasibilities führen).
+    """
+    if c_battery is not None:
+        return False
+
+    return is_battery_only_topology(sim_config_dict, p_el=p_el, p_fc=p_fc, m_tank=m_tank)
+
+
+def is_battery_only_topology(sim_config_dict, p_el=None, p_fc=None, m_tank=None) -> bool:
+    """
+    Wie is_grid_only_topology, jedoch ggfs. mit Batterie (Batterie-Referenzfall, battery_dispatch_dp).
+    """
+    if any(param is not None for param in [p_el, p_fc, m_tank]):
+        return False
+
+    if sim_config_dict.get("strombezug_begrenzen", False):
+        return False
+
+    # alle Jahreszeiten bzw. repräsentativen Perioden (siehe periods.py)
+    return all(not np.any(np.asarray(generator_ts) != 0)
+               for generator_ts in sim_config_dict['hydrogen_generators_all_ts'].values())
+
+
+def _week_inputs(sim_config_dict, jahreszeit: Jahreszeit, verbose=False) -> dict:
+    """
+    Zeitreihen und Preise der typischen Woche für die direkte Berechnung (volle Länge inkl. 0:00 Uhr des ersten Tages
+    der Folgewoche wie im LP).
+    """
+    freq_in_min = sim_config_dict["base_sim_interval"]
+
+    if (24*60) % freq_in_min != 0:
+        raise ValueError(f"Base simulation interval {freq_in_min} is not a divisor of 24*60 minutes!")
+
+    if np.any(np.asarray(sim_config_dict['hydrogen_generators_all_ts'][jahreszeit.name]) != 0):
+        raise ValueError("The dispatch without solver does not support local hydrogen generation, use run_simulation!")
+
+    spot_price, var_costs_s_electric_grid_buy, var_costs_s_electric_grid_sell, _ = \
+        electricity_market_prices(sim_config_dict, jahreszeit, verbose=verbose)
+
+    # siehe Hinweis in run_simulation: Kaufpreis unter Verkaufspreis -> unbegrenzter Kauf & Verkauf optimal
+    if np.any(var_costs_s_electric_grid_buy < var_costs_s_electric_grid_sell):
+        raise ValueError("The price for buying electricity must not be lower than the price for selling it!")
+
+    return {
+        "interval_h": freq_in_min / 60,
+        "inverter_efficiency": sim_config_dict["inverter_efficiency"],
+        "generator_dc_electricity_ts": np.asarray(sim_config_dict['dc_generators_all_ts'][jahreszeit.name]),
+        "generator_ac_electricity_ts": np.asarray(sim_config_dict['ac_generators_all_ts'][jahreszeit.name]),
+        "consumed_ac_electricity_ts": np.asarray(sim_config_dict['ac_consumers_all_ts'][jahreszeit.name]),
+        "consumed_dc_electricity_ts": np.asarray(sim_config_dict['dc_consumers_all_ts'][jahreszeit.name]),
+        "consumed_hydrogen_700_ts": np.asarray(sim_config_dict['hydrogen_consumers_700_all_ts'][jahreszeit.name]),
+        "consumed_hydrogen_350_ts": np.asarray(sim_config_dict['hydrogen_consumers_350_all_ts'][jahreszeit.name]),
+        "spot_price": np.asarray(spot_price),
+        "var_costs_s_electric_grid_buy": np.asarray(var_costs_s_electric_grid_buy),
+        "var_costs_s_electric_grid_sell": np.asarray(var_costs_s_electric_grid_sell),
+        "price_h2_per_equiv_kWh_350": sim_config_dict['h2_price_per_kg_350bar'] / convert_kg_H2_to_kWh(1),
+        "price_h2_per_equiv_kWh_700": sim_config_dict['h2_price_per_kg_700bar'] / convert_kg_H2_to_kWh(1),
+    }
+
+
+def _grid_exchange(week_inputs: dict, battery_power_dc=0.0):
+    """
+    Optimaler Netzbezug bzw. -verkauf je Zeitschritt für eine gegebene Leistung am DC-Bus (bspw. Batterie).
+    - Die Netto-Last wird auf den AC-Bus (Netzanschluss) umgerechnet: DC-Überschüsse kommen mit dem
+      Inverterwirkungsgrad am AC-Bus an, DC-Defizite benötigen entsprechend mehr AC-Leistung.
+    - Ein Defizit wird gekauft. Ein Überschuss wird nur verkauft, wenn der Verkaufspreis positiv ist, sonst wird er
+      (wie im LP über die Inverterverluste) kostenlos abgebaut.
+
+    @param battery_power_dc: zusätzliche Einspeisung (positiv) bzw. Entnahme (negativ) am DC-Bus in kW, broadcastbar
+        gegen die Zeitreihen (letzte Achse = Zeit)
+    @return: 2-Tupel Netzbezug und Netzeinspeisung in kW
+    """
+    inv_eff = week_inputs["inverter_efficiency"]
+    net_ac = week_inputs["generator_ac_electricity_ts"] - week_inputs["consumed_ac_electricity_ts"]
+    net_dc = week_inputs["generator_dc_electricity_ts"] - week_inputs["consumed_dc_electricity_ts"] + battery_power_dc
+    net_ac_equiv = net_ac + np.where(net_dc >= 0, net_dc * inv_eff, net_dc / inv_eff)
+
+    el_grid_buy_seq_power_kW = np.maximum(-net_ac_equiv, 0)
+    el_grid_sell_seq_power_kW = np.where(week_inputs["var_costs_s_electric_grid_sell"] > 0,
+                                         np.maximum(net_ac_equiv, 0), 0)
+
+    return el_grid_buy_seq_power_kW, el_grid_sell_seq_power_kW
+
+
+def _result_dict(week_inputs: dict, el_grid_buy_seq_power_kW, el_grid_sell_seq_power_kW, battery_content_kWh=None,
+                 c_battery=None) -> dict:
+    """
+    Baut aus den Flüssen (volle Länge) dasselbe Dict wie run_simulation ("sim_results" ist hier None). Wie im LP wird
+    der letzte Zeitpunkt (0:00 Uhr des ersten Tages der Folgewoche) nicht berücksichtigt.
+    """
+    interval_h = week_inputs["interval_h"]
+    el_grid_buy_seq_power_kW = el_grid_buy_seq_power_kW[:-1]
+    el_grid_sell_seq_power_kW = el_grid_sell_seq_power_kW[:-1]
+    consumed_hydrogen_350_ts = week_inputs["consumed_hydrogen_350_ts"][:-1]
+    consumed_hydrogen_700_ts = week_inputs["consumed_hydrogen_700_ts"][:-1]
+
+    el_grid_source_total_cost_spot_price_only = np.sum(el_grid_buy_seq_power_kW * interval_h
+                                                       * week_inputs["spot_price"][:-1])
+    el_grid_sink_total_cost = np.sum(el_grid_sell_seq_power_kW * interval_h
+                                     * -1 * week_inputs["var_costs_s_electric_grid_sell"][:-1])
+    # Der Wasserstoffbedarf (350 und 700 bar) wird vollständig am Markt gekauft; ohne lokale Erzeugung laufen die
+    # Verdichter nicht.
+    h2_grid_source_total_cost = (np.sum(consumed_hydrogen_350_ts) * interval_h * week_inputs["price_h2_per_equiv_kWh_350"]
+                                 + np.sum(consumed_hydrogen_700_ts) * interval_h * week_inputs["price_h2_per_equiv_kWh_700"])
+
+    flow_sequences = {
+        's_el_grid_buy': el_grid_buy_seq_power_kW,
+        's_el_grid_sell': el_grid_sell_seq_power_kW,
+        'Electricity_Consumption_AC_Ges': week_inputs["consumed_ac_electricity_ts"][:-1],
+        'Electricity_Consumption_DC_Ges': week_inputs["consumed_dc_electricity_ts"][:-1],
+        'Electricity_DC_Generation_Ges': week_inputs["generator_dc_electricity_ts"][:-1],
+        'H2_Consumption_Ges_350': consumed_hydrogen_350_ts,
+        'H2_Consumption_Ges_700': consumed_hydrogen_700_ts,
+        's_h2_grid_buy_350': consumed_hydrogen_350_ts,
+        's_h2_grid_buy_700': consumed_hydrogen_700_ts,
+        's_save_heat': np.zeros_like(el_grid_buy_seq_power_kW),
+    }
+
+    battery_sequence_soc = None
+    if battery_content_kWh is not None:
+        # Ladezustand zu Beginn jedes Zeitschritts, wie in run_simulation ohne die letzten beiden Werte
+        flow_sequences['BatteryStorage_storage_content'] = battery_content_kWh[:-2]
+        battery_sequence_soc = np.clip(battery_content_kWh[:-2] / c_battery, 0, 1)
+
+    return {
+        "el_grid_source_total_cost_spot_price_only": el_grid_source_total_cost_spot_price_only,
+        "h2_grid_source_total_cost": h2_grid_source_total_cost,
+        "heat_grid_sink_total_cost": 0.0,
+        "el_grid_sink_total_cost": el_grid_sink_total_cost,
+        "sim_results": None,
+        "flow_sequences": flow_sequences,
+        "battery_sequence_soc": battery_sequence_soc,
+    }
+
+
+@instrumentation.timed("simulation.grid_only")
+def run_simulation_grid_only(sim_config_dict, jahreszeit: Jahreszeit, verbose=False, **kwargs):
+    """
+    Berechnet das Optimum des LPs aus run_simulation für eine Topologie ohne Speicher und Wandler direkt
+    (siehe is_grid_only_topology und _grid_exchange) und gibt dasselbe Dict zurück wie run_simulation ("sim_results"
+    ist hier None).
+
+    Ist der Kaufpreis 0 (negative Spotmarktpreise werden beim Kauf auf 0 gesetzt), ist das LP nicht eindeutig; hier
+    wird dann nur der tatsächliche Bedarf gekauft.
+    """
+    week_inputs = _week_inputs(sim_config_dict, jahreszeit, verbose=verbose)
+    el_grid_buy_seq_power_kW, el_grid_sell_seq_power_kW = _grid_exchange(week_inputs)
+
+    return _result_dict(week_inputs, el_grid_buy_seq_power_kW, el_grid_sell_seq_power_kW)
+
+
+@instrumentation.timed("simulation.battery_dp")
+def battery_dispatch_dp(sim_config_dict, jahreszeit: Jahreszeit, capacities, initial_soc: float = None,
+                        verbose=False) -> list[dict]:
+    """
+    Einsatzplanung der Batterie im Batterie-Referenzfall über dynamische Programmierung auf einem diskretisierten
+    Ladezustand, für alle übergebenen Kapazitäten gleichzeitig.
+
+    Der Ladezustand wird relativ zur Kapazität in gleich große Stufen zwischen soc_min und soc_max eingeteilt, sodass
+    die möglichen Übergänge (begrenzt durch die C-Rate und die Wirkungsgrade, siehe create_battery_storage) für alle
+    Kapazitäten dieselben sind; nur die zugehörige Leistung skaliert mit der Kapazität. Die Kosten eines Übergangs
+    sind die Kosten des sich damit ergebenden Netzbezugs bzw. -verkaufs (_grid_exchange) mit den Preisen des LPs.
+    Rückwärts wird je Zeitschritt, Kapazität und Ladezustand der beste Übergang bestimmt, vorwärts ab dem initialen
+    Ladezustand (wie im LP, kein Ausgleich des Ladezustands am Ende) der Verlauf rekonstruiert.
+
+    @param capacities: Batteriekapazitäten in kWh
+    @param initial_soc: Ladezustand zu Beginn (0-1, wird auf die nächste Stufe gerundet), standardmäßig soc_min
+    @return: Liste mit einem Dict je Kapazität, wie von run_simulation zurückgegeben ("sim_results" ist hier None)
+    """
+    capacities = np.atleast_1d(np.asarray(capacities, dtype=float))
+    week_inputs = _week_inputs(sim_config_dict, jahreszeit, verbose=verbose)
+    interval_h = week_inputs["interval_h"]
+
+    soc_min = sim_config_dict["battery"]["soc_min"]
+    soc_max = sim_config_dict["battery"]["soc_max"]
+    soc_steps = sim_config_dict["battery"].get("dispatch_soc_steps", DEFAULT_DISPATCH_SOC_STEPS)
+    if soc_max < soc_min:
+        raise ValueError(f"soc_max ({soc_max}) must not be smaller than soc_min ({soc_min}).")
+    if soc_steps < 2:
+        raise ValueError(f"dispatch_soc_steps must be at least 2, got {soc_steps}.")
+
+    if soc_max == soc_min:
+        # Kein nutzbarer Bereich: nur eine Stufe, die Batterie kann weder laden noch entladen
+        soc_steps = 1
+        soc_levels = np.array([soc_min])
+        soc_step_size = 0.0
+        max_charge_steps = 0
+        max_discharge_steps = 0
+    else:
+        soc_levels = np.linspace(soc_min, soc_max, soc_steps)
+        soc_step_size = soc_levels[1] - soc_levels[0]
+
+        # Mögliche Änderungen des Ladezustands je Zeitschritt in Stufen (Laden positiv): Laden mit max. C-Rate *
+        # Kapazität aus dem Bus, davon kommt der inflow_conversion_factor im Speicher an; Entladen analog.
+        max_charge_steps = int(np.floor(BATTERY_C_RATE * BATTERY_INFLOW_CONVERSION_FACTOR * interval_h / soc_step_size
+                                        + 1e-9))
+        max_discharge_steps = int(np.floor(BATTERY_C_RATE / BATTERY_OUTFLOW_CONVERSION_FACTOR * interval_h
+                                           / soc_step_size + 1e-9))
+    step_offsets = np.arange(-max_discharge_steps, max_charge_steps + 1)
+
+    # Leistung am DC-Bus je kWh Kapazität für jeden Übergang (Entladen positiv)
+    delta_soc = step_offsets * soc_step_size
+    power_per_kWh = np.where(delta_soc > 0,
+                             -delta_soc / (BATTERY_INFLOW_CONVERSION_FACTOR * interval_h),
+                             -delta_soc * BATTERY_OUTFLOW_CONVERSION_FACTOR / interval_h)
+    battery_power_dc = capacities[:, None, None] * power_per_kWh[None, :, None]  # (Kapazitäten, Übergänge, 1)
+
+    # Kosten jedes Übergangs je Zeitschritt: (Kapazitäten, Übergänge, Zeit)
+    el_grid_buy, el_grid_sell = _grid_exchange(week_inputs, battery_power_dc=battery_power_dc)
+    transition_costs = interval_h * (el_grid_buy * week_inputs["var_costs_s_electric_grid_buy"]
+                                     - el_grid_sell * week_inputs["var_costs_s_electric_grid_sell"])
+
+    n_capacities, n_offsets, n_steps = transition_costs.shape
+
+    # Rückwärtsrekursion; Übergänge über die Grenzen des Ladezustands hinaus haben unendliche Kosten
+    value = np.zeros((n_capacities, soc_steps))
+    best_offset_idx = np.empty((n_steps, n_capacities, soc_steps), dtype=np.int16)
+    padding_low = np.full((n_capacities, max_discharge_steps), np.inf)
+    padding_high = np.full((n_capacities, max_charge_steps), np.inf)
+    for t in range(n_steps - 1, -1, -1):
+        padded_value = np.concatenate((padding_low, value, padding_high), axis=1)
+        # candidates[c, k, d] = value of the state k + step_offsets[d] after the transition
+        candidates = sliding_window_view(padded_value, n_offsets, axis=1) + transition_costs[:, None, :, t]
+        best_offset_idx[t] = np.argmin(candidates, axis=2)
+        value = np.take_along_axis(candidates, best_offset_idx[t][:, :, None], axis=2)[:, :, 0]
+
+    # Vorwärts: Start beim initialen Ladezustand (standardmäßig soc_min, Stufe 0)
+    soc_idx = np.zeros((n_capacities, n_steps + 1), dtype=int)
+    if initial_soc is not None and soc_step_size > 0:
+        soc_idx[:, 0] = int(np.clip(np.round((initial_soc - soc_min) / soc_step_size), 0, soc_steps - 1))
+    capacity_idx = np.arange(n_capacities)
+    for t in range(n_steps):
+        soc_idx[:, t + 1] = soc_idx[:, t] + step_offsets[best_offset_idx[t, capacity_idx, soc_idx[:, t]]]
+
+    battery_power = capacities[:, None] * power_per_kWh[np.diff(soc_idx, axis=1) + max_discharge_steps]
+    el_grid_buy, el_grid_sell = _grid_exchange(week_inputs, battery_power_dc=battery_power)
+    battery_content_kWh = capacities[:, None] * soc_levels[soc_idx]
+
+    if verbose:
+        print("Kosten (Zielfunktion, nur Strom) je Kapazität: ", value[np.arange(n_capacities), soc_idx[:, 0]])
+
+    return [_result_dict(week_inputs, el_grid_buy[i], el_grid_sell[i], battery_content_kWh=battery_content_kWh[i],
+                         c_battery=capacities[i])
+            for i in range(n_capacities)]
+
+
+def simulate(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None, p_fc: float = None,
+             m_tank: float = None, compress_before_storing: bool = False, c_battery=None,
+             verbose=False, **kwargs):
+    """
+    Simuliert die typische Woche der übergebenen Jahreszeit mit dem in der Konfiguration gewählten Verfahren
+    ("dispatch_method", siehe oben): direkte Berechnung (run_simulation_grid_only bzw. battery_dispatch_dp), falls
+    die Topologie dies zulässt, sonst das LP (run_simulation).
+    Parameter und Rückgabe wie bei run_simulation.
+    """
+    method = dispatch_method(sim_config_dict)
+
+    if method != "lp" and \
+            is_grid_only_topology(sim_config_dict, p_el=p_el, p_fc=p_fc, m_tank=m_tank, c_battery=c_battery):
+        return run_simulation_grid_only(sim_config_dict, jahreszeit, verbose=verbose, **kwargs)
+
+    if method == "dp" and c_battery is not None and \
+            is_battery_only_topology(sim_config_dict, p_el=p_el, p_fc=p_fc, m_tank=m_tank):
+        return battery_dispatch_dp(sim_config_dict, jahreszeit, [c_battery],
+                                   initial_soc=kwargs.get("initial_battery_level"), verbose=verbose)[0]
+
+    return run_simulation(sim_config_dict=sim_config_dict, jahreszeit=jahreszeit, p_el=p_el, p_fc=p_fc,
+                          m_tank=m_tank, compress_before_storing=compress_before_storing, c_battery=c_battery,
+                          verbose=verbose, **kwargs)
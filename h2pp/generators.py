@@ -13,13 +13,10 @@ import os
 
 import numpy as np
 import pandas as pd
-import pvlib
-import requests.exceptions
 from oemof import solph
 
 from h2pp import helperFunctions
 from h2pp.helperFunctions import resample_time_series_and_extract_values_for_oemof
-from timezonefinder import TimezoneFinder
 
 
 # Allgemeine Anmerkung: Wirkungsgrade müssen offenkundig i.A. auf die Outputs: Siehe
@@ -395,22 +392,32 @@ def create_h2_storage(bus_h2: solph.Bus, storage_capacity_in_kg: float, balance_
     return h2st
 
 
+# Parameter der Batterie (auch für die Einsatzplanung ohne Solver in dispatch.py und das Screening in screening.py)
+# 0.5 means that the battery can be charged or discharged in 2 hours -> the nominal power in kW is 0.5/h * storage_capacity_in_kWh
+BATTERY_C_RATE = 0.5
+BATTERY_INFLOW_CONVERSION_FACTOR = 0.95
+BATTERY_OUTFLOW_CONVERSION_FACTOR = 0.95
+
+
 def create_battery_storage(bus_el: solph.Bus, storage_capacity_in_kWh: float,
-                           soc_min, soc_max) -> solph.components.GenericStorage:
+                           soc_min, soc_max, initial_storage_level=None) -> solph.components.GenericStorage:
     """
 
     :param bus_el: The bus where the battery is connected to
     :param storage_capacity_in_kWh: Menge an speicherbarer elektrischer Energie in kWh
+    :param initial_storage_level: Initialer Ladezustand (0-1), standardmäßig soc_min
     :return:
     """
 
+    if initial_storage_level is None:
+        initial_storage_level = soc_min
+
     # TODO Add possibility to balance the storage level between start and end of the simulation (currently only
     #  possible for H2 storage, see there)
 
     # Annahme: keine Verluste im Tank / beim Speichern selbst
 
-    c_rate = 0.5  # 0.5 means that the battery can be charged or discharged in 2 hours -> the nominal power in kW is 0.5/h * storage_capacity_in_kWh
-    nominal_power = storage_capacity_in_kWh * c_rate
+    nominal_power = storage_capacity_in_kWh * BATTERY_C_RATE
 
     bs = solph.components.GenericStorage(
         label="BatteryStorage",
@@ -419,10 +426,10 @@ def create_battery_storage(bus_el: solph.Bus, storage_capacity_in_kWh: float,
         outputs={bus_el: solph.Flow(nominal_value=nominal_power)},
         min_storage_level=soc_min,
         max_storage_level=soc_max,
-        initial_storage_level=soc_min,  # wenn nicht gesetzt crasht oemof (muss gesetzt sein, wenn balanced=False)
+        initial_storage_level=initial_storage_level,  # wenn nicht gesetzt crasht oemof (muss gesetzt sein, wenn balanced=False)
         balanced=False, # no balancing, todo allow it via a parameter (s.a.)
-        inflow_conversion_factor=0.95,
-        outflow_conversion_factor=0.95
+        inflow_conversion_factor=BATTERY_INFLOW_CONVERSION_FACTOR,
+        outflow_conversion_factor=BATTERY_OUTFLOW_CONVERSION_FACTOR
 
     )
 
@@ -466,6 +473,11 @@ def create_pv_plant_time_series(latitude: float, longitude: float,
     # Unfortunately, we can currently only retrieve weather data from 2005 up to 2015 with the PVGIS Version 5.1 (default for pvlib).
     # v5.2 supports up to 2020 but I currently have not gotten it to work.
     # We average the values over the years to get a typical year.
+    # pvlib, requests und timezonefinder werden erst hier importiert, da sie nur für die PVGIS-Abfrage benötigt werden
+    import pvlib
+    import requests.exceptions
+    from timezonefinder import TimezoneFinder
+
     try:
         w1 = pvlib.iotools.get_pvgis_hourly(latitude, longitude, start=2005, end=2016, components=True,
                                             surface_tilt=surface_tilt, surface_azimuth=surface_azimuth,
@@ -503,7 +515,6 @@ def create_pv_plant_time_series(latitude: float, longitude: float,
     # Retrieve time zone from latitude and longitude
     tf = TimezoneFinder()
     tz = tf.timezone_at(lng=longitude, lat=latitude)  # e.g. 'Europe/Berlin'
-    print(tz)
     w1[0].index = w1[0].index.tz_convert(tz)
 
     # Mittelung der Werte
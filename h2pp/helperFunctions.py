@@ -1,19 +1,34 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 
 import numpy as np
 import pandas as pd
 import rainflow
-from matplotlib import pyplot as plt
 from oemof import solph
 from oemof.solph import views
 
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
-from scipy.signal import find_peaks
-
 from h2pp import tco
 
 
+@dataclass(frozen=True)
+class SolverStatistics:
+    # Statistik des LPs einer Periode (siehe simulation.solver_statistics)
+    # Größe des Modells vor dem Presolve: Nebenbedingungen, Variablen, Nichtnullelemente der Matrix (None, falls
+    # nicht im Log des Solvers enthalten)
+    rows: int
+    columns: int
+    nonzeros: int | None
+    # Status und Abbruchbedingung des Solvers, bspw. "ok" und "optimal"
+    status: str
+    termination_condition: str
+    # Simplex-Iterationen (None, falls nicht gemeldet)
+    iterations: int | None
+    # Laufzeit des Solvers (ohne Aufbau und Schreiben des Modells) in s
+    solver_time_s: float
+    # Zielfunktionswert in EUR (Energiekosten der Periode)
+    objective: float
+
+
 @dataclass
 class EvaluationResult:
     tco: tco.TCO
@@ -21,69 +36,60 @@ class EvaluationResult:
     leistungspreis_summe: float
     total_consumption_year_kwh: float
     peak_power_year_kW: float
+    # Name der Periode -> Statistik des LPs, nur für Perioden, die mit dem LP simuliert wurden (nicht bei direkter
+    # Einsatzplanung ohne Solver, siehe dispatch.py)
+    solver_statistics: Dict[str, SolverStatistics] = field(default_factory=dict)
+    # Bericht der Multi-Fidelity-Optimierung (beobachtete Abweichung grob/fein, Rangkorrelation, siehe
+    # optimizer.multi_fidelity_minimize), nur für Optima mit "multi_fidelity" in der Konfiguration
+    multi_fidelity_report: Optional[Dict] = None
+
 
+def solver_statistics_table(solver_statistics: Dict[str, SolverStatistics]) -> pd.DataFrame:
+    """
+    @param solver_statistics: EvaluationResult.solver_statistics
+    @return: DataFrame mit einer Zeile je Periode und einer Spalte je Feld von SolverStatistics
+    """
+    return pd.DataFrame([vars(statistics) for statistics in solver_statistics.values()],
+                        index=pd.Index(list(solver_statistics), name="period"),
+                        columns=list(SolverStatistics.__dataclass_fields__))
 
-def get_max_depth(x: np.array, **kwargs) -> float:
+
+def get_max_depth(x: np.array, **kwargs) -> float | np.ndarray:
     '''
     This function is used for the 'tank requirement' calculation in the feasibility analysis.
 
-    Find the maximum depth between a peak (local max) and the consecutive lowest point in a signal.
-    :param x: an array holding the signal (in our case should be the current "state of charge" of the hydrogen tank)
-    :param kwargs: set plot_peaks to True for visualization purposes (only for testing)
-    :return: the absolute value difference between the peak and the following lowest point
+    Find the maximum depth between a peak (local max, including the edges) and the consecutive lowest point in a
+    signal, i.e. the maximum drawdown of the signal. This is computed in a single O(n) pass using the running maximum
+    (np.maximum.accumulate): for every point, the depth is the difference between the highest value before (or at) this
+    point and the point itself.
+
+    :param x: an array holding the signal (in our case should be the current "state of charge" of the hydrogen tank).
+        If a 2-D array is passed, every row is treated as a separate signal (e.g. one row per blackout window).
+    :param kwargs: set plot_peaks to True for visualization purposes (only for testing, only for 1-D signals)
+    :return: the absolute value difference between the peak and the following lowest point (0 if the signal is
+        constant or only increasing). For a 2-D input, an array with one value per row.
     '''
-    peaks, _ = find_peaks(x)
-    lowzz, _ = find_peaks(-1 * x)
-
-    # as the edges are not considered, we need to manually check if they might be peaks
-
-    # left side
-    i = 0
-    while x[i] == x[i + 1]:
-        if i == x.size - 2:
-            # penultimate entry = last entry, that means the
-            # function completely constant... nothin happens, just break.
-            # print("allconst")
-            return 0
-        i += 1
-    if x[i] > x[i + 1]:
-        peaks = np.insert(peaks, 0, i)
-    elif x[i] < x[i + 1]:
-        lowzz = np.insert(lowzz, 0, i)
-
-    # right side - func CAN NOT be const (otherwise would have been returned 0 before)
-    i = x.size - 1
-    while x[i] == x[i - 1]:
-        i -= 1
-
-    if x[i] > x[i - 1]:
-        peaks = np.append(peaks, i)
-    elif x[i] < x[i - 1]:
-        lowzz = np.append(lowzz, i)
-
-    max_depth = 0  # Initialize max_depth with 0 - if we will find any peak (e.g. if the tank is only filling up), we need to return 0
-    for peak_x_idx in peaks:
-        following_lows_idx = lowzz[lowzz > peak_x_idx]
-        if len(following_lows_idx) == 0:
-            continue
-        for low_x_idx in following_lows_idx:
-            if x[peak_x_idx] - x[low_x_idx] > max_depth:
-                # New max depth found
-                max_depth = x[peak_x_idx] - x[low_x_idx]
-                # print(
-                #    f"Peak at {peak_x_idx} with value {x[peak_x_idx]} and following low at {low_x_idx} with value {x[low_x_idx]}")
-
-    #print("max_depth: ", max_depth)
+    x = np.asarray(x)
+
+    running_max = np.maximum.accumulate(x, axis=-1)
+    max_depth = np.max(running_max - x, axis=-1)
 
     if "plot_peaks" in kwargs:
-        if kwargs["plot_peaks"]:
-            # plotting only runs if our x is NOT constant.
+        if kwargs["plot_peaks"] and x.ndim == 1:
+            from matplotlib import pyplot as plt
+            from scipy.signal import find_peaks
+
+            # peaks/troughs are only determined for the visualization
+            peaks, _ = find_peaks(x)
+            lowzz, _ = find_peaks(-1 * x)
             plt.plot(x)
             plt.plot(peaks, x[peaks], "x")
             plt.plot(lowzz, x[lowzz], "o")
             plt.plot(np.zeros_like(x), "--", color="gray")
             plt.show()
 
+    if x.ndim == 1:
+        return float(max_depth)
     return max_depth
 
 
@@ -139,9 +145,10 @@ def number_to_day_hour(number, simulation_interval, start_of_week):
     return f"{days[day_index]} {hour:02d}:{minute:02d}"
 
 
-def process_results_and_return_plot(results, simulation_interval, start_of_week, electricity_prices,
-                                    evalResult: EvaluationResult, titlestring=""):
+def flow_sequences_from_results(results, fixed_sequences: dict = None) -> dict:
     '''
+    Extracts the flow sequences needed for the evaluation and the plots from the oemof results.
+
     :param results:
         After doing
             om.solve(..)
@@ -149,33 +156,94 @@ def process_results_and_return_plot(results, simulation_interval, start_of_week,
             my_energysystem.results["main"] = solph.processing.results(om),
         the value
             results = my_energysystem.results["main"]
-        can be passed to this function to plot some interesting info.
-    :@param start_of_week: Day where the simulation week starts: 0 for monday, 1 for tuesday, 6 for sunday.
-    :return:
+        can be passed to this function.
+    :param fixed_sequences: sequences (label -> array, same length as the returned sequences) of components that were
+        not built into the model because their flow is fixed by the input data (see simulation._topology), e.g. the
+        hydrogen bought at the market for a demand that can not be served locally. The main sequences that are neither
+        in the results nor in fixed_sequences are filled with zeros.
+    :return: dict with the label of the component (for the fuel cell and the storages: label and flow/content) as key
+    and the sequence (kW resp. kWh for the storage contents) as numpy array. Components that were not part of the
+    energy system (e.g. disabled electrolyzer) are missing in the dict.
     '''
+    if fixed_sequences is None:
+        fixed_sequences = {}
 
     # to address objects by their label, we convert the results dictionary so that the keys are changed to strings representing the labels
     # this is especially needed for the fuel cell to differentiate between the thermal and electrical output
     results = views.convert_keys_to_strings(results)
+    node_labels = {label for key in results for label in key if label is not None}
 
     # The last entry in the simulation result is always a weird "nan" entry; and the penultimate is 0 but as, for
     # some mathematical reason would get plotted at t=0 resulting in a weird horizontal line, we need to get rid of
     # this one as well.
-    buy_power = solph.views.node(results, 's_el_grid_buy')["sequences"].values[:-2, 0]
-    sell_power = -1 * solph.views.node(results, 's_el_grid_sell')["sequences"].values[:-2, 0]
-    industriepark_and_ac_consumption = -1 * solph.views.node(results, 'Electricity_Consumption_AC_Ges')[
-                                                "sequences"].values[
-                                            :-2, 0]
+    flow_sequences = {}
+    for label in ['s_el_grid_buy', 's_el_grid_sell', 'Electricity_Consumption_AC_Ges', 'Electricity_Consumption_DC_Ges',
+                  'Electricity_DC_Generation_Ges', 'Electricity_AC_Generation_Ges', 'H2_Consumption_Ges_350', 'H2_Consumption_Ges_700',
+                  's_h2_grid_buy_350', 's_h2_grid_buy_700', 's_save_heat']:
+        if label in node_labels:
+            flow_sequences[label] = solph.views.node(results, label)["sequences"].values[:-2, 0]
+        elif label in fixed_sequences:
+            flow_sequences[label] = np.asarray(fixed_sequences[label])
+        else:
+            flow_sequences[label] = np.zeros_like(flow_sequences['s_el_grid_buy'])
 
-    dc_consumption = -1 * solph.views.node(results, 'Electricity_Consumption_DC_Ges')["sequences"].values[:-2, 0]
+    # Elektrolysezelle
+    try:
+        flow_sequences['Elektrolysezelle'] = solph.views.node(results, 'Elektrolysezelle')["sequences"].values[:-2, 0]
+    except KeyError:
+        pass
+
+    #Brennstoffzelle
+    try:
+        flow_sequences['Brennstoffzelle_th'] = results[('Brennstoffzelle', 'thermal')]['sequences'].values[:-2, 0]
+        flow_sequences['Brennstoffzelle_el'] = results[('Brennstoffzelle', 'electricity_dc')]['sequences'].values[:-2, 0]
+        flow_sequences['Brennstoffzelle_in'] = results[('h2_30bar', 'Brennstoffzelle')]['sequences'].values[:-2, 0]
+    except KeyError:
+        pass
+
+    # Storage vom H2 Tank und Batteriespeicher
+    # siehe hier bei GenericStorage: https://oemof-solph.readthedocs.io/en/latest/usage.html
+    for storage_label in ['H2Tank', 'BatteryStorage']:
+        column_name = ((storage_label, 'None'), 'storage_content')
+        try:
+            flow_sequences[f'{storage_label}_storage_content'] = \
+                views.node(results, storage_label)['sequences'][column_name].values[:-2]
+        except KeyError:
+            pass
 
-    pv_power_ges = solph.views.node(results, 'Electricity_DC_Generation_Ges')["sequences"].values[:-2, 0]
+    # Komponenten der Auslegung, die nicht ins Modell aufgenommen wurden (kein Fluss möglich)
+    for label, sequence in fixed_sequences.items():
+        if label not in flow_sequences:
+            flow_sequences[label] = np.asarray(sequence)
 
-    fcev_consumption_350 = solph.views.node(results, 'H2_Consumption_Ges_350')["sequences"].values[:-2, 0] / 33.3
-    fcev_consumption_700 = solph.views.node(results, 'H2_Consumption_Ges_700')["sequences"].values[:-2, 0] / 33.3
+    return flow_sequences
+
+
+def process_results_and_return_plot(flow_sequences, simulation_interval, start_of_week, electricity_prices,
+                                    evalResult: EvaluationResult, titlestring=""):
+    '''
+    :param flow_sequences: The flow sequences of a simulation (see flow_sequences_from_results, resp. the key
+        "flow_sequences" in the dict returned by run_simulation) to plot some interesting info.
+    :@param start_of_week: Day where the simulation week starts: 0 for monday, 1 for tuesday, 6 for sunday.
+    :return:
+    '''
+    # plotly wird erst beim Plotten importiert (nicht bei jeder Auswertung)
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
 
-    buy_h2_power_350 = solph.views.node(results, 's_h2_grid_buy_350')["sequences"].values[:-2, 0]
-    buy_h2_power_700 = solph.views.node(results, 's_h2_grid_buy_700')["sequences"].values[:-2, 0]
+    buy_power = flow_sequences['s_el_grid_buy']
+    sell_power = -1 * flow_sequences['s_el_grid_sell']
+    industriepark_and_ac_consumption = -1 * flow_sequences['Electricity_Consumption_AC_Ges']
+
+    dc_consumption = -1 * flow_sequences['Electricity_Consumption_DC_Ges']
+
+    pv_power_ges = flow_sequences['Electricity_DC_Generation_Ges']
+
+    fcev_consumption_350 = flow_sequences['H2_Consumption_Ges_350'] / 33.3
+    fcev_consumption_700 = flow_sequences['H2_Consumption_Ges_700'] / 33.3
+
+    buy_h2_power_350 = flow_sequences['s_h2_grid_buy_350']
+    buy_h2_power_700 = flow_sequences['s_h2_grid_buy_700']
     buy_h2_power = (buy_h2_power_350 + buy_h2_power_700) / 33.3
 
     # Titles and colors for the first plot
@@ -196,51 +264,30 @@ def process_results_and_return_plot(results, simulation_interval, start_of_week,
         (buy_h2_power, "FCEV Extern (gesamter <br>Zukauf 350 und 700 bar)", 'cyan')
     ]
 
-    # todo besseres "error handling" hier um herauszufinden ob tatsächlich ein error, oder die Komponente tatsächlich deaktiviert war!
-    # todo die try Blöcke sind hier nur um zu verhindern dass das Programm abbricht, wenn eine Komponente nicht existiert
+    # Komponenten, die nicht Teil des Energiesystems waren, fehlen in den flow_sequences
 
     # Elektrolysezelle
-    try:
-        elektrolyseur_out = solph.views.node(results, 'Elektrolysezelle')["sequences"].values[:-2, 0]
-        titles_and_colors_2.append((elektrolyseur_out, "Elektrolyse (Ausgang)", 'green'))
-    except KeyError:
-        pass  #todo
+    if 'Elektrolysezelle' in flow_sequences:
+        titles_and_colors_2.append((flow_sequences['Elektrolysezelle'], "Elektrolyse (Ausgang)", 'green'))
 
     #Brennstoffzelle
-    try:
-        bz_th = results[('Brennstoffzelle', 'thermal')]['sequences'].values[:-2, 0]
-        bz_el = results[('Brennstoffzelle', 'electricity_dc')]['sequences'].values[:-2, 0]
-        bz_in = results[('h2_30bar', 'Brennstoffzelle')]['sequences'].values[:-2, 0]
-
+    if 'Brennstoffzelle_el' in flow_sequences:
         bzarr = [
-            (bz_el, "Fuel Cell (elektr. Ausgang)", 'brown'),
-            (bz_th, "Fuel Cell (therm. Ausgang)", 'black'),
-            (bz_in, "Fuel Cell (Eingang)", 'magenta')
+            (flow_sequences['Brennstoffzelle_el'], "Fuel Cell (elektr. Ausgang)", 'brown'),
+            (flow_sequences['Brennstoffzelle_th'], "Fuel Cell (therm. Ausgang)", 'black'),
+            (flow_sequences['Brennstoffzelle_in'], "Fuel Cell (Eingang)", 'magenta')
         ]
         titles_and_colors_2.extend(bzarr)
-    except KeyError:
-        pass  #todo
 
     # Storage vom H2 Tank
-    # siehe hier bei GenericStorage: https://oemof-solph.readthedocs.io/en/latest/usage.html
-    column_name = (('H2Tank', 'None'), 'storage_content')
     tank_fuellstand_kg = None  # Need to initialize it here as I do a "if var is tank_fuellstand_kg" check later
-    try:
-        SC = views.node(results, 'H2Tank')['sequences'][column_name]
-        tank_fuellstand_kg = SC.values[
-                             :-2] / 33.3  # 33.3 kWh pro kg H2 # TODO dynamische eingabe (wie mit der CONV_RATE_kWh_to_kg_H2 in der generators.py), auch oben
+    if 'H2Tank_storage_content' in flow_sequences:
+        tank_fuellstand_kg = flow_sequences['H2Tank_storage_content'] / 33.3  # 33.3 kWh pro kg H2 # TODO dynamische eingabe (wie mit der CONV_RATE_kWh_to_kg_H2 in der generators.py), auch oben
         titles_and_colors_2.append((tank_fuellstand_kg, "Füllstand H2-Tank", 'blue'))
-    except KeyError:
-        pass  #todo
 
     # analog fuer den Batteriespeicher
-    column_name = (('BatteryStorage', 'None'), 'storage_content')
-    try:
-        SC = views.node(results, 'BatteryStorage')['sequences'][column_name]
-        batterie_kwhs = SC.values[:-2]
-        titles_and_colors_2.append((batterie_kwhs, "Ladezustand Batterie", 'red'))
-    except KeyError:
-        batterie_kwhs = None
+    if 'BatteryStorage_storage_content' in flow_sequences:
+        titles_and_colors_2.append((flow_sequences['BatteryStorage_storage_content'], "Ladezustand Batterie", 'red'))
 
     # Create subplots with shared x-axis
     fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.1,
@@ -490,3 +537,84 @@ def resample_time_series_and_extract_values_for_oemof(series: pd.Series, freq_in
         values = resampled_series.values
 
     return values
+
+
+def map_time_series_to_calendar(series: pd.Series, calendar: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Maps a time series that covers (about) a whole year onto the given calendar (a DatetimeIndex covering one
+    calendar year in the base simulation interval). The values are matched by month, day and time of day, so that e.g.
+    a spot market price series from 09/2023 to 08/2024 can be used together with load data from 2023. If the series is
+    finer than the calendar, it is first averaged over each calendar interval (left-labelled, like typical_week), so that
+    no energy is lost. Missing values and intermediate time steps (coarser series) are interpolated linearly in time,
+    values of February 29th are dropped if the calendar year is not a leap year.
+
+    :param series: pandas series with datetime index (may be unsorted, may contain NaN values)
+    :param calendar: the target index, all timestamps must lie in the same year
+    :return: numpy array with one value for each timestamp of the calendar
+    """
+    series = series.copy()
+    if series.index.tz is not None:
+        series.index = series.index.tz_localize(None)
+
+    year = calendar[0].year
+    is_leap_day = (series.index.month == 2) & (series.index.day == 29)
+    if not calendar.is_leap_year[0]:
+        series = series[~is_leap_day]
+
+    series.index = pd.to_datetime({"year": year,
+                                   "month": series.index.month,
+                                   "day": series.index.day,
+                                   "hour": series.index.hour,
+                                   "minute": series.index.minute})
+    series = series.sort_index()
+    # e.g. the doubled hour when switching from summer to winter time
+    series = series.groupby(level=0).mean()
+
+    # finer than the calendar (e.g. 15 min values for a 60 min calendar): mean over each calendar interval instead of
+    # sampling the value at the calendar timestamp
+    calendar_step = calendar[1] - calendar[0]
+    if len(series) > 1 and series.index.to_series().diff().median() < calendar_step:
+        series = series.resample(calendar_step, origin=calendar[0], label='left', closed='left').mean()
+
+    combined_index = series.index.union(calendar)
+    mapped = series.reindex(combined_index).interpolate(method='time').reindex(calendar)
+
+    # values before the first / after the last entry of the input (e.g. if the input starts at 0:15) are extended
+    return mapped.ffill().bfill().values
+
+
+def split_into_weeks(year_values: np.ndarray, calendar: pd.DatetimeIndex, start_of_week: int) -> list[tuple[pd.Timestamp, np.ndarray]]:
+    """
+    Splits a whole year time series into the real weeks of the year in the format used for the simulation of the typical
+    weeks (7 days, closed interval -> 0:00 of the first day of the following week as last element).
+
+    :param year_values: values for each timestamp of the calendar
+    :param calendar: DatetimeIndex (one calendar year in the base simulation interval)
+    :param start_of_week: Day where the simulation week starts: 0 for monday, 1 for tuesday, 6 for sunday.
+    :return: list of 2-tuples (first timestamp of the week, values of the week). Only complete weeks are returned.
+    """
+    return split_into_periods(year_values, calendar, period_days=7, start_of_week=start_of_week)
+
+
+def split_into_periods(year_values: np.ndarray, calendar: pd.DatetimeIndex, period_days: int,
+                       start_of_week: int = 0) -> list[tuple[pd.Timestamp, np.ndarray]]:
+    """
+    Like split_into_weeks, but for periods of any number of whole days (closed interval, i.e. 0:00 of the day after the
+    period as last element). Periods of whole weeks start on start_of_week, all others at the first 0:00 of the
+    calendar.
+
+    :return: list of 2-tuples (first timestamp of the period, values of the period). Only complete periods are returned.
+    """
+    steps_per_day = int(pd.Timedelta(days=1) / (calendar[1] - calendar[0]))
+    period_length = period_days * steps_per_day + 1
+
+    is_midnight = (calendar.hour == 0) & (calendar.minute == 0)
+    if period_days % 7 == 0:
+        is_midnight &= (calendar.weekday == start_of_week)
+    first_day_idx = np.nonzero(is_midnight)[0][0]
+
+    periods = []
+    for period_start in range(first_day_idx, len(calendar) - period_length + 1, period_days * steps_per_day):
+        periods.append((calendar[period_start], year_values[period_start:period_start + period_length]))
+
+    return periods
@@ -0,0 +1,342 @@
+'''
+
+Zeitmessung und Zähler für die einzelnen Schritte der Auswertung (Aufbereitung, Aufbau des Energiesystems, Aufbau des
+Pyomo-Modells, CBC, Auswertung der Ergebnisse, TCO), um gezielt zu optimieren und Verschlechterungen zu erkennen.
+
+    from h2pp import instrumentation
+
+    with instrumentation.collect() as timings:
+        optimize_h2pp(config_file_full_path, mode="power_grid_only_ref")
+    print(timings.table())
+    timings.to_json("timings.json")
+
+Je Schritt werden Anzahl, Summe, Mittelwert, Median (p50) und 95%-Quantil (p95) der Dauer in Sekunden erfasst, je Zähler
+die Summe. Ohne aktives collect() kehren stage, timed, record und count sofort zurück (eine Abfrage einer ContextVar), die
+Messpunkte können daher dauerhaft im Code bleiben.
+
+Die aktive Messung gilt je Kontext (contextvars): Threads (bspw. die Verbindungen des Dienstes in worker_pool.py) messen
+nur in ihr eigenes collect(). Aufgaben an Prozesspools werden mit in_worker verpackt; sie messen im Worker-Prozess und
+geben ihre Timings mit dem Ergebnis zurück, from_worker übernimmt sie in die Messung des Aufrufers (Perioden in
+eval_scenario, Punkte in sweep.py, worker_pool.py, rolling_horizon.py). Die Summen der Dauern enthalten dann die Zeit
+aller Prozesse und können größer als die Laufzeit sein.
+
+Namen der Schritte: "<Bereich>.<Schritt>", bspw. "simulation.solve" oder "prep.generators".
+
+Für Details bis auf Funktionsebene (bspw. Pyomo-Ausdrücke oder pandas-Resampling) zeichnet profile() einen Lauf mit
+cProfile und einem Sampler für Aufrufstapel auf:
+
+    with instrumentation.profile("profile/lauf"):
+        optimize_h2pp(config_file_full_path)          # bzw. optimize_h2pp(..., profile_path="profile/lauf")
+
+Geschrieben werden profile/lauf.prof (cProfile, bspw. für snakeviz oder pstats) und profile/lauf.collapsed (ein
+Aufrufstapel je Zeile mit Anzahl der Stichproben, für flamegraph.pl oder speedscope). Aufgaben, die während der
+Aufzeichnung an Prozesspools übergeben werden (siehe in_worker), schreiben je Prozess worker_<pid>.prof und
+worker_<pid>.collapsed in dasselbe Verzeichnis.
+
+'''
+
+import collections
+import contextlib
+import contextvars
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Aktive Messung des aktuellen Kontexts (None: Messung ausgeschaltet)
+_active: contextvars.ContextVar[Optional["Timings"]] = contextvars.ContextVar("h2pp_timings", default=None)
+
+_DISABLED = contextlib.nullcontext()
+
+# Abstand der Stichproben des Samplers in s
+SAMPLING_INTERVAL_S = 0.005
+
+# Verzeichnis der aktiven Aufzeichnung dieses Prozesses (None: keine Aufzeichnung, siehe profile)
+_profile_directory: Optional[str] = None
+
+# Aufzeichnungen in Worker-Prozessen: Verzeichnis -> _Profiler (siehe _ProfiledTask)
+_worker_profilers: Dict[str, "_Profiler"] = {}
+
+
+class Timings:
+    """
+    Ergebnis einer Messung: Dauern je Schritt und Zähler.
+    """
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+
+    def record(self, name: str, seconds: float):
+        self.durations.setdefault(name, []).append(seconds)
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other: "Timings"):
+        """
+        Übernimmt die Dauern und Zähler einer anderen Messung (bspw. aus einem Worker-Prozess, siehe from_worker).
+        """
+        for name, durations in other.durations.items():
+            self.durations.setdefault(name, []).extend(durations)
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+    def summary(self) -> Dict:
+        """
+        @return: dict mit "stages" (Name -> count, total_s, mean_s, p50_s, p95_s) und "counters" (Name -> Summe)
+        """
+        stages = {}
+        for name, durations in self.durations.items():
+            durations = np.asarray(durations)
+            stages[name] = {"count": len(durations),
+                            "total_s": float(durations.sum()),
+                            "mean_s": float(durations.mean()),
+                            "p50_s": float(np.percentile(durations, 50)),
+                            "p95_s": float(np.percentile(durations, 95))}
+        return {"stages": stages, "counters": dict(self.counters)}
+
+    def table(self) -> pd.DataFrame:
+        """
+        @return: DataFrame mit einer Zeile je Schritt (count, total_s, mean_s, p50_s, p95_s), absteigend nach total_s
+        """
+        table = pd.DataFrame.from_dict(self.summary()["stages"], orient="index",
+                                       columns=["count", "total_s", "mean_s", "p50_s", "p95_s"])
+        table.index.name = "stage"
+        return table.sort_values("total_s", ascending=False)
+
+    def to_json(self, path: str = None) -> str:
+        """
+        @param path: Datei, in die geschrieben wird (optional)
+        @return: summary() als JSON-String
+        """
+        text = json.dumps(self.summary(), indent=2)
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(text)
+        return text
+
+
+class _Stage:
+    # Kontextmanager für einen Schritt einer aktiven Messung
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings: Timings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timings.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+@contextlib.contextmanager
+def collect():
+    """
+    Schaltet die Messung für die Dauer des with-Blocks ein (verschachtelte Aufrufe messen jeweils nur ihren Block).
+
+    @return: Timings (Kontextmanager)
+    """
+    timings = Timings()
+    token = _active.set(timings)
+    try:
+        yield timings
+    finally:
+        _active.reset(token)
+
+
+def stage(name: str):
+    """
+    Misst die Dauer des with-Blocks als Schritt name (ohne aktive Messung ohne Wirkung).
+    """
+    timings = _active.get()
+    if timings is None:
+        return _DISABLED
+    return _Stage(timings, name)
+
+
+def timed(name: str):
+    """
+    Decorator: misst jeden Aufruf der Funktion als Schritt name.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            timings = _active.get()
+            if timings is None:
+                return function(*args, **kwargs)
+            with _Stage(timings, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(name: str, start: float):
+    """
+    Erfasst die Dauer seit start (time.perf_counter()) als Schritt name. Für längere Abschnitte, die nicht in einen
+    with-Block eingerückt werden sollen.
+    """
+    timings = _active.get()
+    if timings is not None:
+        timings.record(name, time.perf_counter() - start)
+
+
+def count(name: str, n: int = 1):
+    """
+    Erhöht den Zähler name um n.
+    """
+    timings = _active.get()
+    if timings is not None:
+        timings.count(name, n)
+
+
+class _Profiler:
+    # cProfile und Sampler für die Aufrufstapel des aufrufenden Threads; start/stop können mehrfach aufgerufen werden,
+    # write schreibt jeweils die Summe aller bisherigen Abschnitte
+    def __init__(self, path_prefix: str):
+        self.path_prefix = path_prefix
+        self.profile = cProfile.Profile()
+        self.stacks = collections.Counter()
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        thread_id = threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, args=(thread_id,), daemon=True)
+        self._sampler.start()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self._stop.set()
+        self._sampler.join()
+
+    def _sample(self, thread_id):
+        while not self._stop.wait(SAMPLING_INTERVAL_S):
+            frame = sys._current_frames().get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self):
+        self.profile.dump_stats(self.path_prefix + ".prof")
+        with open(self.path_prefix + ".collapsed", "w", encoding="utf-8") as file:
+            for stack, samples in self.stacks.items():
+                file.write(f"{stack} {samples}\n")
+
+
+@contextlib.contextmanager
+def profile(path_prefix: str = None):
+    """
+    Zeichnet den with-Block mit cProfile und dem Sampler auf und schreibt <path_prefix>.prof und
+    <path_prefix>.collapsed (siehe Modulbeschreibung). Ohne path_prefix oder innerhalb einer anderen Aufzeichnung ohne
+    Wirkung.
+
+    @param path_prefix: Pfad ohne Endung; das Verzeichnis wird bei Bedarf erstellt
+    """
+    global _profile_directory
+    if path_prefix is None or _profile_directory is not None:
+        yield
+        return
+
+    directory = os.path.dirname(os.path.abspath(path_prefix))
+    os.makedirs(directory, exist_ok=True)
+    profiler = _Profiler(path_prefix)
+    _profile_directory = directory
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        _profile_directory = None
+        profiler.write()
+        print(f"Profil gespeichert: {path_prefix}.prof, {path_prefix}.collapsed")
+
+
+def profiled(function):
+    """
+    Decorator: die Funktion erhält den zusätzlichen optionalen Parameter profile_path; ist er angegeben, wird der Aufruf
+    aufgezeichnet (siehe profile).
+    """
+    @functools.wraps(function)
+    def wrapper(*args, profile_path: str = None, **kwargs):
+        if profile_path is None:
+            return function(*args, **kwargs)
+        with profile(profile_path):
+            return function(*args, **kwargs)
+    return wrapper
+
+
+class _WorkerResult:
+    # Ergebnis einer Aufgabe mit den im Worker gemessenen Timings (siehe from_worker)
+    def __init__(self, value, timings: Optional[Timings]):
+        self.value = value
+        self.timings = timings
+
+
+class _WorkerTask:
+    # Aufgabe für einen Prozesspool, die im Worker aufgezeichnet (directory) bzw. gemessen wird (muss auf Modulebene
+    # liegen, damit sie an die Prozesse übergeben werden kann)
+    def __init__(self, fn, directory: Optional[str], collect_timings: bool):
+        self.fn = fn
+        self.directory = directory
+        self.collect_timings = collect_timings
+
+    def __call__(self, *args):
+        with contextlib.ExitStack() as stack:
+            if self.directory is not None:
+                profiler = _worker_profilers.get(self.directory)
+                if profiler is None:
+                    profiler = _worker_profilers[self.directory] = _Profiler(
+                        os.path.join(self.directory, f"worker_{os.getpid()}"))
+                profiler.start()
+                stack.callback(profiler.write)
+                stack.callback(profiler.stop)
+            if not self.collect_timings:
+                return self.fn(*args)
+            with collect() as timings:
+                value = self.fn(*args)
+            return _WorkerResult(value, timings)
+
+
+def in_worker(fn):
+    """
+    Für Aufgaben an Prozesspools: während einer Aufzeichnung (profile) wird fn so verpackt, dass jeder Worker-Prozess
+    seine Aufgaben in worker_<pid>.prof/.collapsed im Verzeichnis der Aufzeichnung schreibt; während einer Messung
+    (collect) misst der Worker die Aufgabe und gibt seine Timings mit dem Ergebnis zurück. Die Ergebnisse müssen dann mit
+    from_worker ausgepackt werden. Sonst wird fn unverändert zurückgegeben.
+    """
+    collect_timings = _active.get() is not None
+    if _profile_directory is None and not collect_timings:
+        return fn
+    return _WorkerTask(fn, _profile_directory, collect_timings)
+
+
+def from_worker(value):
+    """
+    Packt das Ergebnis einer mit in_worker verpackten Aufgabe aus und übernimmt die Timings des Workers in die aktive
+    Messung (einmal je Ergebnis, auch wenn es mehrfach ausgepackt wird). Andere Werte werden unverändert zurückgegeben.
+    """
+    if not isinstance(value, _WorkerResult):
+        return value
+    worker_timings, value.timings = value.timings, None
+    timings = _active.get()
+    if worker_timings is not None and timings is not None:
+        timings.merge(worker_timings)
+    return value.value
@@ -6,27 +6,35 @@ Accelera: Final_FuelCellPowerSystems-SpecSheet_March24.pdf. März 2024. url: htt
 
 """
 
+import copy
 import json
 import math
 import os
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, Literal
+from typing import TYPE_CHECKING, Dict, List, Literal, Tuple
 
 import numpy as np
+import pandas as pd
 from oemof import solph
 from pymoo.core.problem import ElementwiseProblem
 from pymoo.core.variable import Binary
-from pymoo.core.mixed import MixedVariableGA
 from pymoo.core.variable import Real
-from pymoo.optimize import minimize
 
 import h2pp.generators
-from h2pp import helperFunctions, strompreise, tco
+from h2pp import helperFunctions, instrumentation, periods, strompreise, tco
 from h2pp.generators import Jahreszeit
 from h2pp.helperFunctions import EvaluationResult
-from h2pp.simulation import run_simulation
-import plotly.graph_objects as go
+from h2pp.dispatch import simulate, battery_dispatch_dp, is_battery_only_topology, dispatch_method
+from h2pp.screening import screen_design, penalty_objective
+from h2pp.shared_config import SharedConfigHandle, attach_config, share_config
+
+# Der genetische Algorithmus (pymoo.core.mixed, pymoo.optimize), scipy.stats und plotly werden erst in den Funktionen
+# importiert, die sie benötigen: Prozesse, die nur Szenarien auswerten (eval_scenario), laden sie nicht.
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 
 @dataclass(
@@ -53,6 +61,7 @@ class OpexParameters:
     total_revenue_electricity_sell: float
 
 
+@instrumentation.timed("calculate_tco")
 def calculate_tco(capex_params: CapexParameters, opex_params: Dict[int, OpexParameters]) -> tco.TCO:
 
     """
@@ -475,13 +484,161 @@ class H2PP_Standard_MixedVariableProblem(ElementwiseProblem):
         m_tank = self._retrieve_parameter_set(X)["m_tank"]
         compress_before_storing = self._retrieve_parameter_set(X)["compress_before_storing"]
 
+        # Analytische Vorprüfung (siehe screening.py): unzulässige Entwürfe erhalten einen Strafwert, statt CBC
+        # erst die Unzulässigkeit feststellen zu lassen
+        if self.sim_config_dict.get("screen_designs", True):
+            screening_result = screen_design(p_el, p_fc, m_tank, compress_before_storing, c_battery=None,
+                                             sim_config_dict=self.sim_config_dict)
+            for flag in screening_result.flags:
+                warnings.warn(flag)
+            if not screening_result.feasible:
+                warnings.warn(f"Design rejected by screening (P_EL={p_el}, P_FC={p_fc}, m_tank={m_tank}): "
+                              + " ".join(screening_result.reasons))
+                out["F"] = penalty_objective(screening_result)
+                return
+
         tco_obj = eval_scenario(p_el, p_fc, m_tank, compress_before_storing, c_battery=None,
                                 sim_config_dict=self.sim_config_dict).tco
 
         out["F"] = tco_obj.npv_total
 
 
-def get_optimum_for_battery_refcase_only(sim_config_dict, **kwargs) -> (float, tco.TCO):
+def coarsen_sim_config_dict(sim_config_dict: Dict, interval_in_min: int) -> Dict:
+    """
+    Erzeugt aus einer aufbereiteten Konfiguration (prep_sim_config_dict) eine Kopie mit gröberer Schrittweite der
+    Simulation, bspw. für die Exploration in multi_fidelity_minimize. Die Zeitreihen aller Jahreszeiten bzw. Perioden
+    werden über die Intervalle der neuen Schrittweite gemittelt (Leistungen und Preise), der letzte Wert des
+    geschlossenen Intervalls (0:00 Uhr des Folgetages) wird übernommen. Die Abschätzungen von Jahresbedarf und
+    Spitzenlast bleiben die der ursprünglichen Schrittweite.
+
+    @param interval_in_min: neue Schrittweite in min, muss ein Vielfaches der bisherigen Schrittweite und ein Teiler von
+        24*60 min sein
+    @return: die neue Konfiguration (das übergebene dict wird nicht verändert)
+    """
+    freq_in_min = sim_config_dict["base_sim_interval"]
+    if interval_in_min % freq_in_min != 0 or (24 * 60) % interval_in_min != 0:
+        raise ValueError(f"The coarse interval {interval_in_min} min must be a multiple of the base simulation interval "
+                         f"{freq_in_min} min and a divisor of 24*60 minutes!")
+
+    factor = interval_in_min // freq_in_min
+    coarse_config = dict(sim_config_dict)
+    coarse_config["base_sim_interval"] = interval_in_min
+    for key in SIM_CONFIG_TS_KEYS:
+        coarse_config[key] = {}
+        for period_name, ts in sim_config_dict[key].items():
+            ts = np.asarray(ts, dtype=float)
+            coarse_config[key][period_name] = np.append(ts[:-1].reshape(-1, factor).mean(axis=1), ts[-1])
+
+    return coarse_config
+
+
+def _evaluate_design(problem: ElementwiseProblem, X) -> float:
+    out = {}
+    problem._evaluate(X, out)
+    return out["F"]
+
+
+def _local_refinement(problem: ElementwiseProblem, X: Dict, F: float, max_evals: int, initial_step: float = 0.1,
+                      min_step: float = 0.01, verbose=False):
+    """
+    Einfache Mustersuche (compass search) um einen Entwurf: jede kontinuierliche Variable wird um +/- step (Anteil der
+    Bandbreite ihrer Grenzen) verschoben; bei einer Verbesserung wird diese übernommen, sonst die Schrittweite
+    halbiert. Binäre Variablen bleiben unverändert.
+
+    @return: 3-Tupel: bester Entwurf, zugehöriger Zielfunktionswert, Anzahl der Auswertungen
+    """
+    real_vars = {name: var for name, var in problem.vars.items() if isinstance(var, Real)}
+    step = initial_step
+    n_evals = 0
+    while n_evals < max_evals and step >= min_step and real_vars:
+        improved = False
+        for name, var in real_vars.items():
+            lower, upper = var.bounds
+            for direction in [1, -1]:
+                if n_evals >= max_evals:
+                    break
+                candidate = {**X, name: float(np.clip(X[name] + direction * step * (upper - lower), lower, upper))}
+                if candidate[name] == X[name]:
+                    continue
+                candidate_F = _evaluate_design(problem, candidate)
+                n_evals += 1
+                if candidate_F < F:
+                    X, F, improved = candidate, candidate_F, True
+                    if verbose:
+                        print(f"Lokale Verfeinerung: {X} -> {F}")
+                    break
+        if not improved:
+            step /= 2
+
+    return X, F, n_evals
+
+
+def multi_fidelity_minimize(sim_config_dict: Dict, coarse_interval_in_min: int, top_k: int = 5,
+                            refinement_evals: int = 20, pop_size=50, n_gen=100, seed=1, verbose=True):
+    """
+    Multi-Fidelity-Optimierung für den Modus "normal" von optimize_h2pp: Der genetische Algorithmus exploriert den
+    Entwurfsraum mit der groben Schrittweite coarse_interval_in_min (coarsen_sim_config_dict, kleinere LPs). Die top_k
+    besten unterschiedlichen Entwürfe der letzten Population werden mit der Schrittweite der Konfiguration erneut bewertet
+    und der beste davon lokal verfeinert (_local_refinement, max. refinement_evals Auswertungen).
+
+    @return: 2-Tupel: bester Entwurf (dict der Optimierungsvariablen, wie res.X) und Bericht (dict) mit den
+    Zielfunktionswerten der Kandidaten bei grober und feiner Schrittweite ('candidates'), der beobachteten Abweichung
+    (relative Differenz fein/grob: 'fidelity_gap_mean', 'fidelity_gap_max'), der Rangkorrelation nach Spearman zwischen
+    beiden Schrittweiten ('rank_correlation', None bei weniger als 2 Kandidaten) sowie 'F' und 'design' (p_el, p_fc,
+    m_tank, compress_before_storing) des besten Entwurfs und 'n_evals_coarse' / 'n_evals_fine'.
+    """
+    import scipy.stats
+    from pymoo.core.mixed import MixedVariableGA
+    from pymoo.optimize import minimize
+
+    fine_problem = H2PP_Standard_MixedVariableProblem(sim_config_dict=sim_config_dict)
+    coarse_problem = H2PP_Standard_MixedVariableProblem(
+        sim_config_dict=coarsen_sim_config_dict(sim_config_dict, coarse_interval_in_min))
+
+    res = minimize(coarse_problem,
+                   MixedVariableGA(pop_size=pop_size),
+                   ('n_gen', n_gen),
+                   seed=seed,
+                   verbose=verbose)
+
+    # Top-k unterschiedliche Entwürfe der letzten Population
+    candidates = []
+    for X, F in sorted(zip(res.pop.get("X"), res.pop.get("F")[:, 0]), key=lambda candidate: candidate[1]):
+        if any(X == other_X for other_X, _ in candidates):
+            continue
+        candidates.append((X, F))
+        if len(candidates) == top_k:
+            break
+
+    fine_F = [_evaluate_design(fine_problem, X) for X, _ in candidates]
+    coarse_F = np.array([F for _, F in candidates])
+    relative_gap = (np.array(fine_F) - coarse_F) / np.abs(np.array(fine_F))
+    rank_correlation = scipy.stats.spearmanr(coarse_F, fine_F)[0] if len(candidates) > 1 else None
+
+    best_idx = int(np.argmin(fine_F))
+    best_X, best_F, n_refinement_evals = _local_refinement(fine_problem, candidates[best_idx][0], fine_F[best_idx],
+                                                           max_evals=refinement_evals, verbose=verbose)
+
+    report = {
+        "candidates": [{"X": X, "F_coarse": F, "F_fine": F_fine} for (X, F), F_fine in zip(candidates, fine_F)],
+        "fidelity_gap_mean": float(np.mean(np.abs(relative_gap))),
+        "fidelity_gap_max": float(np.max(np.abs(relative_gap))),
+        "rank_correlation": rank_correlation,
+        "F": best_F,
+        "design": fine_problem._retrieve_parameter_set(best_X),
+        "n_evals_coarse": res.algorithm.evaluator.n_eval,
+        "n_evals_fine": len(candidates) + n_refinement_evals,
+    }
+
+    if verbose:
+        print(f"Multi-Fidelity ({coarse_interval_in_min} min / {sim_config_dict['base_sim_interval']} min): "
+              f"relative Abweichung der Top-{len(candidates)} im Mittel {report['fidelity_gap_mean']:.2%}, "
+              f"max. {report['fidelity_gap_max']:.2%}, Rangkorrelation {rank_correlation}")
+
+    return best_X, report
+
+
+def get_optimum_for_battery_refcase_only(sim_config_dict, print_progress=True, **kwargs) -> (float, tco.TCO):
     # As the battery ref case only has the battery capacity as a variable, we just take some values in the given interval,
     # evaluate them and return the best one.
 
@@ -509,32 +666,66 @@ def get_optimum_for_battery_refcase_only(sim_config_dict, **kwargs) -> (float, t
         capacities_to_evaluate = np.linspace(sim_config_dict["battery"]["min_capacity"],
                                              sim_config_dict["battery"]["max_capacity"], 10)
 
+    # Mit "dispatch_method": "dp" werden alle Kapazitäten je Periode in einem Durchlauf der dynamischen
+    # Programmierung simuliert (siehe dispatch.py), sonst einzeln im LP
+    sim_results_per_capacity = [None] * len(capacities_to_evaluate)
+    if dispatch_method(sim_config_dict) == "dp" and is_battery_only_topology(sim_config_dict):
+        results_per_period = {period.name: battery_dispatch_dp(sim_config_dict, period, capacities_to_evaluate)
+                              for period, _ in periods.simulation_periods(sim_config_dict)}
+        sim_results_per_capacity = [{name: results[i] for name, results in results_per_period.items()}
+                                    for i in range(len(capacities_to_evaluate))]
+
     best_npv = np.inf  # Storing the current best found npv value
     best_eval_res = None  # TCO object corresponding to the best found npv value
     best_capacity = None  # Capacity corresponding to the best found npv value
-    for capacity in capacities_to_evaluate:
+    for capacity, sim_results_per_period in zip(capacities_to_evaluate, sim_results_per_capacity):
         eval_res = eval_scenario(p_el=None, p_fc=None, m_tank=None, compress_before_storing=False, c_battery=capacity,
-                                sim_config_dict=sim_config_dict, **kwargs)
+                                 sim_config_dict=sim_config_dict, sim_results_per_period=sim_results_per_period,
+                                 **kwargs)
         tco_obj = eval_res.tco
-        print(capacity, tco_obj.npv_total)
+        if print_progress:
+            print(capacity, tco_obj.npv_total)
 
         if tco_obj.npv_total < best_npv:
             best_npv = tco_obj.npv_total
             best_capacity = capacity
             best_eval_res = eval_res
 
-    print(best_capacity, best_eval_res.tco.npv_total)
+    if print_progress:
+        print(best_capacity, best_eval_res.tco.npv_total)
 
     return best_capacity, best_eval_res
 
 
-def eval_scenario(p_el, p_fc, m_tank, compress_before_storing, c_battery, sim_config_dict, verbose=False) -> EvaluationResult:
+def _simulate_period_worker(task):
+    """
+    Worker für die parallele Simulation der Perioden in eval_scenario (muss auf Modulebene liegen, damit er an die
+    Prozesse übergeben werden kann).
+    """
+    sim_config_dict, period, sim_kwargs = task
+    if isinstance(sim_config_dict, SharedConfigHandle):
+        sim_config_dict = attach_config(sim_config_dict)
+    sim_results = simulate(sim_config_dict=sim_config_dict, jahreszeit=period, **sim_kwargs)
+    # Die oemof-Ergebnisse lassen sich nicht zwischen Prozessen übertragen (und werden in eval_scenario nicht benötigt)
+    sim_results["sim_results"] = None
+    return sim_results
+
+
+@instrumentation.profiled
+@instrumentation.timed("eval_scenario")
+def eval_scenario(p_el, p_fc, m_tank, compress_before_storing, c_battery, sim_config_dict, verbose=False,
+                  sim_results_per_period: Dict[str, dict] = None) -> EvaluationResult:
     # Wieso wird die config_file_path übergeben und nicht das JSON selbst? => brauchen ggfs. relative Pfadangaben die in der JSON spezifiert sind, müssen also wissen wo das Root ist
+    # sim_results_per_period: optional bereits berechnete Simulationsergebnisse je Periode (Name der Jahreszeit bzw.
+    # Periode -> Dict wie von simulate zurückgegeben, bspw. aus battery_dispatch_dp für mehrere Kapazitäten
+    # gleichzeitig), dann wird nicht simuliert
+    # profile_path: optional Pfad ohne Endung, um den Aufruf mit cProfile und Sampler aufzuzeichnen (siehe
+    # instrumentation.profile)
 
     dict_sim_opex_results: Dict[
         int, OpexParameters] = {}  # dict with the years as the keys and the OpexParameters as the values
 
-    # For each year: Sommer, Winter, Übergang berechnet und zusammengezählt
+    # For each year: Sommer, Winter, Übergang (bzw. die repräsentativen Perioden, s. periods.py) berechnet und zusammengezählt
     total_cost_electricity_buy_spot_sum_only = 0
     total_cost_h2_buy = 0
     total_revenue_heat_sell = 0
@@ -545,30 +736,49 @@ def eval_scenario(p_el, p_fc, m_tank, compress_before_storing, c_battery, sim_co
     total_energy_bought_year_kWh = 0
     total_cost_electricity_buy = 0
 
-    for jahreszeit in [Jahreszeit.SOMMER, Jahreszeit.UEBERGANG, Jahreszeit.WINTER]:
-        sim_results = run_simulation(sim_config_dict=sim_config_dict, jahreszeit=jahreszeit, p_el=p_el, p_fc=p_fc,
-                                     m_tank=m_tank, compress_before_storing=compress_before_storing,
-                                     c_battery=c_battery, verbose=verbose)
-
-        # Zuordnung der Anzahl Tage derzeit statisch basierend auf der Zuteilung wie ich es überall anders auch habe.
-        months = h2pp.generators.typical_months(jahreszeit)
-        num_weeks = helperFunctions.sum_days_in_months(months) / 7
-
-        # Bestimmung der bezogenen Energiemengen aus dem Simulationsresultat; Skalierung auf den Zeitraum und Berechnung Energiekosten
+    simulation_periods = periods.simulation_periods(sim_config_dict)
+
+    # Die Perioden sind unabhängig voneinander und können parallel simuliert werden
+    if sim_results_per_period is None:
+        sim_kwargs = dict(p_el=p_el, p_fc=p_fc, m_tank=m_tank, compress_before_storing=compress_before_storing,
+                          c_battery=c_battery, verbose=verbose)
+        tasks = [(sim_config_dict, period, sim_kwargs) for period, _ in simulation_periods]
+        max_workers = sim_config_dict.get("max_workers_periods", 1)
+        instrumentation.count("eval_scenario.simulated_periods", len(tasks))
+        with instrumentation.stage("eval_scenario.simulate_periods"):
+            if max_workers == 1 or len(tasks) == 1:
+                period_results = [_simulate_period_worker(task) for task in tasks]
+            else:
+                # Die Zeitreihen werden einmal in gemeinsamen Speicher kopiert statt für jede Periode gepickelt
+                with share_config(sim_config_dict) as handle, ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    period_results = [instrumentation.from_worker(sim_results) for sim_results in executor.map(
+                        instrumentation.in_worker(_simulate_period_worker),
+                        [(handle, period, sim_kwargs) for _, period, _ in tasks])]
+        sim_results_per_period = {period.name: sim_results
+                                  for (period, _), sim_results in zip(simulation_periods, period_results)}
+
+    solver_statistics = {}
+    for period, num_periods in simulation_periods:
+        sim_results = sim_results_per_period[period.name]
+        if sim_results.get("solver_statistics") is not None:
+            solver_statistics[period.name] = sim_results["solver_statistics"]
+
+        # Bestimmung der bezogenen Energiemengen aus dem Simulationsresultat; Skalierung auf den Zeitraum (Anzahl
+        # Wiederholungen der Periode im Jahr) und Berechnung Energiekosten
         # Für Stromkosten Kauf hier zunächst nur Anteil Börsenpreis addiert, Rest wird unten addiert
-        electricity_buy_sequence_kW = solph.views.node(sim_results["sim_results"], 's_el_grid_buy')["sequences"].values[:-2, 0]
-        total_energy_bought_year_kWh += sum(electricity_buy_sequence_kW) * (sim_config_dict["base_sim_interval"] / 60) * num_weeks # kWh
+        electricity_buy_sequence_kW = sim_results["flow_sequences"]['s_el_grid_buy']
+        total_energy_bought_year_kWh += sum(electricity_buy_sequence_kW) * (sim_config_dict["base_sim_interval"] / 60) * num_periods # kWh
         max_peak_power_ac_grid = max(max_peak_power_ac_grid, max(electricity_buy_sequence_kW)) # Peak für Arbeits- und Leistungspreis bestimmen
 
-        total_cost_electricity_buy_spot_sum_only += sim_results["el_grid_source_total_cost_spot_price_only"] * num_weeks
-        total_cost_h2_buy += sim_results["h2_grid_source_total_cost"] * num_weeks
-        total_revenue_heat_sell += sim_results["heat_grid_sink_total_cost"] * num_weeks
-        total_revenue_electricity_sell += sim_results["el_grid_sink_total_cost"] * num_weeks
+        total_cost_electricity_buy_spot_sum_only += sim_results["el_grid_source_total_cost_spot_price_only"] * num_periods
+        total_cost_h2_buy += sim_results["h2_grid_source_total_cost"] * num_periods
+        total_revenue_heat_sell += sim_results["heat_grid_sink_total_cost"] * num_periods
+        total_revenue_electricity_sell += sim_results["el_grid_sink_total_cost"] * num_periods
 
-        # Abnutzung der Batterie in dieser Jahreszeit via Rainflow-Algorithmus
+        # Abnutzung der Batterie in dieser Periode via Rainflow-Algorithmus
         if c_battery is not None:
             verlauf_soc_battery = sim_results["battery_sequence_soc"]
-            perc_deg_battery += helperFunctions.get_lfp_battery_percent_degradation(verlauf_soc_battery) * num_weeks
+            perc_deg_battery += helperFunctions.get_lfp_battery_percent_degradation(verlauf_soc_battery) * num_periods
 
     if perc_deg_battery < 0.0001:
         lifetime_battery = 1000  # arbitrarily high value to avoid division by zero
@@ -654,10 +864,12 @@ def eval_scenario(p_el, p_fc, m_tank, compress_before_storing, c_battery, sim_co
         aufschlaege_strom_total_eur_per_kwh=steuern_umlagen_real,
         leistungspreis_summe=lpr,
         peak_power_year_kW=max_peak_power_ac_grid,
-        total_consumption_year_kwh=total_energy_bought_year_kWh
+        total_consumption_year_kwh=total_energy_bought_year_kWh,
+        solver_statistics=solver_statistics
     )
 
 
+@instrumentation.timed("prep")
 def prep_sim_config_dict(parsed_json: Dict, config_file_path: str):
     """
     Einige aufbereitungen für die Simulation.
@@ -707,6 +919,7 @@ def prep_sim_config_dict(parsed_json: Dict, config_file_path: str):
         hydrogen_consumers_700_all_ts[jahreszeit.name] = np.zeros((24 * 60 * 7) // freq_in_min + 1)
 
     # Aggregation of time series for all generators
+    start_stage = time.perf_counter()
     for generator in parsed_json["generators"]:
 
         for jahreszeit in [Jahreszeit.SOMMER, Jahreszeit.UEBERGANG, Jahreszeit.WINTER]:
@@ -753,6 +966,7 @@ def prep_sim_config_dict(parsed_json: Dict, config_file_path: str):
                 surface_azimuth = generator['parameters']['surface_azimuth']
                 pvtechchoice = generator['parameters']['pvtechchoice']
 
+                instrumentation.count("prep.pv_calculations")
                 generator_ts = h2pp.generators.create_pv_plant_time_series(latitude=lat, longitude=lon,
                                                                            jahreszeit=jahreszeit,
                                                                            peakpower_in_kW=peakpower,
@@ -784,7 +998,10 @@ def prep_sim_config_dict(parsed_json: Dict, config_file_path: str):
     parsed_json['ac_generators_all_ts'] = ac_generators_all_ts
     parsed_json['hydrogen_generators_all_ts'] = hydrogen_generators_all_ts
 
+    instrumentation.record("prep.generators", start_stage)
+
     # Create consumer time series
+    start_stage = time.perf_counter()
     for consumer in parsed_json["consumers"]:
 
         for jahreszeit in [Jahreszeit.SOMMER, Jahreszeit.UEBERGANG, Jahreszeit.WINTER]:
@@ -863,8 +1080,10 @@ def prep_sim_config_dict(parsed_json: Dict, config_file_path: str):
     parsed_json['ac_consumers_all_ts'] = ac_consumers_all_ts
     parsed_json['hydrogen_consumers_350_all_ts'] = hydrogen_consumers_350_all_ts
     parsed_json['hydrogen_consumers_700_all_ts'] = hydrogen_consumers_700_all_ts
+    instrumentation.record("prep.consumers", start_stage)
 
     # ======================== Hier Aufbereitung für Strompreise ========================
+    start_stage = time.perf_counter()
 
     # 1. Börsenstrompreis einlesen (Mittelwertbildung und Resampling erfolgt erst unten im Jahreszeit-Loop)
     # Prinzipiell erfolgt die Ergänzung der ganzen Steuern, Umlagen, Netzentgelte dann erst in der Simulation bzw.
@@ -915,41 +1134,243 @@ def prep_sim_config_dict(parsed_json: Dict, config_file_path: str):
 
     parsed_json['jahresbedarf_abschaetzung_fuer_strompreis'] = jahresbedarf_abschaetzung
     parsed_json['peak_abschaetzung_fuer_strompreis'] = peak_abschaetzung
+    instrumentation.record("prep.strompreise", start_stage)
+
+    # Optional: Repräsentative Perioden aus den Zeitreihen eines ganzen Jahres statt der typischen Wochen (siehe
+    # periods.py). Die typischen Wochen je Jahreszeit bleiben erhalten (bspw. für die Plots), simuliert werden in
+    # eval_scenario aber die Perioden aus parsed_json["simulation_periods"].
+    if "representative_periods" in parsed_json:
+        start_stage = time.perf_counter()
+        representative_periods_config = parsed_json["representative_periods"]
+        whole_year_ts = prep_whole_year_time_series(parsed_json=parsed_json, config_file_path=config_file_path)
+        simulation_periods, ts_per_period = periods.representative_periods(
+            whole_year_ts,
+            period_length=representative_periods_config.get("period_length", "week"),
+            number_of_periods=representative_periods_config.get("number_of_periods"),
+            max_relative_error=representative_periods_config.get("max_relative_error"),
+            start_of_week=sim_sow)
+        for key, period_ts in ts_per_period.items():
+            parsed_json[key].update(period_ts)
+        parsed_json["simulation_periods"] = simulation_periods
+        instrumentation.record("prep.representative_periods", start_stage)
 
 
     # =================================================================================================================
 
 
-def optimize_h2pp(config_file_full_path: str, mode: Literal["normal", "battery_ref", "power_grid_only_ref"] = "normal",
-                  pop_size=50, n_gen=100, **kwargs) -> (tco.TCO, Dict[str, go.Figure]):
+class PreparedConfig(dict):
+    """
+    Unveränderliche aufbereitete Konfiguration (siehe prepare_config). Verschachtelte dicts sind ebenfalls
+    PreparedConfig, Listen Tupel und numpy-Arrays schreibgeschützt. Kopien (dict(config), {**config, ...}) sind
+    gewöhnliche, veränderbare dicts, die die Zeitreihen mit dem Original teilen.
+    """
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("A prepared config is immutable; create a modified copy, e.g. {**config, key: value}.")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _immutable
+    __ior__ = _immutable
+
+    def __reduce__(self):
+        # Für pickle (Prozesspools) und copy: über den Konstruktor statt über __setitem__
+        return PreparedConfig, (dict(self),)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return PreparedConfig({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, np.ndarray):
+        value = value.view()
+        value.flags.writeable = False
+    return value
+
 
+def prepare_config(parsed_json: Dict, config_file_path: str) -> PreparedConfig:
     """
-    Main function for the optimization of the H2PP system. The function will read the configuration file, does some
-     preparations (reading and generating time series for consumers and generators, resampling and averaging them
-        for the different seasons, etc.), set up the optimization problem, run the optimization and return the results.
-    @param config_file_full_path:  Full path to the configuration file (JSON) containing the simulation parameters etc.
-    @param mode: Mode of the optimization. Can be either "normal" (default), "battery_ref" or "power_grid_only_ref".
-                  Here, "normal" is an optimization for an H2PP system, while "battery_ref" is the battery reference case
-                  (no electrolyzer, tank, fuel cell etc. but instead a battery), and "power_grid_only_ref" is a reference
-                  case where no additional infrastructure is considered (energy only from grid and local production, no
-                  local storage etc.)
-    @param pop_size: population size for the genetic algorithm. only necessary if mode == "normal".
-    @param n_gen: number of generations for the genetic algorithm. only necessary if mode == "normal".
-    @param kwargs: kwargs to be passed to the eval_scenario function (e.g. verbose=True to get more detailed output on
-    the optimization process, like estimated Jahresbedarf/Peak etc.)
-    @return: A 2-tuple containing the TCO object of the found optimum and a dictionary of plotly figures (one for each
-    Jahreszeit) with the simulation results (optimal control strategie for components/consumptions etc.)
+    Aufbereitung wie prep_sim_config_dict, ohne das übergebene dict zu verändern. Die aufbereitete Konfiguration ist
+    unveränderlich und kann daher ohne Kopie zwischen Threads, Auswertungen und Prozessen geteilt werden (eval_scenario,
+    optimize_prepared, sweep.py). Es werden nur Dateien gelesen, nicht geschrieben.
+
+    @return: PreparedConfig
+    """
+    prepared_config = copy.deepcopy(parsed_json)
+    prep_sim_config_dict(parsed_json=prepared_config, config_file_path=config_file_path)
+    return _freeze(prepared_config)
+
+
+# Einträge der Konfiguration, die prep_sim_config_dict (inkl. prep_whole_year_time_series) liest. Konfigurationen, die
+# sich nur in anderen Einträgen unterscheiden, können sich eine aufbereitete Konfiguration teilen (siehe
+# with_unprepared_entries, sweep.py und worker_pool.py).
+PREPARATION_KEYS = ("base_sim_interval", "sim_start_of_week", "generators", "consumers", "strompreis_csv",
+                    "inverter_efficiency", "representative_periods")
+
+
+def preparation_signature(parsed_json: Dict) -> str:
+    """
+    @return: String, der für zwei (nicht aufbereitete) Konfigurationen genau dann gleich ist, wenn ihre Einträge in
+        PREPARATION_KEYS gleich sind
+    """
+    return json.dumps({key: parsed_json.get(key) for key in PREPARATION_KEYS}, sort_keys=True, default=str)
+
+
+def referenced_files(value, config_dir: str) -> List[Tuple[str, int, int]]:
+    """
+    @param value: (Teil einer) nicht aufbereiteten Konfiguration
+    @param config_dir: Ordner der Konfigurationsdatei (relative Pfade beziehen sich darauf)
+    @return: alle Strings in value, die auf eine Datei zeigen, als 3-Tupel (Pfad, Änderungszeit in ns, Größe in Byte)
+    """
+    if isinstance(value, dict):
+        return [file for item in value.values() for file in referenced_files(item, config_dir)]
+    if isinstance(value, (list, tuple)):
+        return [file for item in value for file in referenced_files(item, config_dir)]
+    if isinstance(value, str):
+        path = os.path.join(config_dir, os.path.normpath(value))
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            return [(path, stat.st_mtime_ns, stat.st_size)]
+    return []
+
+
+def with_unprepared_entries(prepared_config: Dict, parsed_json: Dict) -> Dict:
+    """
+    @param prepared_config: aufbereitete Konfiguration mit denselben Einträgen in PREPARATION_KEYS wie parsed_json
+    @return: aufbereitete Konfiguration für parsed_json (alle übrigen Einträge aus parsed_json, ohne erneute
+        Aufbereitung)
+    """
+    return {**prepared_config, **{key: value for key, value in parsed_json.items() if key not in PREPARATION_KEYS}}
+
+
+SIM_CONFIG_TS_KEYS = ['dc_generators_all_ts', 'ac_generators_all_ts', 'hydrogen_generators_all_ts',
+                      'dc_consumers_all_ts', 'ac_consumers_all_ts', 'hydrogen_consumers_350_all_ts',
+                      'hydrogen_consumers_700_all_ts', 'electricity_market_base_price_ts']
+
+
+def prep_whole_year_time_series(parsed_json: Dict, config_file_path: str) -> Dict:
     """
+    Erzeugt chronologische Zeitreihen für ein ganzes Kalenderjahr (statt typischer Wochen je Jahreszeit), bspw. für
+    die Analyse aller realen Wochen eines Jahres.
+
+    Das Kalenderjahr wird durch die erste Zeitreihe mit 'contains': 'whole_year' (Verbraucher vor Erzeugern) bestimmt,
+    andernfalls durch die Börsenstrompreise. Weitere Jahreszeitreihen (inkl. der Börsenstrompreise) werden über Monat,
+    Tag und Uhrzeit auf dieses Jahr abgebildet (siehe helperFunctions.map_time_series_to_calendar).
+    Alle anderen Erzeuger und Verbraucher (konstante Leistung, Tages-/Wochenzeitreihen, BDEW, PV) liegen nur als
+    typische Wochen je Jahreszeit vor und werden entsprechend der Jahreszeit und des Wochentags jedes Zeitpunkts
+    aneinandergereiht.
+
+    Das übergebene dict wird nicht verändert.
+
+    @return: dict mit den Schlüsseln aus SIM_CONFIG_TS_KEYS (je ein Array mit einem Wert pro Zeitpunkt des Jahres) und
+    'calendar' (DatetimeIndex des Jahres in der Schrittweite der Simulation)
+    """
+    freq_in_min = parsed_json["base_sim_interval"]
+    sim_sow = parsed_json["sim_start_of_week"]
+
+    config_dir = os.path.normpath(os.path.dirname(config_file_path))
+
+    def _is_whole_year(component):
+        return (component['calculation_type'] == "time_series"
+                and component['parameters']['contains'] == 'whole_year')
+
+    def _read_whole_year(component):
+        csv_path = os.path.join(config_dir, os.path.normpath(component['parameters']['file_path']))
+        return pd.read_csv(csv_path, parse_dates=True, index_col='datetime')['value']
+
+    df_prices_strom_spotmarkt = helperFunctions.netztransparenz_importer(
+        file_path=os.path.join(config_dir, os.path.normpath(parsed_json['strompreis_csv'])))
+
+    # Bestimmung des Kalenderjahres (häufigstes Jahr in der maßgeblichen Zeitreihe)
+    whole_year_components = [c for c in parsed_json["consumers"] + parsed_json["generators"] if _is_whole_year(c)]
+    reference_index = (_read_whole_year(whole_year_components[0]).index if whole_year_components
+                       else df_prices_strom_spotmarkt.index)
+    year = int(pd.Series(reference_index.year).mode()[0])
+    calendar = pd.date_range(start=f'{year}-01-01', end=f'{year + 1}-01-01', inclusive='left',
+                             freq=f"{freq_in_min}min")
+
+    # Typische Wochen nur für die übrigen Komponenten
+    rest_config = copy.deepcopy({key: value for key, value in parsed_json.items()
+                                 if key not in SIM_CONFIG_TS_KEYS + ["representative_periods", "simulation_periods"]})
+    rest_config["consumers"] = [c for c in parsed_json["consumers"] if not _is_whole_year(c)]
+    rest_config["generators"] = [g for g in parsed_json["generators"] if not _is_whole_year(g)]
+    prep_sim_config_dict(parsed_json=rest_config, config_file_path=config_file_path)
+
+    # Position jedes Kalenderzeitpunkts in der typischen Woche der jeweiligen Jahreszeit
+    steps_per_day = (24 * 60) // freq_in_min
+    week_position = (((calendar.weekday - sim_sow) % 7) * steps_per_day
+                     + (calendar.hour * 60 + calendar.minute) // freq_in_min)
+
+    whole_year_ts = {'calendar': calendar}
+    for key in SIM_CONFIG_TS_KEYS:
+        if key == 'electricity_market_base_price_ts':
+            whole_year_ts[key] = helperFunctions.map_time_series_to_calendar(df_prices_strom_spotmarkt['value'],
+                                                                             calendar)
+            continue
+
+        values = np.zeros(len(calendar))
+        for jahreszeit in [Jahreszeit.SOMMER, Jahreszeit.UEBERGANG, Jahreszeit.WINTER]:
+            in_season = np.isin(calendar.month, h2pp.generators.typical_months(jahreszeit))
+            values[in_season] = rest_config[key][jahreszeit.name][week_position[in_season]]
+        whole_year_ts[key] = values
 
+    # Zeitreihen über das ganze Jahr addieren
+    for consumer in parsed_json["consumers"]:
+        if not _is_whole_year(consumer):
+            continue
+        if consumer['energy_type'] == 'electricity_ac':
+            key = 'ac_consumers_all_ts'
+        elif consumer['energy_type'] == 'electricity_dc':
+            key = 'dc_consumers_all_ts'
+        elif consumer['pressure'] == 700:
+            key = 'hydrogen_consumers_700_all_ts'
+        elif consumer['pressure'] == 350:
+            key = 'hydrogen_consumers_350_all_ts'
+        else:
+            raise NotImplementedError("Currently only 700 and 350 bar hydrogen consumers are supported!")
+        whole_year_ts[key] = whole_year_ts[key] + helperFunctions.map_time_series_to_calendar(
+            _read_whole_year(consumer), calendar)
+
+    for generator in parsed_json["generators"]:
+        if not _is_whole_year(generator):
+            continue
+        if generator['energy_type'] == 'electricity_dc':
+            key = 'dc_generators_all_ts'
+        elif generator['energy_type'] == 'electricity_ac':
+            key = 'ac_generators_all_ts'
+        elif generator['pressure'] == 30:
+            key = 'hydrogen_generators_all_ts'
+        else:
+            raise NotImplementedError("Currently only 30 bar hydrogen generators are supported!")
+        whole_year_ts[key] = whole_year_ts[key] + helperFunctions.map_time_series_to_calendar(
+            _read_whole_year(generator), calendar)
+
+    return whole_year_ts
+
+
+def _check_mode(mode):
     if mode not in ["normal", "battery_ref", "power_grid_only_ref"]:
         raise ValueError(f"Invalid mode {mode} for optimization. Must be either 'normal', 'battery_ref' or "
                          f"'power_grid_only_ref'.")
 
-    with open(config_file_full_path) as user_file:
-        parsed_json = json.load(user_file)
 
-    # Note that the function will mutate the dict inplace, as dictionaries are passed by reference in Python by default
-    prep_sim_config_dict(parsed_json=parsed_json, config_file_path=config_file_full_path)
+def optimize_prepared(sim_config_dict: Dict, mode: Literal["normal", "battery_ref", "power_grid_only_ref"] = "normal",
+                      pop_size=50, n_gen=100, print_progress=True, **kwargs) -> (EvaluationResult, Dict):
+    """
+    Optimierung wie optimize_h2pp, aber für eine bereits aufbereitete Konfiguration (prep_sim_config_dict) und ohne
+    Plots, bspw. für Parameterstudien (siehe sweep.py). Parameter wie bei optimize_h2pp.
+
+    @param print_progress: False, um die Ausgaben des genetischen Algorithmus und der Ergebnisse zu unterdrücken
+    @return: 2-Tupel: EvaluationResult des Optimums (mit "multi_fidelity" in der Konfiguration inkl. des Berichts von
+        multi_fidelity_minimize in multi_fidelity_report) und dict mit dem Entwurf (p_el, p_fc, m_tank,
+        compress_before_storing, c_battery)
+    """
+    _check_mode(mode)
 
     p_el = None
     p_fc = None
@@ -957,49 +1378,128 @@ def optimize_h2pp(config_file_full_path: str, mode: Literal["normal", "battery_r
     compress_before_storing = False
     c_battery = None
 
-    tco_obj = None
+    multi_fidelity_report = None
 
     if mode == "normal":
 
-        problem = H2PP_Standard_MixedVariableProblem(sim_config_dict=parsed_json)
+        if "multi_fidelity" in sim_config_dict:
+            # Exploration mit grober Schrittweite, Bewertung und Verfeinerung der besten Entwürfe mit der Schrittweite
+            # der Konfiguration (siehe multi_fidelity_minimize)
+            best_X, multi_fidelity_report = multi_fidelity_minimize(
+                sim_config_dict,
+                coarse_interval_in_min=sim_config_dict["multi_fidelity"]["coarse_interval_in_min"],
+                top_k=sim_config_dict["multi_fidelity"].get("top_k", 5),
+                refinement_evals=sim_config_dict["multi_fidelity"].get("refinement_evals", 20),
+                pop_size=pop_size, n_gen=n_gen, seed=1, verbose=print_progress)
+
+            if print_progress:
+                print("Best solution found: \nX = %s\nF = %s" % (best_X, multi_fidelity_report["F"]))
+
+            paramset = multi_fidelity_report["design"]
+
+        else:
+            from pymoo.core.mixed import MixedVariableGA
+            from pymoo.optimize import minimize
+
+            problem = H2PP_Standard_MixedVariableProblem(sim_config_dict=sim_config_dict)
 
-        algorithm = MixedVariableGA(
-            pop_size=pop_size)
+            algorithm = MixedVariableGA(
+                pop_size=pop_size)
 
-        res = minimize(problem,
-                       algorithm,
-                       ('n_gen', n_gen),
-                       # termination=('n_evals', 50),
-                       seed=1,
-                       verbose=True)  # verbose=True, um die Ergebnisse zu sehen (für mich zum "debugging")
+            res = minimize(problem,
+                           algorithm,
+                           ('n_gen', n_gen),
+                           # termination=('n_evals', 50),
+                           seed=1,
+                           verbose=print_progress)  # verbose=True, um die Ergebnisse zu sehen (für mich zum "debugging")
 
-        print("Best solution found: \nX = %s\nF = %s" % (res.X, res.F))
+            best_X = res.X
+            if print_progress:
+                print("Best solution found: \nX = %s\nF = %s" % (res.X, res.F))
 
-        # =================================================================================================================
+            # Parameter des optimalen Ergebnisses beziehen
+            paramset = problem._retrieve_parameter_set(best_X)
 
-        # Optimales Ergebnis plotten:
-        # Hierfür müssen zunächst die Parameter des optimalen Ergebnisses bezogen und erneut eine Simulation damit je Jahreszeit durchgeführt werden
-        paramset = problem._retrieve_parameter_set(res.X)
+        # Optimales Ergebnis erneut simulieren
 
         p_el = paramset["p_el"]
         p_fc = paramset["p_fc"]
         m_tank = paramset["m_tank"]
         compress_before_storing = paramset["compress_before_storing"]
-        c_battery = None
 
         eval_res = eval_scenario(p_el, p_fc, m_tank, compress_before_storing, c_battery=c_battery,
-                                sim_config_dict=parsed_json, **kwargs)
+                                 sim_config_dict=sim_config_dict, **kwargs)
+        eval_res.multi_fidelity_report = multi_fidelity_report
 
     elif mode == "battery_ref":
-        c_battery, best_eval_res = get_optimum_for_battery_refcase_only(parsed_json, **kwargs)
-        print(f"Best battery capacity for the reference case: {c_battery} kWh")
-        print(f"NPV for the reference case with the best battery capacity: {best_eval_res.tco.npv_total} EUR")
-        eval_res = best_eval_res
+        c_battery, eval_res = get_optimum_for_battery_refcase_only(sim_config_dict, print_progress=print_progress,
+                                                                   **kwargs)
+        if print_progress:
+            print(f"Best battery capacity for the reference case: {c_battery} kWh")
+            print(f"NPV for the reference case with the best battery capacity: {eval_res.tco.npv_total} EUR")
 
-    elif mode == "power_grid_only_ref":
+    else:
         eval_res = eval_scenario(p_el=None, p_fc=None, m_tank=None, compress_before_storing=False, c_battery=None,
-                                sim_config_dict=parsed_json, **kwargs)
-        print(eval_res.tco.npv_total)
+                                 sim_config_dict=sim_config_dict, **kwargs)
+        if print_progress:
+            print(eval_res.tco.npv_total)
+
+    return eval_res, {"p_el": p_el, "p_fc": p_fc, "m_tank": m_tank,
+                      "compress_before_storing": compress_before_storing, "c_battery": c_battery}
+
+
+@instrumentation.profiled
+def optimize_h2pp(config_file_full_path: str, mode: Literal["normal", "battery_ref", "power_grid_only_ref"] = "normal",
+                  pop_size=50, n_gen=100, **kwargs) -> (tco.TCO, Dict[str, "go.Figure"]):
+
+    """
+    Main function for the optimization of the H2PP system. The function will read the configuration file, does some
+     preparations (reading and generating time series for consumers and generators, resampling and averaging them
+        for the different seasons, etc.), set up the optimization problem, run the optimization and return the results.
+    @param config_file_full_path:  Full path to the configuration file (JSON) containing the simulation parameters etc.
+    @param mode: Mode of the optimization. Can be either "normal" (default), "battery_ref" or "power_grid_only_ref".
+                  Here, "normal" is an optimization for an H2PP system, while "battery_ref" is the battery reference case
+                  (no electrolyzer, tank, fuel cell etc. but instead a battery), and "power_grid_only_ref" is a reference
+                  case where no additional infrastructure is considered (energy only from grid and local production, no
+                  local storage etc.)
+    @param pop_size: population size for the genetic algorithm. only necessary if mode == "normal".
+    @param n_gen: number of generations for the genetic algorithm. only necessary if mode == "normal".
+                  If the config contains a dict "multi_fidelity" ("coarse_interval_in_min", optionally "top_k" and
+                  "refinement_evals"), the genetic algorithm runs on the coarse interval and only the best designs are
+                  evaluated and refined at the configured interval (see multi_fidelity_minimize). The observed
+                  fidelity gap is printed here; optimize_prepared, sweep and batch return it
+                  (EvaluationResult.multi_fidelity_report).
+    @param kwargs: kwargs to be passed to the eval_scenario function (e.g. verbose=True to get more detailed output on
+    the optimization process, like estimated Jahresbedarf/Peak etc.)
+    @param profile_path: optional path without extension to profile the run with cProfile and a stack sampler
+    (writes <profile_path>.prof and <profile_path>.collapsed, plus one pair per worker process, see
+    instrumentation.profile)
+    @return: A 2-tuple containing the TCO object of the found optimum and a dictionary of plotly figures (one for each
+    Jahreszeit) with the simulation results (optimal control strategie for components/consumptions etc.)
+    """
+
+    _check_mode(mode)
+
+    with open(config_file_full_path) as user_file:
+        parsed_json = prepare_config(json.load(user_file), config_file_path=config_file_full_path)
+
+    eval_res, design = optimize_prepared(parsed_json, mode=mode, pop_size=pop_size, n_gen=n_gen, **kwargs)
+    return eval_res.tco, result_figures(parsed_json, eval_res, design)
+
+
+def result_figures(sim_config_dict: Dict, eval_res: EvaluationResult, design: Dict) -> Dict[str, "go.Figure"]:
+    """
+    Plots zum Ergebnis einer Optimierung (siehe optimize_h2pp).
+
+    @param sim_config_dict: aufbereitete Konfiguration
+    @param eval_res, design: Ergebnis von optimize_prepared
+    @return: dict mit den plotly figures (TCO und je Jahreszeit die Simulationsergebnisse)
+    """
+    p_el = design["p_el"]
+    p_fc = design["p_fc"]
+    m_tank = design["m_tank"]
+    compress_before_storing = design["compress_before_storing"]
+    c_battery = design["c_battery"]
 
     figs = {}
 
@@ -1009,19 +1509,19 @@ def optimize_h2pp(config_file_full_path: str, mode: Literal["normal", "battery_r
     figs["TCO"] = tco_fig # TODO I think we do never use this here anymore as we now directly get the TCO figure from the returned tco_obj, but please double-check this.
 
     for jahreszeit in [Jahreszeit.SOMMER, Jahreszeit.UEBERGANG, Jahreszeit.WINTER]:
-        sim_results = run_simulation(sim_config_dict=parsed_json, jahreszeit=jahreszeit, p_el=p_el, p_fc=p_fc,
-                                     m_tank=m_tank, compress_before_storing=compress_before_storing,
-                                     c_battery=c_battery)['sim_results']
+        flow_sequences = simulate(sim_config_dict=sim_config_dict, jahreszeit=jahreszeit, p_el=p_el, p_fc=p_fc,
+                                  m_tank=m_tank, compress_before_storing=compress_before_storing,
+                                  c_battery=c_battery)['flow_sequences']
 
         title = f"Simulationsergebnisse ({jahreszeit.name}) für P<sub>EL</sub>={np.round(p_el, 1) if p_el is not None else 0} kW, P<sub>FC</sub>={np.round(p_fc, 1) if p_fc is not None else 0} kW, m<sub>Tank</sub>={np.round(m_tank) if m_tank is not None else 0} kg, B<sub>compr</sub>={compress_before_storing}, C<sub>batt</sub>={np.round(c_battery) if c_battery is not None else 0} kWh"
-        figs[jahreszeit.name] = helperFunctions.process_results_and_return_plot(sim_results,
+        figs[jahreszeit.name] = helperFunctions.process_results_and_return_plot(flow_sequences,
                                                                                 titlestring=title,
-                                                                                simulation_interval=parsed_json[
+                                                                                simulation_interval=sim_config_dict[
                                                                                     "base_sim_interval"],
-                                                                                start_of_week=parsed_json[
+                                                                                start_of_week=sim_config_dict[
                                                                                     "sim_start_of_week"],
                                                                                 electricity_prices=
-                                                                                parsed_json['electricity_market_base_price_ts'][
+                                                                                sim_config_dict['electricity_market_base_price_ts'][
                                                                                     jahreszeit.name],
                                                                                 evalResult=eval_res)
-    return tco_obj, figs
+    return figs
@@ -0,0 +1,188 @@
+'''
+
+Repräsentative Perioden statt der drei typischen Wochen je Jahreszeit.
+
+Standardmäßig wird jedes Szenario für die typischen Wochen von SOMMER, UEBERGANG und WINTER simuliert und mit der Anzahl
+Wochen der jeweiligen Monate gewichtet. Ist in der Konfiguration ein dict "representative_periods" angegeben, werden
+stattdessen die Zeitreihen eines ganzen Jahres (siehe optimizer.prep_whole_year_time_series: Lasten, Erzeugung und
+Börsenstrompreise) in reale Wochen bzw. Tage zerlegt und per k-Medoids geclustert. Jeder Medoid (eine reale Periode des
+Jahres) wird simuliert und mit der Anzahl der Perioden seines Clusters gewichtet.
+
+Parameter im dict "representative_periods":
+- "period_length": "week" (Standard) oder "day"
+- "number_of_periods": Anzahl der Perioden; alternativ
+- "max_relative_error": die kleinste Anzahl an Perioden, mit der der relative Fehler (siehe clustering_error) diesen Wert
+  nicht übersteigt. Wenige Perioden für ein schnelles Screening, mehr Perioden für genauere Ergebnisse.
+
+Die Perioden sind voneinander unabhängig und können parallel simuliert werden ("max_workers_periods" in der
+Konfiguration, siehe optimizer.eval_scenario).
+
+'''
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import h2pp.generators
+from h2pp import helperFunctions
+from h2pp.generators import Jahreszeit
+
+PERIOD_LENGTH_DAYS = {"week": 7, "day": 1}
+
+
+@dataclass(frozen=True)
+class RepresentativePeriod:
+    # Name der Periode, Schlüssel in den Zeitreihen-dicts der Konfiguration (wie Jahreszeit.name)
+    name: str
+    # Beginn der Periode (Medoid) im Kalenderjahr
+    start: pd.Timestamp
+    # Gewichtung: Anzahl der Perioden (Wochen bzw. Tage) des Jahres, die durch diese Periode repräsentiert werden
+    occurrences_per_year: float
+
+
+def simulation_periods(sim_config_dict) -> list[tuple]:
+    """
+    @return: Liste der zu simulierenden Perioden als 2-Tupel (Periode, Anzahl Wiederholungen der Periode im Jahr). Die
+    Periode ist entweder eine Jahreszeit (typische Woche, Anzahl Wochen der Monate der Jahreszeit) oder eine
+    RepresentativePeriod; beide werden in run_simulation über ihren Namen verwendet.
+    """
+    if "simulation_periods" in sim_config_dict:
+        return [(period, period.occurrences_per_year) for period in sim_config_dict["simulation_periods"]]
+
+    return [(jahreszeit, helperFunctions.sum_days_in_months(h2pp.generators.typical_months(jahreszeit)) / 7)
+            for jahreszeit in [Jahreszeit.SOMMER, Jahreszeit.UEBERGANG, Jahreszeit.WINTER]]
+
+
+def k_medoids(features: np.ndarray, number_of_clusters: int, max_iter: int = 100, seed: int = 0):
+    """
+    k-Medoids (alternierende Zuordnung und Medoid-Aktualisierung, Initialisierung per k-Medoids++ mit festem Seed) auf
+    quadrierten euklidischen Abständen.
+
+    @param features: Array (Anzahl Objekte, Anzahl Merkmale)
+    @return: 3-Tupel: Indizes der Medoide, Cluster-Zuordnung jedes Objekts (Index in den Medoiden), Summe der
+    quadrierten Abstände zum jeweiligen Medoid
+    """
+    n = len(features)
+    if not 1 <= number_of_clusters <= n:
+        raise ValueError(f"The number of clusters must be between 1 and the number of objects ({n}).")
+
+    squared_norms = np.sum(features ** 2, axis=1)
+    dist = np.maximum(squared_norms[:, None] + squared_norms[None, :] - 2 * features @ features.T, 0)
+
+    rng = np.random.default_rng(seed)
+    medoids = [int(np.argmin(np.sum(dist, axis=1)))]
+    while len(medoids) < number_of_clusters:
+        nearest = np.min(dist[:, medoids], axis=1)
+        if np.sum(nearest) == 0:
+            # alle übrigen Objekte sind identisch mit einem Medoid
+            medoids.append(int(np.setdiff1d(np.arange(n), medoids)[0]))
+        else:
+            medoids.append(int(rng.choice(n, p=nearest / np.sum(nearest))))
+    medoids = np.array(medoids)
+
+    for _ in range(max_iter):
+        labels = np.argmin(dist[:, medoids], axis=1)
+        new_medoids = medoids.copy()
+        for cluster in range(number_of_clusters):
+            members = np.nonzero(labels == cluster)[0]
+            if len(members) > 0:
+                new_medoids[cluster] = members[np.argmin(np.sum(dist[np.ix_(members, members)], axis=1))]
+        if np.array_equal(new_medoids, medoids):
+            break
+        medoids = new_medoids
+
+    labels = np.argmin(dist[:, medoids], axis=1)
+    return medoids, labels, float(np.sum(dist[np.arange(n), medoids[labels]]))
+
+
+def _period_features(whole_year_ts: dict, period_length: str, start_of_week: int):
+    """
+    Zerlegt die Jahreszeitreihen in Perioden und baut daraus die Merkmale für das Clustering: je Zeitreihe die Werte der
+    Periode (ohne den letzten Zeitpunkt des geschlossenen Intervalls), normiert auf die Standardabweichung über das
+    Jahr. Konstante Zeitreihen werden nicht berücksichtigt.
+
+    @return: 3-Tupel: Beginn jeder Periode, dict Zeitreihenname -> Array (Anzahl Perioden, Länge der Periode),
+    Merkmale (Anzahl Perioden, Anzahl Merkmale)
+    """
+    if period_length not in PERIOD_LENGTH_DAYS:
+        raise ValueError(f"Invalid period_length {period_length}. Must be one of {list(PERIOD_LENGTH_DAYS)}.")
+
+    calendar = whole_year_ts['calendar']
+    period_ts = {}
+    starts = None
+    for key, values in whole_year_ts.items():
+        if key == 'calendar':
+            continue
+        periods = helperFunctions.split_into_periods(values, calendar, period_days=PERIOD_LENGTH_DAYS[period_length],
+                                                     start_of_week=start_of_week)
+        starts = [start for start, _ in periods]
+        period_ts[key] = np.array([period_values for _, period_values in periods])
+
+    features = [period_ts[key][:, :-1] / np.std(whole_year_ts[key])
+                for key in period_ts if np.std(whole_year_ts[key]) > 0]
+    features = np.hstack(features) if features else np.zeros((len(starts), 1))
+
+    return starts, period_ts, features
+
+
+def clustering_error(features: np.ndarray, number_of_periods: int) -> float:
+    """
+    Relativer Fehler der Darstellung aller Perioden durch number_of_periods Medoide: Wurzel aus dem Verhältnis der
+    quadrierten Abstände zum jeweiligen Medoid zu den quadrierten Abständen zum Mittelwert aller Perioden
+    (0: jede Periode wird exakt repräsentiert, etwa 1: nicht besser als eine mittlere Periode).
+    """
+    total = np.sum((features - np.mean(features, axis=0)) ** 2)
+    if total == 0:
+        return 0.0
+    _, _, cost = k_medoids(features, number_of_periods)
+    return float(np.sqrt(cost / total))
+
+
+def representative_periods(whole_year_ts: dict, period_length: str = "week", number_of_periods: int = None,
+                           max_relative_error: float = None, start_of_week: int = 0, verbose=False):
+    """
+    Bestimmt die repräsentativen Perioden eines Jahres per k-Medoids (siehe Modulbeschreibung).
+
+    @param whole_year_ts: Jahreszeitreihen, siehe optimizer.prep_whole_year_time_series
+    @param period_length: "week" oder "day"
+    @param number_of_periods: Anzahl der Perioden (Vorrang vor max_relative_error)
+    @param max_relative_error: max. relativer Fehler (siehe clustering_error), bestimmt die Anzahl der Perioden
+    @param start_of_week: Wochentag, an dem die Wochen beginnen (0: Montag), nur für period_length="week"
+    @return: 2-Tupel: Liste der RepresentativePeriod (chronologisch), dict Zeitreihenname -> dict Periodenname ->
+    Zeitreihe der Periode (Format wie die typischen Wochen in der Konfiguration)
+    """
+    if number_of_periods is None and max_relative_error is None:
+        raise ValueError("Either number_of_periods or max_relative_error must be given for the representative periods.")
+
+    starts, period_ts, features = _period_features(whole_year_ts, period_length, start_of_week)
+    n_periods = len(starts)
+
+    if number_of_periods is None:
+        number_of_periods = next((k for k in range(1, n_periods + 1)
+                                  if clustering_error(features, k) <= max_relative_error), n_periods)
+    number_of_periods = min(number_of_periods, n_periods)
+
+    medoids, labels, _ = k_medoids(features, number_of_periods)
+
+    # Die unvollständigen Perioden am Jahresanfang und -ende werden anteilig auf alle Cluster verteilt
+    periods_in_year = len(whole_year_ts['calendar'].normalize().unique()) / PERIOD_LENGTH_DAYS[period_length]
+    counts = np.bincount(labels, minlength=number_of_periods)
+
+    periods = []
+    ts_per_period = {key: {} for key in period_ts}
+    for cluster in np.argsort(medoids):
+        start = starts[medoids[cluster]]
+        period = RepresentativePeriod(name=f"{period_length.upper()}_{start:%Y-%m-%d}", start=start,
+                                      occurrences_per_year=counts[cluster] / n_periods * periods_in_year)
+        periods.append(period)
+        for key in period_ts:
+            ts_per_period[key][period.name] = period_ts[key][medoids[cluster]]
+
+    if verbose:
+        print(f"{number_of_periods} repräsentative Perioden aus {n_periods} Perioden, relativer Fehler "
+              f"{clustering_error(features, number_of_periods):.3f}:")
+        for period in periods:
+            print(f"  {period.name}: {period.occurrences_per_year:.2f}x")
+
+    return periods, ts_per_period
@@ -0,0 +1,247 @@
+'''
+
+Chronologische Simulation eines ganzen Jahres mit rollierendem Horizont (für eine abschließende Prüfung eines Designs).
+
+Die typischen Wochen (bzw. repräsentativen Perioden, siehe periods.py) bilden weder die saisonale Nutzung des Tanks noch
+die tatsächliche Jahresspitzenlast ab. Ein einzelnes LP über das ganze Jahr (35.040 Zeitschritte bei 15 min) ist jedoch
+zu langsam und speicherintensiv. Daher wird das Jahr in Fenster zerlegt:
+- Jedes Fenster wird mit der Topologie aus run_simulation (über dispatch.simulate) gelöst, und zwar über seinen
+  Übernahmezeitraum (window_days) plus eine Vorausschau (overlap_days), damit die Speicher am Ende des
+  Übernahmezeitraums nicht "leer gefahren" werden. Übernommen wird nur der Übernahmezeitraum.
+- Der Füllstand von Tank und Batterie am Ende des Übernahmezeitraums ist der Anfangsfüllstand des nächsten Fensters.
+- Seriell (max_workers=1) werden die Fenster der Reihe nach gelöst, jeweils mit dem Endfüllstand des vorigen Fensters.
+- Parallel (max_workers > 1) ist dieser vor dem Lösen des vorigen Fensters nicht bekannt. Daher werden zunächst alle
+  Fenster unabhängig voneinander (parallel) mit dem Anfangsfüllstand des Jahres gelöst. Optional folgen weitere
+  parallele Durchläufe, in denen jedes Fenster mit dem Endfüllstand des vorigen Fensters aus dem vorigen Durchlauf
+  startet (parallel_passes). In einem abschließenden Konsistenzdurchlauf werden die Fenster der Reihe nach übernommen
+  und diejenigen, deren angenommener Anfangsfüllstand nicht zum Ende des vorigen Fensters passt, mit dem korrekten
+  Füllstand erneut gelöst. Ohne Speicher ist dies nie nötig; mit Speicher hängt der Nutzen der parallelen Durchläufe
+  davon ab, wie schnell das Fenster den Anfangsfüllstand "vergisst". Nach nur einem Durchlauf (alle Fenster mit dem
+  Anfangsfüllstand des Jahres) passt der Füllstand mit Speicher meist bei fast keinem Fenster (Microgrid-Fallstudie: 50
+  von 53 Fenstern erneut gelöst), die parallelen Durchläufe lohnen sich daher erst ab parallel_passes >= 2.
+- Die übernommenen Flüsse jedes Fensters werden direkt nach der Übernahme an eine CSV-Datei angehängt (eine Spalte je
+  Fluss), sodass der Jahresverlauf nicht im Speicher gehalten werden muss.
+
+Die Jahreskosten werden über eval_scenario berechnet, wobei jedes Fenster genau einmal im Jahr vorkommt; damit gehen die
+tatsächliche Jahresspitzenlast und der tatsächliche Jahresbezug in die Netzentgelte (strompreise) ein.
+
+'''
+
+import copy
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from h2pp import instrumentation
+from h2pp.generators import convert_kg_H2_to_kWh
+from h2pp.optimizer import SIM_CONFIG_TS_KEYS, _simulate_period_worker, eval_scenario, prep_sim_config_dict, \
+    prep_whole_year_time_series
+from h2pp.periods import RepresentativePeriod
+from h2pp.simulation import electricity_market_prices
+
+
+def _window_time_series(year_values: np.ndarray, start: int, horizon: int) -> np.ndarray:
+    """
+    Zeitreihe eines Fensters im Format der typischen Wochen (geschlossenes Intervall, horizon + 1 Werte). Am Jahresende
+    wird der letzte Wert wiederholt.
+    """
+    window = year_values[start:start + horizon + 1]
+    return np.concatenate((window, np.full(horizon + 1 - len(window), year_values[-1])))
+
+
+def _committed_results(sim_config_dict, period, sim_results: dict, n_commit: int, p_el, m_tank) -> dict:
+    """
+    Schränkt das Simulationsergebnis eines Fensters auf den Übernahmezeitraum (die ersten n_commit Zeitschritte) ein und
+    berechnet die Kosten (wie in run_simulation) nur für diesen Zeitraum.
+    """
+    interval_h = sim_config_dict["base_sim_interval"] / 60
+    flow_sequences = {label: sequence[:n_commit] for label, sequence in sim_results["flow_sequences"].items()}
+
+    spot_price, _, var_costs_s_electric_grid_sell, _ = electricity_market_prices(sim_config_dict, period, p_el=p_el,
+                                                                                 m_tank=m_tank)
+    price_h2_per_equiv_kWh_350 = sim_config_dict['h2_price_per_kg_350bar'] / convert_kg_H2_to_kWh(1)
+    price_h2_per_equiv_kWh_700 = sim_config_dict['h2_price_per_kg_700bar'] / convert_kg_H2_to_kWh(1)
+
+    battery_sequence_soc = sim_results["battery_sequence_soc"]
+
+    return {
+        "el_grid_source_total_cost_spot_price_only": np.sum(flow_sequences['s_el_grid_buy'] * interval_h
+                                                            * spot_price[:n_commit]),
+        "h2_grid_source_total_cost": (np.sum(flow_sequences['s_h2_grid_buy_350']) * price_h2_per_equiv_kWh_350
+                                      + np.sum(flow_sequences['s_h2_grid_buy_700']) * price_h2_per_equiv_kWh_700)
+                                     * interval_h,
+        "heat_grid_sink_total_cost": np.sum(flow_sequences['s_save_heat']) * interval_h
+                                     * -1 * sim_config_dict["heat_price_per_kWh"],
+        "el_grid_sink_total_cost": np.sum(flow_sequences['s_el_grid_sell'] * interval_h
+                                          * -1 * var_costs_s_electric_grid_sell[:n_commit]),
+        "sim_results": None,
+        "flow_sequences": flow_sequences,
+        "battery_sequence_soc": None if battery_sequence_soc is None else battery_sequence_soc[:n_commit],
+    }
+
+
+def run_full_year_rolling_horizon(config_file_path: str, p_el: float = None, p_fc: float = None, m_tank: float = None,
+                                  compress_before_storing: bool = False, c_battery: float = None,
+                                  window_days: int = 7, overlap_days: int = 2, initial_tank_level: float = 0.0,
+                                  initial_battery_level: float = None, tolerance: float = 1e-3,
+                                  max_workers: int = 1, parallel_passes: int = 1, results_file: str = None,
+                                  verbose=False) -> dict:
+    """
+    Simuliert das Kalenderjahr der Konfiguration (siehe optimizer.prep_whole_year_time_series) chronologisch mit
+    rollierendem Horizont (siehe Modulbeschreibung) für die übergebene Auslegung.
+
+    @param config_file_path: Pfad zur JSON-Konfiguration
+    @param p_el, p_fc, m_tank, compress_before_storing, c_battery: Auslegung, siehe run_simulation
+    @param window_days: Übernahmezeitraum je Fenster in Tagen
+    @param overlap_days: Vorausschau über den Übernahmezeitraum hinaus in Tagen (mind. 1)
+    @param initial_tank_level: Füllstand des Tanks (0-1) zu Jahresbeginn
+    @param initial_battery_level: Ladezustand der Batterie (0-1) zu Jahresbeginn, standardmäßig soc_min
+    @param tolerance: max. Abweichung des Anfangsfüllstands (0-1), bis zu der ein Fenster aus dem ersten Durchlauf
+        übernommen wird, ohne es erneut zu lösen
+    @param max_workers: Anzahl der Prozesse für die parallelen Durchläufe (None: Anzahl der CPUs; 1: seriell ohne
+        parallele Durchläufe, jedes Fenster wird genau einmal gelöst)
+    @param parallel_passes: Anzahl der parallelen Durchläufe vor dem Konsistenzdurchlauf (siehe Modulbeschreibung; nur
+        mit max_workers > 1, mit Speicher erst ab 2 sinnvoll; 0: keine parallelen Durchläufe)
+    @param results_file: CSV-Datei, an die die übernommenen Flüsse (kW bzw. kWh für Speicherinhalte) je Fenster angehängt
+        werden (wird überschrieben). None: keine Ausgabe.
+    @return: dict mit
+        - 'evaluation': EvaluationResult des ganzen Jahres (eval_scenario), inkl. tatsächlichem Jahresbezug und
+          tatsächlicher Jahresspitzenlast
+        - 'tank_level' / 'battery_level': Füllstand (0-1) am Beginn jedes Fensters und am Jahresende (None ohne Speicher)
+        - 'n_windows', 'n_resolved_windows': Anzahl Fenster und Anzahl der im Konsistenzdurchlauf erneut gelösten Fenster
+          (seriell immer 0)
+    """
+    if window_days < 1 or overlap_days < 1:
+        raise ValueError("window_days and overlap_days must both be at least 1 day.")
+    if max_workers is None:
+        max_workers = os.cpu_count()
+
+    with open(config_file_path) as user_file:
+        parsed_json = json.load(user_file)
+    parsed_json.pop("representative_periods", None)
+    prep_sim_config_dict(parsed_json=parsed_json, config_file_path=config_file_path)
+    whole_year_ts = prep_whole_year_time_series(parsed_json=parsed_json, config_file_path=config_file_path)
+
+    calendar = whole_year_ts['calendar']
+    steps_per_day = (24 * 60) // parsed_json["base_sim_interval"]
+    commit_steps = window_days * steps_per_day
+    horizon_steps = (window_days + overlap_days) * steps_per_day
+
+    # Fenster als Perioden mit eigenen Zeitreihen in einer Kopie der Konfiguration
+    window_config = copy.copy(parsed_json)
+    for key in SIM_CONFIG_TS_KEYS:
+        window_config[key] = {}
+    windows = []
+    for start in range(0, len(calendar), commit_steps):
+        period = RepresentativePeriod(name=f"WINDOW_{calendar[start]:%Y-%m-%d}", start=calendar[start],
+                                      occurrences_per_year=1)
+        for key in SIM_CONFIG_TS_KEYS:
+            window_config[key][period.name] = _window_time_series(whole_year_ts[key], start, horizon_steps)
+        windows.append((period, start, min(commit_steps, len(calendar) - start)))
+
+    has_tank = m_tank is not None
+    has_battery = c_battery is not None
+    tank_capacity_kWh = None
+    if has_tank:
+        prop_factor = parsed_json["tank"]["density_prop_factor_h2_50bar_to_30bar"] if compress_before_storing else 1
+        tank_capacity_kWh = convert_kg_H2_to_kWh(m_tank * prop_factor)
+    if has_battery and initial_battery_level is None:
+        initial_battery_level = parsed_json["battery"]["soc_min"]
+
+    sim_kwargs = dict(p_el=p_el, p_fc=p_fc, m_tank=m_tank, compress_before_storing=compress_before_storing,
+                      c_battery=c_battery, verbose=False)
+
+    def _initial_levels(levels):
+        tank_level, battery_level = levels
+        initial_levels = {}
+        if has_tank:
+            initial_levels["initial_tank_level"] = tank_level
+        if has_battery:
+            initial_levels["initial_battery_level"] = battery_level
+        return initial_levels
+
+    def _end_levels(sim_results, n_commit):
+        # Füllstand am Ende des Übernahmezeitraums (Speicherinhalt zu Beginn des Zeitschritts n_commit)
+        storage_content = sim_results["flow_sequences"]
+        return (storage_content['H2Tank_storage_content'][n_commit] / tank_capacity_kWh if has_tank else None,
+                storage_content['BatteryStorage_storage_content'][n_commit] / c_battery if has_battery else None)
+
+    def _deviation(levels, other_levels):
+        return max([abs(level - other) for level, other in zip(levels, other_levels) if level is not None], default=0)
+
+    def _solve(window_indices, levels_per_window):
+        tasks = [(window_config, windows[i][0], {**sim_kwargs, **_initial_levels(levels_per_window[i])})
+                 for i in window_indices]
+        if max_workers == 1 or len(tasks) <= 1:
+            return [_simulate_period_worker(task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return [instrumentation.from_worker(sim_results)
+                    for sim_results in executor.map(instrumentation.in_worker(_simulate_period_worker), tasks)]
+
+    # 1. Parallele Durchläufe (nur mit mehreren Prozessen): im ersten Durchlauf starten alle Fenster mit dem
+    # Anfangsfüllstand des Jahres, in weiteren Durchläufen mit dem Endfüllstand des vorigen Fensters aus dem vorigen
+    # Durchlauf (nur Fenster, bei denen sich dieser geändert hat, werden erneut gelöst). Seriell würde der
+    # Konsistenzdurchlauf fast alle Fenster ein zweites Mal lösen.
+    year_start_levels = (initial_tank_level if has_tank else None, initial_battery_level if has_battery else None)
+    speculative = max_workers > 1 and parallel_passes >= 1 and len(windows) > 1
+    assumed_levels = [year_start_levels] * len(windows)
+    window_results = _solve(range(len(windows)), assumed_levels) if speculative else [None] * len(windows)
+    for _ in range(parallel_passes - 1 if speculative else 0):
+        new_assumed_levels = [year_start_levels] + [_end_levels(window_results[i], windows[i][2])
+                                                    for i in range(len(windows) - 1)]
+        changed = [i for i in range(len(windows)) if _deviation(new_assumed_levels[i], assumed_levels[i]) > tolerance]
+        assumed_levels = new_assumed_levels
+        for i, sim_results in zip(changed, _solve(changed, assumed_levels)):
+            window_results[i] = sim_results
+        if not changed:
+            break
+
+    # 2. Konsistenzdurchlauf: Fenster der Reihe nach übernehmen, Füllstände weitergeben (seriell: Fenster der Reihe
+    # nach lösen)
+    if results_file is not None and os.path.exists(results_file):
+        os.remove(results_file)
+
+    levels = year_start_levels
+    tank_levels = [levels[0]]
+    battery_levels = [levels[1]]
+    sim_results_per_period = {}
+    n_resolved_windows = 0
+    for window_idx, (period, start, n_commit) in enumerate(windows):
+        sim_results = window_results[window_idx]
+        resolved = sim_results is not None and _deviation(levels, assumed_levels[window_idx]) > tolerance
+        if sim_results is None or resolved:
+            sim_results = _simulate_period_worker((window_config, period, {**sim_kwargs, **_initial_levels(levels)}))
+        if resolved:
+            n_resolved_windows += 1
+
+        committed = _committed_results(window_config, period, sim_results, n_commit, p_el=p_el, m_tank=m_tank)
+        sim_results_per_period[period.name] = committed
+
+        levels = _end_levels(sim_results, n_commit)
+        tank_levels.append(levels[0])
+        battery_levels.append(levels[1])
+
+        if results_file is not None:
+            window_df = pd.DataFrame(committed["flow_sequences"], index=calendar[start:start + n_commit])
+            window_df.to_csv(results_file, mode='a', header=(window_idx == 0), index_label='datetime')
+
+        if verbose:
+            print(f"{period.name}: Tank {tank_levels[-1]}, Batterie {battery_levels[-1]}"
+                  f"{' (erneut gelöst)' if resolved else ''}")
+
+    # Jahreskosten; jedes Fenster kommt genau einmal vor
+    eval_config = {**window_config, "simulation_periods": [period for period, _, _ in windows]}
+    evaluation = eval_scenario(p_el=p_el, p_fc=p_fc, m_tank=m_tank, compress_before_storing=compress_before_storing,
+                               c_battery=c_battery, sim_config_dict=eval_config, verbose=verbose,
+                               sim_results_per_period=sim_results_per_period)
+
+    return {
+        "evaluation": evaluation,
+        "tank_level": tank_levels if has_tank else None,
+        "battery_level": battery_levels if has_battery else None,
+        "n_windows": len(windows),
+        "n_resolved_windows": n_resolved_windows,
+    }
@@ -0,0 +1,118 @@
+'''
+
+Analytische Vorprüfung (Screening) von Entwürfen vor der Simulation.
+
+Manche Kandidaten des genetischen Algorithmus sind schon vor dem Aufstellen eines LPs erkennbar unzulässig oder
+entartet. Unzulässige LPs sind die langsamsten Läufe von CBC. screen_design prüft einen Entwurf mit einfachen
+Abschätzungen je Periode:
+
+- Unzulässig: Mit "strombezug_begrenzen" ist der Netzbezug begrenzt (siehe simulation.electricity_market_prices). Reicht
+  die Begrenzung nicht für die Last, die selbst bei voller Leistung von Brennstoffzelle und Batterie vom Netz bezogen
+  werden muss, ist das LP unzulässig.
+- Entartet (nur Hinweis, das LP bleibt lösbar): Der Durchsatz des HRS-Verdichters reicht nicht für die Spitze des
+  FCEV-Bedarfs (der Rest wird am Markt gekauft), der Tank fasst weniger als die Erzeugung des Elektrolyseurs in einem
+  Intervall, oder die Brennstoffzelle kann mangels lokalem Wasserstoff nie betrieben werden.
+
+Unzulässige Entwürfe erhalten in der Optimierung statt der Simulation einen Strafwert (penalty_objective).
+
+'''
+
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+
+from h2pp import periods
+from h2pp.generators import BATTERY_C_RATE, convert_kWh_to_kg_H2, convert_kg_H2_to_kWh
+from h2pp.simulation import electricity_market_prices
+
+# Strafwert (EUR) für unzulässige Entwürfe; wird mit der relativen Verletzung erhöht, damit der genetische Algorithmus
+# zwischen stark und leicht unzulässigen Entwürfen unterscheiden kann
+INFEASIBLE_PENALTY_NPV = 1e12
+
+
+@dataclass(frozen=True)
+class ScreeningResult:
+    # False, wenn der Entwurf sicher zu einem unzulässigen LP führt
+    feasible: bool
+    # Gründe für die Unzulässigkeit
+    reasons: tuple = ()
+    # Hinweise auf entartete Entwürfe (lösbar, aber Teile der Anlage können nicht sinnvoll genutzt werden)
+    flags: tuple = ()
+    # größte relative Verletzung (0 bei zulässigen Entwürfen)
+    violation: float = 0.0
+
+
+def penalty_objective(screening_result: ScreeningResult) -> float:
+    """
+    @return: Zielfunktionswert (NPV in EUR) für einen unzulässigen Entwurf, statt der Simulation
+    """
+    return INFEASIBLE_PENALTY_NPV * (1 + screening_result.violation)
+
+
+def screen_design(p_el, p_fc, m_tank, compress_before_storing, c_battery, sim_config_dict) -> ScreeningResult:
+    """
+    Prüft einen Entwurf analytisch, ohne ein LP aufzustellen (siehe Modulbeschreibung). Parameter wie bei
+    optimizer.eval_scenario.
+
+    @return: ScreeningResult
+    """
+    reasons = []
+    flags = []
+    violation = 0.0
+
+    if compress_before_storing and m_tank is None:
+        return ScreeningResult(feasible=False, reasons=("compress_before_storing requires a tank (m_tank).",),
+                               violation=1.0)
+
+    interval_h = sim_config_dict["base_sim_interval"] / 60
+    inv_eff = sim_config_dict["inverter_efficiency"]
+    throughput_kg_per_h = sim_config_dict["HRS_Compressor"]["throughput_kg_per_hour"]
+
+    for period, _ in periods.simulation_periods(sim_config_dict):
+        h2_generation = np.asarray(sim_config_dict['hydrogen_generators_all_ts'][period.name])
+        h2_demand = (np.asarray(sim_config_dict['hydrogen_consumers_350_all_ts'][period.name])
+                     + np.asarray(sim_config_dict['hydrogen_consumers_700_all_ts'][period.name]))
+        local_h2 = p_el is not None or np.any(h2_generation > 0)
+
+        # 1. Begrenzter Netzbezug: Last, die auch bei voller Leistung von Brennstoffzelle und Batterie bleibt (optimistisch,
+        # ohne Berücksichtigung der verfügbaren Energiemengen, also eine untere Schranke des nötigen Bezugs)
+        if sim_config_dict.get("strombezug_begrenzen", False):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                _, _, _, grid_limit = electricity_market_prices(sim_config_dict, period, p_el=p_el, m_tank=m_tank)
+
+            dc_support = (p_fc if p_fc is not None and local_h2 else 0) \
+                + (c_battery * BATTERY_C_RATE if c_battery is not None else 0)
+            dc_deficit = (np.asarray(sim_config_dict['dc_consumers_all_ts'][period.name])
+                          - np.asarray(sim_config_dict['dc_generators_all_ts'][period.name]) - dc_support)
+            unavoidable_grid_draw = (np.asarray(sim_config_dict['ac_consumers_all_ts'][period.name])
+                                     - np.asarray(sim_config_dict['ac_generators_all_ts'][period.name])
+                                     + np.where(dc_deficit > 0, dc_deficit / inv_eff, dc_deficit * inv_eff))
+            peak_draw = float(np.max(unavoidable_grid_draw))
+            if peak_draw > grid_limit * (1 + 1e-9):
+                reasons.append(f"{period.name}: grid draw is limited to {grid_limit:.1f} kW (strombezug_begrenzen), "
+                               f"but at least {peak_draw:.1f} kW must be bought from the grid.")
+                violation = max(violation, (peak_draw - grid_limit) / max(grid_limit, 1e-9))
+
+        # 2. Verdichter: Spitze des FCEV-Bedarfs lokal nicht bedienbar, Rest vom Markt
+        if local_h2 and np.any(h2_demand > 0):
+            peak_demand_kg_per_h = convert_kWh_to_kg_H2(float(np.max(h2_demand)))
+            if peak_demand_kg_per_h > throughput_kg_per_h:
+                flags.append(f"{period.name}: HRS compressor throughput ({throughput_kg_per_h} kg/h) is below the FCEV "
+                             f"demand peak ({peak_demand_kg_per_h:.1f} kg/h); the rest is bought at the market.")
+
+    # 3. Tank kleiner als die Erzeugung des Elektrolyseurs in einem Intervall
+    if p_el is not None and m_tank is not None:
+        el_output_per_interval_kg = convert_kWh_to_kg_H2(p_el * interval_h)
+        if convert_kg_H2_to_kWh(m_tank) < p_el * interval_h:
+            flags.append(f"The tank ({m_tank:.1f} kg) holds less than the electrolyzer output of one interval "
+                         f"({el_output_per_interval_kg:.1f} kg).")
+
+    # 4. Brennstoffzelle ohne lokalen Wasserstoff
+    if p_fc is not None and p_el is None and not any(
+            np.any(np.asarray(ts) > 0) for ts in sim_config_dict['hydrogen_generators_all_ts'].values()):
+        flags.append("The fuel cell can never run: there is no local hydrogen (no electrolyzer or H2 generation).")
+
+    return ScreeningResult(feasible=not reasons, reasons=tuple(reasons), flags=tuple(dict.fromkeys(flags)),
+                           violation=violation)
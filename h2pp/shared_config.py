@@ -0,0 +1,126 @@
+'''
+
+Verteilung aufbereiteter Konfigurationen an Arbeitsprozesse über gemeinsamen Speicher (multiprocessing.shared_memory).
+
+Ohne diesen Mechanismus wird eine aufbereitete Konfiguration mit allen Zeitreihen für jede Aufgabe eines Prozesspools
+gepickelt und in jedem Prozess kopiert. share_config kopiert alle numpy-Arrays einer Konfiguration einmal in einen Block
+gemeinsamen Speichers und liefert einen kleinen Verweis (SharedConfigHandle), der statt der Konfiguration an die
+Prozesse übergeben wird. attach_config erzeugt daraus im Prozess die Konfiguration, deren Arrays schreibgeschützte
+Sichten auf den gemeinsamen Speicher sind (ohne Kopie). Der Speicher je Rechner bleibt damit unabhängig von der Anzahl
+der Prozesse, und das Verteilen der Aufgaben bleibt billig.
+
+    with share_config(prepared_config) as handle:
+        executor.map(worker, [(handle, ...) for ...])      # im Worker: config = attach_config(handle)
+
+Die Typen der dicts (bspw. optimizer.PreparedConfig), Tupel und Listen bleiben erhalten. Unter Linux liegt der
+gemeinsame Speicher in /dev/shm; in Containern ist dieses oft klein (Docker: 64 MB, siehe --shm-size).
+
+'''
+
+import contextlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Dict
+
+import numpy as np
+
+# Ausrichtung der Arrays im gemeinsamen Speicher in Byte
+_ALIGNMENT = 64
+
+# Anzahl der Konfigurationen, die ein Prozess gleichzeitig eingebunden hält (siehe attach_config)
+MAX_ATTACHED_CONFIGS = 8
+
+# Eingebundene Konfigurationen dieses Prozesses: Name des Speicherblocks -> (SharedMemory, Konfiguration)
+_attached_configs = OrderedDict()
+
+
+@dataclass(frozen=True)
+class _SharedArray:
+    # Platzhalter für ein Array im gemeinsamen Speicher
+    offset: int
+    shape: tuple
+    dtype: str
+
+
+@dataclass(frozen=True)
+class SharedConfigHandle:
+    # Name des Speicherblocks
+    shm_name: str
+    # Konfiguration, in der alle numpy-Arrays durch Platzhalter ersetzt sind
+    structure: Any
+    # Größe der Arrays in Byte
+    nbytes: int
+
+
+def _map_structure(value, map_array):
+    if isinstance(value, dict):
+        return type(value)({key: _map_structure(item, map_array) for key, item in value.items()})
+    if isinstance(value, (list, tuple)) and not hasattr(value, "_fields"):
+        return type(value)(_map_structure(item, map_array) for item in value)
+    if isinstance(value, (np.ndarray, _SharedArray)):
+        return map_array(value)
+    return value
+
+
+@contextlib.contextmanager
+def share_config(config: Dict):
+    """
+    Kopiert alle numpy-Arrays der Konfiguration in einen Block gemeinsamen Speichers, der beim Verlassen des
+    with-Blocks freigegeben wird.
+
+    @return: SharedConfigHandle (Kontextmanager)
+    """
+    arrays = []
+    offset = 0
+
+    def to_placeholder(array: np.ndarray) -> _SharedArray:
+        nonlocal offset
+        array = np.ascontiguousarray(array)
+        placeholder = _SharedArray(offset=offset, shape=array.shape, dtype=array.dtype.str)
+        arrays.append((placeholder, array))
+        offset += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+        return placeholder
+
+    structure = _map_structure(config, to_placeholder)
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    try:
+        for placeholder, array in arrays:
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf, offset=placeholder.offset)[...] = array
+        yield SharedConfigHandle(shm_name=shm.name, structure=structure, nbytes=offset)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def attach_config(handle: SharedConfigHandle) -> Dict:
+    """
+    Erzeugt aus einem Verweis die Konfiguration mit schreibgeschützten Sichten auf den gemeinsamen Speicher. Je Prozess
+    wird jeder Speicherblock nur einmal eingebunden, wiederholte Aufrufe mit demselben Verweis sind billig; gehalten
+    werden die zuletzt verwendeten MAX_ATTACHED_CONFIGS Konfigurationen.
+    """
+    if handle.shm_name in _attached_configs:
+        _attached_configs.move_to_end(handle.shm_name)
+        return _attached_configs[handle.shm_name][1]
+
+    shm = shared_memory.SharedMemory(name=handle.shm_name)
+
+    def to_view(placeholder: _SharedArray) -> np.ndarray:
+        view = np.ndarray(placeholder.shape, dtype=np.dtype(placeholder.dtype), buffer=shm.buf,
+                          offset=placeholder.offset)
+        view.flags.writeable = False
+        return view
+
+    config = _map_structure(handle.structure, to_view)
+    _attached_configs[handle.shm_name] = (shm, config)
+
+    while len(_attached_configs) > MAX_ATTACHED_CONFIGS:
+        old_shm, old_config = _attached_configs.popitem(last=False)[1]
+        del old_config
+        try:
+            old_shm.close()
+        except BufferError:
+            # Sichten werden noch verwendet; der Block wird freigegeben, sobald sie nicht mehr referenziert sind
+            pass
+
+    return config
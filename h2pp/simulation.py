@@ -1,17 +1,285 @@
+import os
+import re
+import tempfile
+import time
 import warnings
 
 import numpy as np
 import oemof.solph as solph
 import pandas as pd
-from h2pp.oemof_visio_energy_system_graph import ESGraphRenderer
 
 import h2pp.generators
 import h2pp.strompreise
+from h2pp import instrumentation
 from h2pp.generators import (create_electrolyzer, create_fuel_cell_chp, create_h2_storage, convert_kg_H2_to_kWh,
                              create_compressor_a,
                              create_simple_inverter,
                              Jahreszeit)
+from h2pp.helperFunctions import SolverStatistics, flow_sequences_from_results
 
+
+def electricity_market_prices(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None, m_tank: float = None,
+                              verbose=False):
+    """
+    Stellt die Strompreise für Kauf und Verkauf am Netz für die typische Woche der übergebenen Jahreszeit zusammen
+    (Spotmarktpreis zzgl. abgeschätzter Steuern, Umlagen, Netzentgelte beim Kauf; abzgl. Abzugbetrag beim Verkauf).
+
+    @param p_el: Leistung des Elektrolyseurs in kW (oder None), geht in die Abschätzung der Spitzenlast ein.
+    @param m_tank: max. Masse Wasserstoff im Tank in kg (oder None), geht in die Abschätzung der Spitzenlast ein.
+    @return: 4-Tupel: Spotmarktpreis, Kaufpreis und Verkaufspreis (je EUR/kWh, Arrays über die Woche) sowie die
+    abgeschätzte Spitzenlast in kW
+    """
+    # 1. Abschätzung Jahresbedarf und Spitzenlast
+    jahresbedarf_abschaetzung = sim_config_dict["jahresbedarf_abschaetzung_fuer_strompreis"]
+    peak_abschaetzung = sim_config_dict["peak_abschaetzung_fuer_strompreis"]
+    peak_abschaetzung += (p_el / sim_config_dict["electrolyzer"]["efficiency"]) if p_el is not None else 0 # mehr ist als Peak nicht möglich: Max. Lokaler Bedarf + Betrieb elektrolyseur zur H2 Produktion (Eingangsleistung!) (+ Verdichter s.u.)
+
+    leistung_verdichter_kW = sim_config_dict["HRS_Compressor"]["throughput_kg_per_hour"] * sim_config_dict["HRS_Compressor"]["work_30_to_950_bar_in_kWh_per_kg"] # (kg/h * kWh/kg) = kWh/h = kW
+    peak_abschaetzung += leistung_verdichter_kW if not (p_el is None and m_tank is None) else 0 # Assumption that HRS is present (cf. calculate_tco with same thoughts)
+    if verbose:
+        print("Geschätzter Peak: ", peak_abschaetzung, "kW")
+        print("Geschätzter Jahresbedarf: ", jahresbedarf_abschaetzung, "kWh")
+
+    # If the "hack" variable "strombezug_begrenzen" is set to True, we limit the maximum power that can be bought from the grid to the peak power needed to archieve Jahresbenutzungsdauer > 2500
+    if "strombezug_begrenzen" in sim_config_dict:
+        if sim_config_dict["strombezug_begrenzen"]:
+            warnings.warn("The experimental feature strombezug_begrenzen=true was used.")
+            warnings.warn(
+                "Maximum power draw from grid is limited to the power needed to fall above the 2500h/a threshold. Note that this might lead to infeasiblities!")
+            # How high is the peak allowed to be in order to not exceed the 2500h/a threshold?
+            # plus 10% puffer
+            # setze peak_abschaetzung auf diesen wert, damit wir auch die richtigen kosten direkt bekommen.
+            peak_abschaetzung = 0.9 * (jahresbedarf_abschaetzung / 2500)
+
+
+    steuern_umlagen_schaetzung = h2pp.strompreise.stromkosten_2024(jahresverbrauch_in_kWh=jahresbedarf_abschaetzung,
+                                                                   peak_leistung_in_kW=peak_abschaetzung,
+                                                                   spannungsebene=h2pp.strompreise.Spannungsebene[ sim_config_dict["spannungsebene"]],
+                                                                   ort=sim_config_dict["ort"],
+                                                                   kat_konzession=sim_config_dict["kat_konzession"]
+                                                                   )
+
+    if "nur_beschaffungskosten" in sim_config_dict:
+        if sim_config_dict["nur_beschaffungskosten"]:
+            warnings.warn("Netzentgelte, Umlagen usw werden ignoriert!")
+            steuern_umlagen_schaetzung = 0.0
+
+    if "aufschlag_strom_manuell_ct" in sim_config_dict:
+        steuern_umlagen_schaetzung = sim_config_dict["aufschlag_strom_manuell_ct"] / 100
+
+
+    if verbose:
+        print("Abschätzung der Aufschläge auf den Spotmarkpreis: ", steuern_umlagen_schaetzung, " EUR/kWh")
+
+    spot_price = sim_config_dict['electricity_market_base_price_ts'][jahreszeit.name]
+    var_costs_s_electric_grid_buy = spot_price + steuern_umlagen_schaetzung
+
+    # TODO: Currently, our simulation seems to be unable to handle negative power prices correctly. Therefore,
+    #  we MUST strip them to 0.0. This partially leads to a bit strange behaviour that should be investigated.
+    #  (see Thesis JC for Example)
+    # First check if such points occur and warn the user.
+    if np.any(var_costs_s_electric_grid_buy < 0):
+        warnings.warn("Negative power prices detected (buying from grid). These will be set to 0.0 to prevent infeasibilities.")
+        var_costs_s_electric_grid_buy[var_costs_s_electric_grid_buy < 0] = 0.0
+
+    abzugbetrag_strom = sim_config_dict["abzugbetrag_strom_in_ct"] / 100  # EUR / kWh
+    var_costs_s_electric_grid_sell = spot_price - abzugbetrag_strom
+
+    # Für "negativen Ertrag" beim Kaufen auch eine Warnung da lassen..
+    if np.any(var_costs_s_electric_grid_sell < 0):
+        warnings.warn("Negative power prices detected (selling to grid). Although the simulation should still function as intended ('penalized for selling'), the results should be interpreted with caution.")
+
+
+    return spot_price, var_costs_s_electric_grid_buy, var_costs_s_electric_grid_sell, peak_abschaetzung
+
+
+def _topology(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None, p_fc: float = None, m_tank: float = None,
+              c_battery=None, initial_tank_level: float = None) -> dict:
+    """
+    Bestimmt vor dem Aufbau des Modells, welche Teile des Energiesystems für die Konfiguration und Auslegung überhaupt
+    einen Fluss führen können. Alle anderen Busse, Wandler und Märkte werden in run_simulation nicht erstellt, was das
+    LP verkleinert (weniger Variablen und Nebenbedingungen -> schnellerer Aufbau, Lösung und Auswertung).
+
+    - Lokaler Wasserstoff (30 bar) existiert nur mit Elektrolyseur, H2-Erzeugung oder anfangs gefülltem Tank. Ohne ihn
+      werden Brennstoffzelle, Tank und Verdichter nicht erstellt; der H2-Bedarf je Druckstufe wird vollständig am Markt
+      gekauft (Kauf = Bedarf, wird ohne Bus direkt berechnet).
+    - Die Verdichterstrecke und die Busse 350/700 bar nur, wenn für die jeweilige Druckstufe Bedarf besteht.
+    - Wärme nur mit einer Brennstoffzelle, die auch Wasserstoff erhalten kann.
+    - Der DC-Bus nur mit einer flexiblen DC-Komponente (Elektrolyseur, Brennstoffzelle, Batterie). Sonst werden die
+      festen DC-Profile mit dem Wirkungsgrad des Inverters auf die AC-Seite umgerechnet.
+    - Feste Profile, die über die ganze Periode 0 sind, entfallen.
+
+    Mit "prune_topology": false in der Konfiguration wird immer das vollständige Energiesystem erstellt.
+
+    @return: Dict Name des Teils -> bool (True: wird erstellt)
+    """
+    ts = {key: np.asarray(sim_config_dict[f'{key}_all_ts'][jahreszeit.name]) for key in
+          ['ac_generators', 'dc_generators', 'hydrogen_generators', 'ac_consumers', 'dc_consumers',
+           'hydrogen_consumers_350', 'hydrogen_consumers_700']}
+    has_profile = {key: bool(np.any(values != 0)) for key, values in ts.items()}
+
+    if not sim_config_dict.get("prune_topology", True):
+        return {"h2_local": True, "fuelcell": p_fc is not None, "tank": m_tank is not None, "h2_compression": True,
+                "h2_350": True, "h2_700": True, "heat": True, "dc_bus": True, "curtailment": False,
+                **{key: True for key in ts}}
+
+    h2_local = (p_el is not None or has_profile['hydrogen_generators']
+                or (m_tank is not None and initial_tank_level is not None and initial_tank_level > 0))
+    h2_350 = h2_local and has_profile['hydrogen_consumers_350']
+    h2_700 = h2_local and has_profile['hydrogen_consumers_700']
+    fuelcell = h2_local and p_fc is not None
+    dc_bus = p_el is not None or fuelcell or c_battery is not None
+
+    return {
+        "h2_local": h2_local,
+        "fuelcell": fuelcell,
+        "tank": h2_local and m_tank is not None,
+        "h2_compression": h2_350 or h2_700,
+        "h2_350": h2_350,
+        "h2_700": h2_700,
+        "heat": fuelcell,
+        "dc_bus": dc_bus,
+        # Ohne DC-Bus fehlt der Kreislauf über die Inverter, über den Überschüsse kostenlos abgebaut werden können (bspw.
+        # bei negativen Verkaufspreisen), dieser wird durch eine kostenlose Senke ersetzt
+        "curtailment": not dc_bus,
+        **has_profile,
+    }
+
+
+# Ab dieser Spitzenleistung (kW) wird das LP automatisch in MW statt kW aufgestellt (siehe _power_scale)
+AUTO_SCALING_THRESHOLD_KW = 1e4
+
+# Toleranz (relativ zum größten Fluss) für die Prüfung der Lösung (siehe check_solution_quality)
+SOLUTION_QUALITY_TOLERANCE = 1e-6
+
+
+def _power_scale(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None, p_fc: float = None,
+                 c_battery=None) -> float:
+    """
+    Faktor, mit dem alle Leistungen und Energien im LP skaliert werden (Preise entsprechend mit dem Kehrwert), damit
+    die Koeffizienten des LPs (Leistungen, Preise je Energieeinheit, Umwandlungsfaktoren) in ähnlichen
+    Größenordnungen liegen. Bei Standorten mit Lasten im Bereich mehrerer MW braucht CBC sonst viele Iterationen bzw.
+    meldet numerische Probleme.
+
+    "power_scale" in der Konfiguration: Faktor (1: kW, 1e-3: MW) oder "auto" (Standard): MW ab einer Spitzenleistung
+    der festen Profile bzw. der Anlagen von AUTO_SCALING_THRESHOLD_KW, sonst kW. Die Ergebnisse von run_simulation
+    werden immer in kW bzw. kWh zurückgegeben.
+    """
+    power_scale = sim_config_dict.get("power_scale", "auto")
+    if power_scale != "auto":
+        if power_scale <= 0:
+            raise ValueError(f"power_scale must be positive or 'auto', got {power_scale}.")
+        return power_scale
+
+    peak = max(np.max(np.abs(sim_config_dict[f'{key}_all_ts'][jahreszeit.name])) for key in
+               ['ac_generators', 'dc_generators', 'hydrogen_generators', 'ac_consumers', 'dc_consumers',
+                'hydrogen_consumers_350', 'hydrogen_consumers_700'])
+    peak = max([peak] + [value for value in [p_el, p_fc, c_battery] if value is not None])
+
+    return 1e-3 if peak >= AUTO_SCALING_THRESHOLD_KW else 1.0
+
+
+def check_solution_quality(results, scale: float = 1.0, verbose=False) -> dict:
+    """
+    Prüft die Lösung des LPs auf numerische Auffälligkeiten, die CBC nicht meldet: Verletzung der Bilanz an den
+    Bussen und negative Flüsse bzw. Speicherinhalte. Überschreitet eine Abweichung die Toleranz
+    SOLUTION_QUALITY_TOLERANCE (relativ zum größten Fluss), wird eine Warnung ausgegeben.
+
+    @param results: Ergebnisse aus solph.processing.results(om)
+    @param scale: Skalierung der Leistungen im LP (siehe _power_scale), die Abweichungen werden in kW angegeben
+    @return: Dict mit "max_balance_violation" (kW), "min_value" (kleinster Fluss bzw. Speicherinhalt, kW bzw. kWh)
+    und "max_flow" (kW)
+    """
+    balance = {}
+    min_value = 0.0
+    max_flow = 0.0
+    for (source, target), data in results.items():
+        sequences = data['sequences']
+        if target is None:
+            # Speicherinhalt
+            min_value = min(min_value, np.nanmin(sequences.values) / scale)
+            continue
+
+        flow = np.nan_to_num(sequences['flow'].values) / scale
+        min_value = min(min_value, np.min(flow))
+        max_flow = max(max_flow, np.max(flow))
+        if isinstance(target, solph.buses.Bus):
+            balance[target] = balance.get(target, 0) + flow
+        if isinstance(source, solph.buses.Bus):
+            balance[source] = balance.get(source, 0) - flow
+
+    max_balance_violation = max([float(np.max(np.abs(values))) for values in balance.values()], default=0.0)
+
+    tolerance = SOLUTION_QUALITY_TOLERANCE * max(1.0, max_flow)
+    if max_balance_violation > tolerance:
+        warnings.warn(f"Suspicious solution: bus balance violated by up to {max_balance_violation:.3g} kW "
+                      f"(largest flow {max_flow:.3g} kW).")
+    if min_value < -tolerance:
+        warnings.warn(f"Suspicious solution: negative flow or storage content down to {min_value:.3g}.")
+    if verbose:
+        print(f"Lösungsqualität: max. Bilanzabweichung {max_balance_violation:.3g} kW, kleinster Wert {min_value:.3g}")
+
+    return {"max_balance_violation": max_balance_violation, "min_value": min_value, "max_flow": max_flow}
+
+
+# Zeile im Log von CBC mit der Größe des Modells nach dem Presolve und den entfernten Zeilen/Spalten/Elementen, bspw.
+# "Presolve 588 (-2286) rows, 1359 (-2529) columns and 2366 (-5241) elements"
+_CBC_PRESOLVE_PATTERN = re.compile(r"Presolve (\d+) \((-?\d+)\) rows, (\d+) \((-?\d+)\) columns and (\d+) \((-?\d+)\) "
+                                   r"elements")
+
+
+def solver_statistics(meta_results: dict, solver_log: str = "") -> SolverStatistics:
+    """
+    Fasst die Statistik des gelösten LPs zusammen (siehe SolverStatistics).
+
+    Die Anzahl der Nichtnullelemente meldet Pyomo für CBC nicht (dort steht nur die Anzahl der Variablen in der
+    Zielfunktion), sie wird daher aus dem Log von CBC gelesen (bei anderen Solvern None).
+
+    @param meta_results: Ergebnis von solph.processing.meta_results(om)
+    @param solver_log: Log des Solvers (optional)
+    """
+    problem = meta_results["problem"]
+    solver = meta_results["solver"]
+
+    rows = problem.get("Number of constraints")
+    columns = problem.get("Number of variables")
+    nonzeros = None
+    match = _CBC_PRESOLVE_PATTERN.search(solver_log)
+    if match:
+        # Größe vor dem Presolve: verbleibend minus (negative) Anzahl der entfernten
+        rows, columns, nonzeros = (int(match.group(i)) - int(match.group(i + 1)) for i in (1, 3, 5))
+
+    # Die verschachtelten Einträge sind Pyomo-Container (Wert in .value)
+    iterations = solver.get("Statistics", {}).get("Black box", {}).get("Number of iterations")
+    iterations = getattr(iterations, "value", iterations)
+
+    return SolverStatistics(rows=rows, columns=columns, nonzeros=nonzeros,
+                            status=str(solver.get("Status")),
+                            termination_condition=str(solver.get("Termination condition")),
+                            iterations=iterations,
+                            solver_time_s=solver.get("Wallclock time", solver.get("Time")),
+                            objective=meta_results["objective"])
+
+
+def _add_net_fixed_flows(energysystem, bus, net_ts, label_source: str, label_sink: str):
+    """
+    Fügt eine feste Netto-Einspeisung in einen Bus hinzu: positive Werte von net_ts (kW) als feste Quelle, negative als
+    feste Senke. Richtungen, die in der Periode nicht auftreten, werden nicht erstellt.
+
+    Mit "aggregate_fixed_profiles": true in der Konfiguration werden so die festen Erzeuger und Verbraucher je Strombus
+    (AC bzw. DC) zu höchstens zwei festen Flüssen zusammengefasst, statt je Komponente einen Fluss (und damit eine
+    Variable je Zeitschritt) im LP anzulegen. Die Bilanz des Busses bleibt dieselbe.
+    """
+    net_ts = np.asarray(net_ts)
+    if np.any(net_ts > 0):
+        energysystem.add(solph.components.Source(label=label_source, outputs={bus: solph.Flow(
+            fix=np.maximum(net_ts, 0), nominal_value=1)}))
+    if np.any(net_ts < 0):
+        energysystem.add(solph.components.Sink(label=label_sink, inputs={bus: solph.Flow(
+            fix=np.maximum(-net_ts, 0), nominal_value=1)}))
+
+
+@instrumentation.timed("simulation")
 def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None, p_fc: float = None,
                    m_tank: float = None, compress_before_storing: bool = False, c_battery=None,
                    verbose=False,
@@ -27,6 +295,8 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
     - Die Elektrolyseur-, Brennstoffzellenleistung und Tankgröße sowie compress_before_storing werden NICHT aus der
     JSON gelesen, sondern aus den übergebenen Parametern!
     - Alle Leistungen werden prinzipiell in kW verarbeitet.
+    - Statt einer Jahreszeit kann auch eine repräsentative Periode (periods.RepresentativePeriod) übergeben werden;
+    verwendet wird nur der Name (Schlüssel der Zeitreihen in sim_config_dict).
 
     @param p_el: Leistung des Elektrolyseurs in kW. None, um den Elektrolyseur auszuschalten.
     @param p_fc: Leistung der Brennstoffzelle in kW. None, um die Brennstoffzelle auszuschalten.
@@ -35,7 +305,11 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
     @param c_battery: Kapazität der Batterie in kWh. Nur im Batterie-Referenzfall mit einem Wert zu versehen, sonst None
     @param verbose: Ausgabe zusätzlicher Infos (z.B. Abschätzung Peak-Leistung, Jahresbedarf, etc.)
     kwargs:
-    @param plot_energy_sytem_graph: bool, ob der Graph des Energiesystems geplottet werden soll.
+    @param plot_energy_sytem_graph: bool, ob der Graph des Energiesystems geplottet werden soll (nach
+        "../energy_system"), oder Pfad der Datei (ohne Endung), in die er geplottet werden soll.
+    @param initial_tank_level: Füllstand des Tanks zu Beginn (0-1). Wenn angegeben, wird balance_storage_level
+    ignoriert (bspw. für die Übergabe des Füllstands zwischen den Fenstern in rolling_horizon.py).
+    @param initial_battery_level: Ladezustand der Batterie zu Beginn (0-1), standardmäßig soc_min.
     @return:
 
     """
@@ -57,14 +331,33 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
     # Simulate 7 full days plus 0:00 of the first day of the consecutive week (last interval was especially needed for the
     # interpolation, see there)
     # the concrete selected day does not matter here. it is only important that the length and frequency are correct.
+    # Die Länge ergibt sich aus den Zeitreihen der Periode (typische Woche: 7 Tage + 1 Zeitschritt, repräsentative
+    # Perioden ggfs. auch einzelne Tage, siehe periods.py)
+    n_timesteps = len(sim_config_dict['ac_consumers_all_ts'][jahreszeit.name])
     my_index = pd.date_range(start='2020-01-01',
-                             end='2020-01-08',
-                             inclusive='both',  # Include both dates -> last interval step is 08. Jan 2020 00:00
+                             periods=n_timesteps,  # letzter Zeitschritt ist 0:00 des Folgetages (Woche: 08. Jan 2020 00:00)
                              freq=f"{freq_in_min}min")
 
     # Nutze diesen Index, um das Energiesystem zu erstellen
+    start_energy_system = time.perf_counter()
     my_energysystem = solph.EnergySystem(timeindex=my_index, infer_last_interval=True)
 
+    # Nur die Teile des Energiesystems erstellen, die einen Fluss führen können (siehe _topology)
+    initial_tank_level = kwargs.get("initial_tank_level")
+    topology = _topology(sim_config_dict, jahreszeit, p_el=p_el, p_fc=p_fc, m_tank=m_tank, c_battery=c_battery,
+                         initial_tank_level=initial_tank_level)
+
+    # Sequenzen der Komponenten, die nicht erstellt werden, deren Fluss aber durch die Eingangsdaten feststeht
+    # (gleiche Länge wie die Ergebnisse, also ohne den letzten Zeitpunkt, siehe unten)
+    fixed_sequences = {}
+
+    # Feste Strom-Erzeugung und -Verbrauch je Bus zu einer Netto-Einspeisung zusammenfassen (siehe _add_net_fixed_flows)
+    aggregate_fixed_profiles = sim_config_dict.get("aggregate_fixed_profiles", False)
+
+    # Alle Leistungen und Energien im LP werden mit scale skaliert, alle Preise mit dem Kehrwert (siehe _power_scale).
+    # Die Ergebnisse werden unten wieder auf kW bzw. kWh zurückgerechnet.
+    scale = _power_scale(sim_config_dict, jahreszeit, p_el=p_el, p_fc=p_fc, c_battery=c_battery)
+
     # Buses definieren und hinzufügen
     bel_ac = solph.buses.Bus(label='electricity_ac')
     bel_dc = solph.buses.Bus(label='electricity_dc')
@@ -75,64 +368,128 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
     bhydr_350_from_compressor = solph.buses.Bus(label="h2_350bar_from_compressor") # ONLY the output from the compressor. to prevent "buying the H2 from a hydrogen refueling station and compressing it cheap to 700 bar"
     bhydr_700 = solph.buses.Bus(label="h2_700bar")
 
-    my_energysystem.add(bel_ac, bel_dc, bhydr_30, bhydr_50, bhydr_350, bhydr_350_from_compressor, bhydr_700, bth)
+    my_energysystem.add(bel_ac)
+    if topology["dc_bus"]:
+        my_energysystem.add(bel_dc)
+    if topology["h2_local"]:
+        my_energysystem.add(bhydr_30)
+    if compress_before_storing and topology["tank"]:
+        my_energysystem.add(bhydr_50)
+    if topology["h2_compression"]:
+        my_energysystem.add(bhydr_350_from_compressor)
+    if topology["h2_350"]:
+        my_energysystem.add(bhydr_350)
+    if topology["h2_700"]:
+        my_energysystem.add(bhydr_700)
+    if topology["heat"]:
+        my_energysystem.add(bth)
 
 
     # ===== Erzeuger =====
 
     # Initialize the time series for the producers of electricity and hydrogen...
-    generator_dc_electricity_ts = sim_config_dict['dc_generators_all_ts'][jahreszeit.name]
-    generator_ac_electricity_ts = sim_config_dict['ac_generators_all_ts'][jahreszeit.name]
-    generator_hydrogen_ts = sim_config_dict['hydrogen_generators_all_ts'][jahreszeit.name]
-
-
-    electricity_dc_generators = solph.components.Source(label='Electricity_DC_Generation_Ges', outputs={bel_dc: solph.Flow(
-        fix=generator_dc_electricity_ts, nominal_value=1
-        # nominal_value (erforderlich) überall auf 1, da timeseries bereits skaliert und wir alle Flows in eqiv. kW Leistung rechnen
-        )})
-
-    electricity_ac_generators = solph.components.Source(label='Electricity_AC_Generation_Ges',
-                                                        outputs={bel_ac: solph.Flow(
-                                                            fix=generator_ac_electricity_ts, nominal_value=1
-                                                        )})
+    generator_dc_electricity_ts = scale * np.asarray(sim_config_dict['dc_generators_all_ts'][jahreszeit.name])
+    generator_ac_electricity_ts = scale * np.asarray(sim_config_dict['ac_generators_all_ts'][jahreszeit.name])
+    generator_hydrogen_ts = scale * np.asarray(sim_config_dict['hydrogen_generators_all_ts'][jahreszeit.name])
+
+    if topology["dc_bus"] and topology["dc_generators"] and not aggregate_fixed_profiles:
+        electricity_dc_generators = solph.components.Source(label='Electricity_DC_Generation_Ges', outputs={bel_dc: solph.Flow(
+            fix=generator_dc_electricity_ts, nominal_value=1
+            # nominal_value (erforderlich) überall auf 1, da timeseries bereits skaliert und wir alle Flows in eqiv. kW Leistung rechnen
+            )})
+        my_energysystem.add(electricity_dc_generators)
+
+    if topology["ac_generators"] and not aggregate_fixed_profiles:
+        electricity_ac_generators = solph.components.Source(label='Electricity_AC_Generation_Ges',
+                                                            outputs={bel_ac: solph.Flow(
+                                                                fix=generator_ac_electricity_ts, nominal_value=1
+                                                            )})
+        my_energysystem.add(electricity_ac_generators)
 
     # Generator for Hydrogen - currently only for 30 bar as I currently see no real use cases where we directly get higher pressured hydrogen from a source other than via the market
-    h2_generators = solph.components.Source(label='H2_Generation_Ges', outputs={bhydr_30: solph.Flow(
-        fix=generator_hydrogen_ts, nominal_value=1
-    )})
-
-    my_energysystem.add(electricity_ac_generators, electricity_dc_generators, h2_generators)
+    if topology["hydrogen_generators"]:
+        h2_generators = solph.components.Source(label='H2_Generation_Ges', outputs={bhydr_30: solph.Flow(
+            fix=generator_hydrogen_ts, nominal_value=1
+        )})
+        my_energysystem.add(h2_generators)
 
     # ==================
 
 
     # === VERBRAUCHER ===
-    consumed_ac_electricity_ts = sim_config_dict['ac_consumers_all_ts'][jahreszeit.name]
-    consumed_dc_electricity_ts = sim_config_dict['dc_consumers_all_ts'][jahreszeit.name]
-    consumed_hydrogen_700_ts = sim_config_dict['hydrogen_consumers_700_all_ts'][jahreszeit.name]
-    consumed_hydrogen_350_ts = sim_config_dict['hydrogen_consumers_350_all_ts'][jahreszeit.name]
-
-
-    electricity_consumers_ac = solph.components.Sink(label='Electricity_Consumption_AC_Ges', inputs={bel_ac: solph.Flow(
-        fix=consumed_ac_electricity_ts, nominal_value=1
-    )})
+    consumed_ac_electricity_ts = scale * np.asarray(sim_config_dict['ac_consumers_all_ts'][jahreszeit.name])
+    consumed_dc_electricity_ts = scale * np.asarray(sim_config_dict['dc_consumers_all_ts'][jahreszeit.name])
+    consumed_hydrogen_700_ts = scale * np.asarray(sim_config_dict['hydrogen_consumers_700_all_ts'][jahreszeit.name])
+    consumed_hydrogen_350_ts = scale * np.asarray(sim_config_dict['hydrogen_consumers_350_all_ts'][jahreszeit.name])
+
+    if topology["ac_consumers"] and not aggregate_fixed_profiles:
+        electricity_consumers_ac = solph.components.Sink(label='Electricity_Consumption_AC_Ges', inputs={bel_ac: solph.Flow(
+            fix=consumed_ac_electricity_ts, nominal_value=1
+        )})
+        my_energysystem.add(electricity_consumers_ac)
+
+    if topology["dc_bus"] and topology["dc_consumers"] and not aggregate_fixed_profiles:
+        electricity_consumers_dc = solph.components.Sink(label='Electricity_Consumption_DC_Ges',
+                                                           inputs={bel_dc: solph.Flow(
+                                                               fix=consumed_dc_electricity_ts, nominal_value=1
+                                                           )})
+        my_energysystem.add(electricity_consumers_dc)
+
+    if topology["h2_700"]:
+        h2_consumers_700 = solph.components.Sink(label='H2_Consumption_Ges_700', inputs={bhydr_700: solph.Flow(
+            fix=consumed_hydrogen_700_ts, nominal_value=1
+        )})
+        my_energysystem.add(h2_consumers_700)
 
-    electricity_consumers_dc = solph.components.Sink(label='Electricity_Consumption_DC_Ges',
-                                                       inputs={bel_dc: solph.Flow(
-                                                           fix=consumed_dc_electricity_ts, nominal_value=1
-                                                       )})
+    if topology["h2_350"]:
+        h2_consumers_350 = solph.components.Sink(label='H2_Consumption_Ges_350', inputs={bhydr_350: solph.Flow(
+            fix=consumed_hydrogen_350_ts, nominal_value=1
+        )})
+        my_energysystem.add(h2_consumers_350)
 
-    h2_consumers_700 = solph.components.Sink(label='H2_Consumption_Ges_700', inputs={bhydr_700: solph.Flow(
-        fix=consumed_hydrogen_700_ts, nominal_value=1
-    )})
+    # Ohne lokalen Wasserstoff wird der Bedarf vollständig am Markt gekauft (Kauf = Bedarf)
+    if not topology["h2_350"]:
+        fixed_sequences['H2_Consumption_Ges_350'] = np.asarray(consumed_hydrogen_350_ts)[:-1]
+        fixed_sequences['s_h2_grid_buy_350'] = np.asarray(consumed_hydrogen_350_ts)[:-1]
+    if not topology["h2_700"]:
+        fixed_sequences['H2_Consumption_Ges_700'] = np.asarray(consumed_hydrogen_700_ts)[:-1]
+        fixed_sequences['s_h2_grid_buy_700'] = np.asarray(consumed_hydrogen_700_ts)[:-1]
 
-    h2_consumers_350 = solph.components.Sink(label='H2_Consumption_Ges_350', inputs={bhydr_350: solph.Flow(
-        fix=consumed_hydrogen_350_ts, nominal_value=1
-    )})
+    # ==================
 
-    my_energysystem.add(electricity_consumers_dc, electricity_consumers_ac, h2_consumers_350, h2_consumers_700)
+    # Wirkungsgrad der Inverter fur AC/DC
+    inv_eff = sim_config_dict["inverter_efficiency"]
 
-    # ==================
+    net_dc = np.asarray(generator_dc_electricity_ts) - np.asarray(consumed_dc_electricity_ts)
+    net_ac = np.asarray(generator_ac_electricity_ts) - np.asarray(consumed_ac_electricity_ts)
+
+    if not topology["dc_bus"]:
+        # Ohne flexible DC-Komponente ist der Fluss über die Inverter durch die DC-Profile festgelegt: Überschuss auf der
+        # DC-Seite wird über den Inverter auf die AC-Seite gespeist, Defizite von dort gedeckt
+        net_dc_on_ac = np.maximum(net_dc, 0) * inv_eff - np.maximum(-net_dc, 0) / inv_eff
+        if aggregate_fixed_profiles:
+            net_ac = net_ac + net_dc_on_ac
+        else:
+            _add_net_fixed_flows(my_energysystem, bel_ac, net_dc_on_ac, label_source='Electricity_DC_Surplus_AC',
+                                 label_sink='Electricity_DC_Deficit_AC')
+        fixed_sequences['Electricity_DC_Generation_Ges'] = np.asarray(generator_dc_electricity_ts)[:-1]
+        fixed_sequences['Electricity_Consumption_DC_Ges'] = np.asarray(consumed_dc_electricity_ts)[:-1]
+
+    if aggregate_fixed_profiles:
+        _add_net_fixed_flows(my_energysystem, bel_ac, net_ac, label_source='Net_Fixed_Injection_AC',
+                             label_sink='Net_Fixed_Withdrawal_AC')
+        if topology["dc_bus"]:
+            _add_net_fixed_flows(my_energysystem, bel_dc, net_dc, label_source='Net_Fixed_Injection_DC',
+                                 label_sink='Net_Fixed_Withdrawal_DC')
+        # die einzelnen Erzeuger und Verbraucher bleiben in den Ergebnissen (und Plots) erhalten
+        for label, ts in [('Electricity_DC_Generation_Ges', generator_dc_electricity_ts),
+                          ('Electricity_Consumption_DC_Ges', consumed_dc_electricity_ts),
+                          ('Electricity_AC_Generation_Ges', generator_ac_electricity_ts),
+                          ('Electricity_Consumption_AC_Ges', consumed_ac_electricity_ts)]:
+            fixed_sequences[label] = np.asarray(ts)[:-1]
+
+    if topology["curtailment"]:
+        my_energysystem.add(solph.components.Sink(label='Electricity_AC_Curtailment', inputs={bel_ac: solph.Flow()}))
 
     # Only add the components that were not disabled in the function call (p_el, p_fc, m_tank, c_battery)
     # Elektrolyseur
@@ -141,10 +498,10 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
         my_energysystem.add(create_electrolyzer(input_bus_el=bel_dc,
                                                 output_bus_h2=bhydr_30,
                                                 electrical_efficiency=eta_elektrolyseur,
-                                                nominal_power=p_el))
+                                                nominal_power=p_el * scale))
 
     # Brennstoffzelle
-    if p_fc is not None:
+    if topology["fuelcell"]:
         # Kraft-Wärme-Kopplung / BHKW: CHP (Combined Heat and Power)
         eta_fc_el = sim_config_dict["fuelcell"]["efficiency_electric"]
         eta_fc_th = sim_config_dict["fuelcell"]["efficiency_thermal"]
@@ -153,14 +510,19 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
                                                  output_bus_th=bth,
                                                  electrical_efficiency=eta_fc_el,
                                                  thermal_efficiency=eta_fc_th,
-                                                 nominal_power_el=p_fc))
+                                                 nominal_power_el=p_fc * scale))
+    elif p_fc is not None:
+        # ohne Wasserstoff kein Betrieb der Brennstoffzelle
+        for label in ['Brennstoffzelle_th', 'Brennstoffzelle_el', 'Brennstoffzelle_in']:
+            fixed_sequences[label] = np.zeros(n_timesteps - 1)
 
     # Batterie
     if c_battery is not None:
         my_energysystem.add(
-            h2pp.generators.create_battery_storage(bus_el=bel_dc, storage_capacity_in_kWh=c_battery,
+            h2pp.generators.create_battery_storage(bus_el=bel_dc, storage_capacity_in_kWh=c_battery * scale,
                                                    soc_min=sim_config_dict["battery"]["soc_min"],
-                                                   soc_max=sim_config_dict["battery"]["soc_max"]))
+                                                   soc_max=sim_config_dict["battery"]["soc_max"],
+                                                   initial_storage_level=kwargs.get("initial_battery_level")))
 
 
     # ===========================
@@ -179,9 +541,18 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
 
         balance_storage_level = sim_config_dict["tank"]["balance_storage_level"]
 
+    if initial_tank_level is not None:
+        balance_storage_level = False
+    else:
+        initial_tank_level = 0
+
+    if m_tank is not None and not topology["tank"]:
+        # leerer Tank ohne Zufluss
+        fixed_sequences['H2Tank_storage_content'] = np.zeros(n_timesteps - 1)
+
 
     # Modellierung von Wasserstofftank und Verdichtung bis 350 bar - allerdings davon abhängig, ob Vorverdichtet werden soll oder nicht
-    if compress_before_storing:
+    if compress_before_storing and topology["tank"]:
         prop_factor_50bar = sim_config_dict["tank"]["density_prop_factor_h2_50bar_to_30bar"] # how many more kgs can we store with the same volume but higher pressure of 50 bar?
 
         # Auch ohne "stationären Tank" haben wir den FCEV Verdichter // FCEV Tank
@@ -196,12 +567,13 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
         cmpr_energy_to_350plus_only = cmpr_energy - sim_config_dict["HRS_Compressor"]["work_350_to_700_bar_in_kWh_per_kg"]
 
 
-        my_energysystem.add(create_compressor_a(input_bus_h2=bhydr_50, output_bus_h2=bhydr_350_from_compressor,
-                                                electrical_bus=bel_ac,
-                                                compression_energy_kwh_per_kg=cmpr_energy_to_350plus_only,
-                                                nominal_power_in_kg_per_h=sim_config_dict["HRS_Compressor"][
-                                                    "throughput_kg_per_hour"],
-                                                label="H2_Compressor_50_to_350"))
+        if topology["h2_compression"]:
+            my_energysystem.add(create_compressor_a(input_bus_h2=bhydr_50, output_bus_h2=bhydr_350_from_compressor,
+                                                    electrical_bus=bel_ac,
+                                                    compression_energy_kwh_per_kg=cmpr_energy_to_350plus_only,
+                                                    nominal_power_in_kg_per_h=scale * sim_config_dict["HRS_Compressor"][
+                                                        "throughput_kg_per_hour"],
+                                                    label="H2_Compressor_50_to_350"))
 
         # technically, compress_before_storing=True implies that we have a (50 bar) tank. As we already do an error handling in the beginning, we dont need to check here whether m_tank is None (it CANNOT be None here)
 
@@ -210,66 +582,71 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
 
         my_energysystem.add(create_compressor_a(input_bus_h2=bhydr_30, output_bus_h2=bhydr_50,
                                                 electrical_bus=bel_ac, compression_energy_kwh_per_kg=sim_config_dict["HRS_Compressor"]["work_30_to_50_bar_in_kWh_per_kg"],
-                                                nominal_power_in_kg_per_h=nominal_power_kg_per_h,
+                                                nominal_power_in_kg_per_h=scale * nominal_power_kg_per_h,
                                                 label="H2_Compressor_30_to_50"))
 
 
         # we also need the "Way back" (expansion) to 30 bar for the fuel cell
         my_energysystem.add(create_compressor_a(input_bus_h2=bhydr_50, output_bus_h2=bhydr_30,
                                                 electrical_bus=bel_ac, compression_energy_kwh_per_kg=sim_config_dict["HRS_Compressor"]["work_50_to_30_bar_in_kWh_per_kg"],
-                                                nominal_power_in_kg_per_h=nominal_power_kg_per_h,
+                                                nominal_power_in_kg_per_h=scale * nominal_power_kg_per_h,
                                                 label="H2_Compressor_50_to_30"))
 
         # Tank muss am 50 bar Bus hängen (vorverdichtet)
-        my_energysystem.add(create_h2_storage(bus_h2=bhydr_50, storage_capacity_in_kg=m_tank * prop_factor_50bar,
-                                              balance_storage_level=balance_storage_level))
+        my_energysystem.add(create_h2_storage(bus_h2=bhydr_50, storage_capacity_in_kg=m_tank * prop_factor_50bar * scale,
+                                              balance_storage_level=balance_storage_level,
+                                              initial_storage_level=initial_tank_level))
 
 
 
-    else:
+    elif not compress_before_storing:
         # Keine Vorverdichtung.
         # This one holds the energy demand for compression from now -> 30 <- to 350 bar (incl. higher pressure due to slight losses)
         cmpr_energy_to_350plus_only = (sim_config_dict["HRS_Compressor"]["work_30_to_950_bar_in_kWh_per_kg"]
                                        - sim_config_dict["HRS_Compressor"]["work_350_to_700_bar_in_kWh_per_kg"])
 
-        my_energysystem.add(create_compressor_a(input_bus_h2=bhydr_30, output_bus_h2=bhydr_350_from_compressor,
-                                                electrical_bus=bel_ac,
-                                                compression_energy_kwh_per_kg=cmpr_energy_to_350plus_only,
-                                                nominal_power_in_kg_per_h=sim_config_dict["HRS_Compressor"][
-                                                    "throughput_kg_per_hour"],
-                                                label="H2_Compressor_30_to_350"))
+        if topology["h2_compression"]:
+            my_energysystem.add(create_compressor_a(input_bus_h2=bhydr_30, output_bus_h2=bhydr_350_from_compressor,
+                                                    electrical_bus=bel_ac,
+                                                    compression_energy_kwh_per_kg=cmpr_energy_to_350plus_only,
+                                                    nominal_power_in_kg_per_h=scale * sim_config_dict["HRS_Compressor"][
+                                                        "throughput_kg_per_hour"],
+                                                    label="H2_Compressor_30_to_350"))
 
 
         # Tank am 30bar bus.
-        if m_tank is not None:
-            my_energysystem.add(create_h2_storage(bus_h2=bhydr_30, storage_capacity_in_kg=m_tank,
-                                                  balance_storage_level=balance_storage_level))
+        if topology["tank"]:
+            my_energysystem.add(create_h2_storage(bus_h2=bhydr_30, storage_capacity_in_kg=m_tank * scale,
+                                                  balance_storage_level=balance_storage_level,
+                                                  initial_storage_level=initial_tank_level))
 
     # 350 to 700 bar compressor regardless of if we have pre compressed the hydrogen or not
     # This one here is "the rest of the compressor pipeline". The energy demand for compression from 350 to 700 bar (last step)
     # as we already compressed a bit higher than 350 bar in the previous step, this also has the "slight higher pressure" included in the end.
-    my_energysystem.add(create_compressor_a(input_bus_h2=bhydr_350_from_compressor, output_bus_h2=bhydr_700,
-                                            electrical_bus=bel_ac,
-                                            compression_energy_kwh_per_kg=sim_config_dict["HRS_Compressor"][
-                                                "work_350_to_700_bar_in_kWh_per_kg"],
-                                            nominal_power_in_kg_per_h=sim_config_dict["HRS_Compressor"][
-                                                "throughput_kg_per_hour"],
-                                            label="H2_Compressor_350_to_700"))
+    if topology["h2_700"]:
+        my_energysystem.add(create_compressor_a(input_bus_h2=bhydr_350_from_compressor, output_bus_h2=bhydr_700,
+                                                electrical_bus=bel_ac,
+                                                compression_energy_kwh_per_kg=sim_config_dict["HRS_Compressor"][
+                                                    "work_350_to_700_bar_in_kWh_per_kg"],
+                                                nominal_power_in_kg_per_h=scale * sim_config_dict["HRS_Compressor"][
+                                                    "throughput_kg_per_hour"],
+                                                label="H2_Compressor_350_to_700"))
 
     # finally, we need to transform the "350bar from compressor" to the "normal" 350 bar bus
     # the only reason for doing this is to prevent that "hydrogen bought at 350bar from the grid gets fed into the compressor
     # for cheap compression to 700 bar" (in reality, it is directly taken from the refueling station at the corresponding pressure
     # in the reference case.)
 
-    my_energysystem.add(solph.components.Converter(
-        label="H2_350_from_compressor_to_350",
-        inputs={bhydr_350_from_compressor: solph.Flow()},
-        outputs={bhydr_350: solph.Flow()}))
+    if topology["h2_350"]:
+        my_energysystem.add(solph.components.Converter(
+            label="H2_350_from_compressor_to_350",
+            inputs={bhydr_350_from_compressor: solph.Flow()},
+            outputs={bhydr_350: solph.Flow()}))
 
     # Inverter fur AC/DC
-    inv_eff = sim_config_dict["inverter_efficiency"]
-    my_energysystem.add(create_simple_inverter(input_bus=bel_ac, output_bus=bel_dc, efficiency=inv_eff, label='Inverter_AC_DC'))
-    my_energysystem.add(create_simple_inverter(input_bus=bel_dc, output_bus=bel_ac, efficiency=inv_eff, label='Inverter_DC_AC'))
+    if topology["dc_bus"]:
+        my_energysystem.add(create_simple_inverter(input_bus=bel_ac, output_bus=bel_dc, efficiency=inv_eff, label='Inverter_AC_DC'))
+        my_energysystem.add(create_simple_inverter(input_bus=bel_dc, output_bus=bel_ac, efficiency=inv_eff, label='Inverter_DC_AC'))
 
 
     # TODO Zur Erweitung auf Use Cases wo kein H2 Markt existieren soll: schauen, wie der H2 Markt ausgeschaltet
@@ -284,13 +661,15 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
         1)  # kWh pro kg H2 (etwa 33.3) -> H2_PRICE per kg durch das teilen -> EUR / kWh
 
     # Aus dem fixen Preis eine Zeitreihe richtiger Länge mit konstantem Wert erstellen
-    var_costs_s_h2_grid_buy_350 = [price_h2_per_equiv_kWh_350]*((24*60*7)//freq_in_min + 1)
+    var_costs_s_h2_grid_buy_350 = [price_h2_per_equiv_kWh_350]*n_timesteps
 
-    s_h2_grid_buy_350 = solph.components.Source(
-        label="s_h2_grid_buy_350",
-        outputs={
-            bhydr_350: solph.Flow(
-                variable_costs=var_costs_s_h2_grid_buy_350)})
+    if topology["h2_350"]:
+        s_h2_grid_buy_350 = solph.components.Source(
+            label="s_h2_grid_buy_350",
+            outputs={
+                bhydr_350: solph.Flow(
+                    variable_costs=np.asarray(var_costs_s_h2_grid_buy_350) / scale)})
+        my_energysystem.add(s_h2_grid_buy_350)
 
     if 'h2_price_per_kg_700bar' not in sim_config_dict:
         raise ValueError("No hydrogen price for 700 bar (h2_price_per_kg_700bar) specified in JSON file!")
@@ -299,86 +678,31 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
     price_h2_per_equiv_kWh_700 = price_h2_per_kg_700 / convert_kg_H2_to_kWh(
         1)  # kWh pro kg H2 (etwa 33.3) -> H2_PRICE per kg durch das teilen -> EUR / kWh
 
-    var_costs_s_h2_grid_buy_700 = [price_h2_per_equiv_kWh_700]*((24*60*7)//freq_in_min + 1)
+    var_costs_s_h2_grid_buy_700 = [price_h2_per_equiv_kWh_700]*n_timesteps
 
-    s_h2_grid_buy_700 = solph.components.Source(
-        label="s_h2_grid_buy_700",
-        outputs={
-            bhydr_700: solph.Flow(
-                variable_costs=var_costs_s_h2_grid_buy_700)})
+    if topology["h2_700"]:
+        s_h2_grid_buy_700 = solph.components.Source(
+            label="s_h2_grid_buy_700",
+            outputs={
+                bhydr_700: solph.Flow(
+                    variable_costs=np.asarray(var_costs_s_h2_grid_buy_700) / scale)})
+        my_energysystem.add(s_h2_grid_buy_700)
 
 
     # Zusammenstellung Marktpreise
-
-    # 1. Abschätzung Jahresbedarf und Spitzenlast
-    jahresbedarf_abschaetzung = sim_config_dict["jahresbedarf_abschaetzung_fuer_strompreis"]
-    peak_abschaetzung = sim_config_dict["peak_abschaetzung_fuer_strompreis"]
-    peak_abschaetzung += (p_el / eta_elektrolyseur) if p_el is not None else 0 # mehr ist als Peak nicht möglich: Max. Lokaler Bedarf + Betrieb elektrolyseur zur H2 Produktion (Eingangsleistung!) (+ Verdichter s.u.)
-
-    leistung_verdichter_kW = sim_config_dict["HRS_Compressor"]["throughput_kg_per_hour"] * sim_config_dict["HRS_Compressor"]["work_30_to_950_bar_in_kWh_per_kg"] # (kg/h * kWh/kg) = kWh/h = kW
-    peak_abschaetzung += leistung_verdichter_kW if not (p_el is None and m_tank is None) else 0 # Assumption that HRS is present (cf. calculate_tco with same thoughts)
-    if verbose:
-        print("Geschätzter Peak: ", peak_abschaetzung, "kW")
-        print("Geschätzter Jahresbedarf: ", jahresbedarf_abschaetzung, "kWh")
-
-    # If the "hack" variable "strombezug_begrenzen" is set to True, we limit the maximum power that can be bought from the grid to the peak power needed to archieve Jahresbenutzungsdauer > 2500
-    if "strombezug_begrenzen" in sim_config_dict:
-        if sim_config_dict["strombezug_begrenzen"]:
-            warnings.warn("The experimental feature strombezug_begrenzen=true was used.")
-            warnings.warn(
-                "Maximum power draw from grid is limited to the power needed to fall above the 2500h/a threshold. Note that this might lead to infeasiblities!")
-            # How high is the peak allowed to be in order to not exceed the 2500h/a threshold?
-            # plus 10% puffer
-            # setze peak_abschaetzung auf diesen wert, damit wir auch die richtigen kosten direkt bekommen.
-            peak_abschaetzung = 0.9 * (jahresbedarf_abschaetzung / 2500)
-
-
-    steuern_umlagen_schaetzung = h2pp.strompreise.stromkosten_2024(jahresverbrauch_in_kWh=jahresbedarf_abschaetzung,
-                                                                   peak_leistung_in_kW=peak_abschaetzung,
-                                                                   spannungsebene=h2pp.strompreise.Spannungsebene[ sim_config_dict["spannungsebene"]],
-                                                                   ort=sim_config_dict["ort"],
-                                                                   kat_konzession=sim_config_dict["kat_konzession"]
-                                                                   )
-
-    if "nur_beschaffungskosten" in sim_config_dict:
-        if sim_config_dict["nur_beschaffungskosten"]:
-            warnings.warn("Netzentgelte, Umlagen usw werden ignoriert!")
-            steuern_umlagen_schaetzung = 0.0
-
-    if "aufschlag_strom_manuell_ct" in sim_config_dict:
-        steuern_umlagen_schaetzung = sim_config_dict["aufschlag_strom_manuell_ct"] / 100
-
-
-    if verbose:
-        print("Abschätzung der Aufschläge auf den Spotmarkpreis: ", steuern_umlagen_schaetzung, " EUR/kWh")
-
-    spot_price = sim_config_dict['electricity_market_base_price_ts'][jahreszeit.name]
-    var_costs_s_electric_grid_buy = spot_price + steuern_umlagen_schaetzung
-
-    # TODO: Currently, our simulation seems to be unable to handle negative power prices correctly. Therefore,
-    #  we MUST strip them to 0.0. This partially leads to a bit strange behaviour that should be investigated.
-    #  (see Thesis JC for Example)
-    # First check if such points occur and warn the user.
-    if np.any(var_costs_s_electric_grid_buy < 0):
-        warnings.warn("Negative power prices detected (buying from grid). These will be set to 0.0 to prevent infeasibilities.")
-        var_costs_s_electric_grid_buy[var_costs_s_electric_grid_buy < 0] = 0.0
-
-    abzugbetrag_strom = sim_config_dict["abzugbetrag_strom_in_ct"] / 100  # EUR / kWh
-    var_costs_s_electric_grid_sell = spot_price - abzugbetrag_strom
-
-    # Für "negativen Ertrag" beim Kaufen auch eine Warnung da lassen..
-    if np.any(var_costs_s_electric_grid_sell < 0):
-        warnings.warn("Negative power prices detected (selling to grid). Although the simulation should still function as intended ('penalized for selling'), the results should be interpreted with caution.")
+    spot_price, var_costs_s_electric_grid_buy, var_costs_s_electric_grid_sell, peak_abschaetzung = \
+        electricity_market_prices(sim_config_dict, jahreszeit, p_el=p_el, m_tank=m_tank, verbose=verbose)
 
 
     # Markt Kauf:
 
-    the_flow = solph.Flow(variable_costs=var_costs_s_electric_grid_buy)
+    the_flow = solph.Flow(variable_costs=var_costs_s_electric_grid_buy / scale)
 
     if "strombezug_begrenzen" in sim_config_dict:
         if sim_config_dict["strombezug_begrenzen"]:
             # mit peak_abschaetzung von oben so begrenzt, dass wir mutmasslich unter den 2500 h/a landen würden
-            the_flow = solph.Flow(variable_costs=var_costs_s_electric_grid_buy, nominal_value=peak_abschaetzung)
+            the_flow = solph.Flow(variable_costs=var_costs_s_electric_grid_buy / scale,
+                                  nominal_value=peak_abschaetzung * scale)
 
             if verbose:
                 print("Strombezug auf ", peak_abschaetzung, "kW begrenzt.")
@@ -401,73 +725,97 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
         label="s_el_grid_sell",
         inputs={
             bel_ac: solph.Flow(
-                variable_costs=var_cost_s_electric_grid_sell)})
+                variable_costs=var_cost_s_electric_grid_sell / scale)})
+
+    my_energysystem.add(s_electric_grid_buy, s_electric_grid_sell)
 
 
     # === HEAT ===
     HEAT_PRICE_PER_KWH = sim_config_dict["heat_price_per_kWh"]
     # das oben soll die "Einkaufskosten" die eigentlich für Wärme entstehen, darstellen; also hier quasi "Einsparung" als "Einnahme" dargestellt
-    var_cost_s_save_heat = [-1*HEAT_PRICE_PER_KWH] * ((24 * 60 * 7) // freq_in_min + 1) # Minus => "Verkauf"
-    s_save_heat = solph.components.Sink(
-        label="s_save_heat",
-        inputs={
-            bth: solph.Flow(
-                variable_costs=var_cost_s_save_heat)})
+    var_cost_s_save_heat = [-1*HEAT_PRICE_PER_KWH] * n_timesteps # Minus => "Verkauf"
+    if topology["heat"]:
+        s_save_heat = solph.components.Sink(
+            label="s_save_heat",
+            inputs={
+                bth: solph.Flow(
+                    variable_costs=np.asarray(var_cost_s_save_heat) / scale)})
+        my_energysystem.add(s_save_heat)
 
-    my_energysystem.add(s_electric_grid_buy, s_h2_grid_buy_350, s_h2_grid_buy_700, s_electric_grid_sell, s_save_heat)
 
+    instrumentation.record("simulation.build_energy_system", start_energy_system)
 
     # == Energiesystem plotten ==
     # Needs graphviz installed to work
 
     if 'plot_energy_sytem_graph' in kwargs:
         if kwargs['plot_energy_sytem_graph']:
-            gr = ESGraphRenderer(energy_system=my_energysystem, filepath="../energy_system", img_format="pdf")
+            from h2pp.oemof_visio_energy_system_graph import ESGraphRenderer
+
+            graph_path = kwargs['plot_energy_sytem_graph']
+            gr = ESGraphRenderer(energy_system=my_energysystem,
+                                 filepath=graph_path if isinstance(graph_path, str) else "../energy_system",
+                                 img_format="pdf")
             gr.view()
 
     # ===========================
 
     # initialise operational model (create problem)
-    om = solph.Model(my_energysystem)
+    with instrumentation.stage("simulation.build_model"):
+        om = solph.Model(my_energysystem)
 
     # set tee to True to get solver output
-    om.solve(solver='cbc', solve_kwargs={'tee': False})
+    # Das Log des Solvers (schreibt Pyomo ohnehin in eine Datei) wird für die Statistik des LPs gelesen
+    # "solver" in der Konfiguration: Name des Solvers für Pyomo, bspw. "glpk" oder "appsi_highs" (Standard: "cbc")
+    with tempfile.TemporaryDirectory() as log_dir:
+        log_file = os.path.join(log_dir, "solver.log")
+        with instrumentation.stage("simulation.solve"):
+            om.solve(solver=sim_config_dict.get("solver", "cbc"), solve_kwargs={'tee': False, 'logfile': log_file})
+        solver_log = ""
+        if os.path.exists(log_file):
+            with open(log_file) as file:
+                solver_log = file.read()
+    instrumentation.count("simulation.lp_solves")
 
     # get results
-    my_energysystem.results["main"] = solph.processing.results(om)
-    my_energysystem.results["meta"] = solph.processing.meta_results(om)
+    with instrumentation.stage("simulation.process_results"):
+        my_energysystem.results["main"] = solph.processing.results(om)
+        my_energysystem.results["meta"] = solph.processing.meta_results(om)
 
     # define an alias for shorter calls below
     results = my_energysystem.results["main"]
 
+    solution_quality = check_solution_quality(results, scale=scale, verbose=verbose)
+
     # Get the cost data for bought energy
     # Leistung zu skalieren auf intervallänge!! Bspw. wenn Intervallänge 15 min, dann wirkt Leistung von 4 Intervallen auf 1h -> zu vierteln vor Summenbildung (kWh)
     # -2 von hinten beim Array: 1. the last entry is always a weird "nan" entry. 2. Moreover, as we simulate one
     # interval "too much" (0:00 day 1 to 0:00 on "day 8" closed interval) we need to omit this penultimate value too,
-    # or we would get slightly "too high" energy costs.
+    # or we would get slightly "too high" energy costs. (siehe flow_sequences_from_results)
+    # Die Sequenzen der nicht erstellten Komponenten (z.B. H2-Kauf ohne lokalen Wasserstoff) stehen in fixed_sequences
+    # Rückskalierung auf kW bzw. kWh
+    flow_sequences = {label: sequence / scale for label, sequence in
+                      flow_sequences_from_results(results, fixed_sequences=fixed_sequences).items()}
 
-    el_grid_buy_seq_power = (freq_in_min / 60) * solph.views.node(results, 's_el_grid_buy')["sequences"].values[:-2, 0]
+    el_grid_buy_seq_power = (freq_in_min / 60) * flow_sequences['s_el_grid_buy']
     el_grid_source_total_cost_spot_price_only = sum(el_grid_buy_seq_power * spot_price[:-1]) # Nur variabler Spotmarktanteil summieren, die restlichen Aufschläge ergeben sich direkt über Jahresverbrauch + Peak (in der TCO Berechnung aufsummiert)
 
-    el_grid_sell_seq_power = (freq_in_min / 60) * solph.views.node(results, 's_el_grid_sell')["sequences"].values[:-2, 0]
+    el_grid_sell_seq_power = (freq_in_min / 60) * flow_sequences['s_el_grid_sell']
     el_grid_sink_total_cost = sum(el_grid_sell_seq_power * var_cost_s_electric_grid_sell[:-1])
 
-    h2_grid_buy_seq_power_350 = (freq_in_min / 60) * solph.views.node(results, 's_h2_grid_buy_350')["sequences"].values[
-                                                     :-2, 0]
+    h2_grid_buy_seq_power_350 = (freq_in_min / 60) * flow_sequences['s_h2_grid_buy_350']
     h2_grid_source_total_cost_350 = sum(h2_grid_buy_seq_power_350 * var_costs_s_h2_grid_buy_350[:-1])
 
-    h2_grid_buy_seq_power_700 = (freq_in_min / 60) * solph.views.node(results, 's_h2_grid_buy_700')["sequences"].values[:-2, 0]
+    h2_grid_buy_seq_power_700 = (freq_in_min / 60) * flow_sequences['s_h2_grid_buy_700']
     h2_grid_source_total_cost_700 = sum(h2_grid_buy_seq_power_700 * var_costs_s_h2_grid_buy_700[:-1])
 
     h2_grid_source_total_cost = h2_grid_source_total_cost_350 + h2_grid_source_total_cost_700
 
-    heat_grid_sell_seq_power = (freq_in_min / 60) * solph.views.node(results, 's_save_heat')["sequences"].values[:-2, 0]
+    heat_grid_sell_seq_power = (freq_in_min / 60) * flow_sequences['s_save_heat']
     heat_grid_sink_total_cost = sum(heat_grid_sell_seq_power * var_cost_s_save_heat[-1])
 
     if c_battery is not None:
-        column_name = (('BatteryStorage', 'None'), 'storage_content')
-        SC = solph.views.node(results, 'BatteryStorage')['sequences'][column_name]
-        batterie_kwhs = SC.values[:-2] # Wieder wie oben: 1. letzter wert i.A. None, 2. abgeschnitten wegen Simulation von 0:00 an Tag 1 bis 0:00 an Tag 8
+        batterie_kwhs = flow_sequences['BatteryStorage_storage_content'].copy() # Wieder wie oben: 1. letzter wert i.A. None, 2. abgeschnitten wegen Simulation von 0:00 an Tag 1 bis 0:00 an Tag 8
 
         # Normierung auf SOC
         # This will then have values like 0.1 .. 0.9 if SOC_min=0.1 and SOC_max=0.9
@@ -491,6 +839,9 @@ def run_simulation(sim_config_dict, jahreszeit: Jahreszeit, p_el: float = None,
         "h2_grid_source_total_cost": h2_grid_source_total_cost,
         "heat_grid_sink_total_cost": heat_grid_sink_total_cost,
         "el_grid_sink_total_cost": el_grid_sink_total_cost,
-        "sim_results": results, # needed as we want to plot results later on
+        "sim_results": results, # needed as we want to plot results later on (Achtung: skaliert, siehe _power_scale)
+        "flow_sequences": flow_sequences,
         "battery_sequence_soc": battery_sequence_soc,
+        "solution_quality": solution_quality,
+        "solver_statistics": solver_statistics(my_energysystem.results["meta"], solver_log),
     }
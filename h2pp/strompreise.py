@@ -1,5 +1,12 @@
 import enum
-from typing import Literal, Tuple
+import functools
+import glob
+import json
+import os
+from typing import Dict, Literal, Tuple
+
+import numpy as np
+from numpy.typing import ArrayLike
 
 
 class Spannungsebene(enum.Enum):
@@ -10,153 +17,147 @@ class Spannungsebene(enum.Enum):
     UMN = "Umspannung Mittel-/Niederspannung"
     NIS = "Niederspannung"
 
-def leistungspreis(jahresverbrauch_in_kWh: float, peak_leistung_in_kW: float, spannungsebene: Spannungsebene,
-                   ort: Literal["BER", "DUS", "DTM"]) -> float:
-    '''
+# Die Preisblätter der Netzbetreiber liegen als JSON-Dateien (je Ort und Jahr eine Datei) im Ordner "netzentgelte".
+# Für einen weiteren Netzbetreiber/Ort genügt es, dort eine weitere Datei mit derselben Struktur abzulegen.
+NETZENTGELTE_DATA_DIR = os.path.join(os.path.dirname(__file__), "netzentgelte")
+
+
+@functools.lru_cache(maxsize=None)
+def _lade_preisblaetter() -> Dict[Tuple[str, int], dict]:
+    """
+    Liest alle Preisblätter aus NETZENTGELTE_DATA_DIR ein.
+    @return: Dict mit (Ort, Jahr) als Schlüssel und dem eingelesenen Preisblatt als Wert
+    """
+    preisblaetter = {}
+    for datei in sorted(glob.glob(os.path.join(NETZENTGELTE_DATA_DIR, "*.json"))):
+        with open(datei, encoding="utf-8") as f:
+            preisblatt = json.load(f)
+        schluessel = (preisblatt["ort"], preisblatt["jahr"])
+        if schluessel in preisblaetter:
+            raise ValueError(f"Für {schluessel} sind mehrere Preisblätter hinterlegt (zuletzt gelesen: {datei}).")
+        preisblaetter[schluessel] = preisblatt
+    return preisblaetter
+
+
+def preisblatt(ort: str, jahr: int = 2024) -> dict:
+    """
+    @param ort: UN/LOCODE des Ortes.
+    @param jahr: Jahr, für das das Preisblatt gelten soll.
+    @return: Das Preisblatt (eingelesene JSON-Datei) des Netzbetreibers am angegebenen Ort für das angegebene Jahr.
+    """
+    preisblaetter = _lade_preisblaetter()
+    if (ort, jahr) not in preisblaetter:
+        raise ValueError(f"Für den Ort {ort} sind für das Jahr {jahr} keine Netzentgelte hinterlegt. Verfügbar sind: "
+                         f"{sorted(preisblaetter.keys())}")
+    return preisblaetter[(ort, jahr)]
+
+
+def netzentgelte(jahresverbrauch_in_kWh: ArrayLike, peak_leistung_in_kW: ArrayLike,
+                 spannungsebene: Spannungsebene, ort: str, jahr: int = 2024) -> (ArrayLike, ArrayLike):
+    """
+
+    Vektorisierte Auswertung des Preisblatts für die Netzentgelte am angegebenen Ort.
+    Jahresverbrauch und Peak können Skalare oder (broadcastbare) Arrays sein, sodass viele Kandidaten (bspw. für
+    Parametervariationen oder in der Optimierung) mit einem Aufruf bepreist werden können.
 
     @param jahresverbrauch_in_kWh: Jahresverbrauch in kWh
     @param peak_leistung_in_kW: Höchster aufgetretener Peak im Jahr bzw. erwartete Peak.
     @param spannungsebene: Spannungsebene, an der die Anlage angeschlossen ist.
-    @param ort: UN/LOCODE des Ortes. Aktuell sind nur bestimmte Orte implementiert.
-    @return: Spezifischer Leistungspreis in EUR/kW für die angegebenen Parameter
+    @param ort: UN/LOCODE des Ortes.
+    @param jahr: Jahr des Preisblatts
+    @return: 2-Tupel: Leistungspreis in EUR / kW; Arbeitspreis in ct/kWh. Skalare, falls nur Skalare übergeben wurden,
+    sonst Arrays in der gebroadcasteten Form der Eingaben.
+    """
+
+    if not isinstance(spannungsebene, Spannungsebene):
+        raise ValueError("Spannungsebene nicht bekannt")
+
+    pb = preisblatt(ort, jahr)
+    skalar = np.ndim(jahresverbrauch_in_kWh) == 0 and np.ndim(peak_leistung_in_kW) == 0
+    verbrauch, peak = np.broadcast_arrays(np.asarray(jahresverbrauch_in_kWh, dtype=float),
+                                          np.asarray(peak_leistung_in_kW, dtype=float))
+
+    # Jahresverbrauch < Grenze (i.d.R. 100 000 kWh)? (darüber registrierte Leistungsmessung angenommen)
+    ohne_lm = verbrauch < pb["grenze_leistungsmessung_in_kWh"]
+
+    # Jahresbenutzungdauer ergibt sich als Quotient aus der im Jahr entnommenen Arbeit in kWh und der zugehörigen
+    # Jahreshöchstleistung in kW
+    with np.errstate(divide='ignore', invalid='ignore'):
+        jahresbenutzungsdauer_in_h = verbrauch / peak
+    unter_grenze = jahresbenutzungsdauer_in_h < pb["grenze_jahresbenutzungsdauer_in_h"]
+
+    preise_unter = pb["unter_grenze_jahresbenutzungsdauer"][spannungsebene.name]
+    preise_ueber = pb["ueber_grenze_jahresbenutzungsdauer"][spannungsebene.name]
+
+    for preise, maske in [(preise_unter, unter_grenze), (preise_ueber, ~unter_grenze)]:
+        if preise is None and np.any(maske & ~ohne_lm):
+            raise ValueError(f"Für {ort} ({pb['netzbetreiber']}) ist im Preisblatt {jahr} kein Preis für die "
+                             f"Spannungsebene {spannungsebene.value} hinterlegt. Siehe {pb['quelle']}")
+
+    def _auswahl(feld):
+        # Fehlende Werte (null im Preisblatt) werden zu NaN, wurden aber oben bereits abgefangen, falls benötigt
+        wert_unter = np.nan if preise_unter is None else preise_unter[feld]
+        wert_ueber = np.nan if preise_ueber is None else preise_ueber[feld]
+        werte = np.where(ohne_lm, pb["ohne_leistungsmessung"][feld],
+                         np.where(unter_grenze, wert_unter, wert_ueber))
+        return float(werte) if skalar else werte
+
+    # Ignoriert wird hier der Grundpreis für Kunden ohne Leistungsmessung
+    return _auswahl("leistungspreis_in_EUR_per_kW"), _auswahl("arbeitspreis_in_ct_per_kWh")
+
+
+def leistungspreis(jahresverbrauch_in_kWh: ArrayLike, peak_leistung_in_kW: ArrayLike, spannungsebene: Spannungsebene,
+                   ort: Literal["BER", "DUS", "DTM"]) -> ArrayLike:
     '''
 
-    if ort == "DUS":
-        return _netzentgelte_duesseldorf(jahresverbrauch_in_kWh, peak_leistung_in_kW, spannungsebene)[0]
-    elif ort == "BER":
-        raise NotImplementedError
-    elif ort == "DTM":
-        return _netzentgelte_dortmund(jahresverbrauch_in_kWh, peak_leistung_in_kW, spannungsebene)[0]
-    else:
-        raise ValueError("Ort nicht bekannt.")
-
-def _netzentgelte_dortmund(jahresverbrauch_in_kWh: float, peak_leistung_in_kW: float,
-                              spannungsebene: Spannungsebene) -> (float, float):
+    @param jahresverbrauch_in_kWh: Jahresverbrauch in kWh (Skalar oder Array)
+    @param peak_leistung_in_kW: Höchster aufgetretener Peak im Jahr bzw. erwartete Peak (Skalar oder Array).
+    @param spannungsebene: Spannungsebene, an der die Anlage angeschlossen ist.
+    @param ort: UN/LOCODE des Ortes. Aktuell sind nur die Orte implementiert, für die ein Preisblatt im Ordner
+    "netzentgelte" liegt.
+    @return: Spezifischer Leistungspreis in EUR/kW für die angegebenen Parameter
     '''
 
-    Implementiertes Preisblatt für Dortmunder Netz GmbH.
-    Quelle: https://do-netz.de/fileadmin/user_upload/Dokumente/PDF/Netzentgelte/Strom/2024/Preisblatt_1_-_Entgelte_fuer_Netznutzung_Strom.pdf
+    return netzentgelte(jahresverbrauch_in_kWh, peak_leistung_in_kW, spannungsebene, ort)[0]
 
-    @param jahresverbrauch_in_kWh: Jahresverbrauch in kWh
-    @param peak_leistung_in_kW: Höchster aufgetretener Peak im Jahr bzw. erwartete Peak.
-    @param spannungsebene: Spannungsebene, an der die Anlage angeschlossen ist.
-    @return: 2-Tupel: Leistungspreis in EUR / kW; Arbeitspreis in ct/kWh.
 
+def _netzentgelte_dortmund(jahresverbrauch_in_kWh: ArrayLike, peak_leistung_in_kW: ArrayLike,
+                           spannungsebene: Spannungsebene) -> (ArrayLike, ArrayLike):
     '''
-
-    # Jahresverbrauch < 100 000 kWh? (darüber registrierte Leistungsmessung angenommen)
-    if jahresverbrauch_in_kWh < 100000:
-        return 0, 6.48 # scheinbar kein Leistungspreis
-        # Ignoriert wird hier der Grundpreis für Kunden ohne Leistungsmessung (99,50 EUR / a)
-    else:
-        # Leistungsmessung vorhanden
-
-        # Jahresbenutzungdauer ergibt sich als Quotient aus der im Jahr entnommenen Arbeit in kWh und der zugehörigen
-        # Jahreshöchstleistung in kW
-
-        jahresbenutzungsdauer_in_h = jahresverbrauch_in_kWh / peak_leistung_in_kW
-        # print("Jahresbenutzungsdauer in h: ", jahresbenutzungsdauer_in_h)
-        if jahresbenutzungsdauer_in_h < 2500:
-            if spannungsebene == Spannungsebene.HS:
-                raise ValueError("Für Dortmund ist dz. kein Arbeitspreis für Hochspannung in den Preisblättern auffindbar. Siehe https://do-netz.de/fileadmin/user_upload/Dokumente/PDF/Netzentgelte/Strom/2024/Preisblatt_1_-_Entgelte_fuer_Netznutzung_Strom.pdf")
-            elif spannungsebene == Spannungsebene.UHM:
-                return 22.82, 6.68
-            elif spannungsebene == Spannungsebene.MS:
-                return 23.89, 6.98
-            elif spannungsebene == Spannungsebene.UMN:
-                return 25.17, 7.43
-            elif spannungsebene == Spannungsebene.NIS:
-                return 29.71, 7.52
-            else:
-                raise ValueError("Spannungsebene nicht bekannt")
-        else:
-            if spannungsebene == Spannungsebene.HS:
-                raise ValueError(
-                    "Für Dortmund ist dz. kein Arbeitspreis für Hochspannung in den Preisblättern auffindbar. Siehe https://do-netz.de/fileadmin/user_upload/Dokumente/PDF/Netzentgelte/Strom/2024/Preisblatt_1_-_Entgelte_fuer_Netznutzung_Strom.pdf")
-            elif spannungsebene == Spannungsebene.UHM:
-                return 164.34, 1.02
-            elif spannungsebene == Spannungsebene.MS:
-                return 150.56, 1.92
-            elif spannungsebene == Spannungsebene.UMN:
-                return 161.28, 1.99
-            elif spannungsebene == Spannungsebene.NIS:
-                return 122.46, 3.81
-            else:
-                raise ValueError("Spannungsebene nicht bekannt")
-
-
-
-def _netzentgelte_duesseldorf(jahresverbrauch_in_kWh: float, peak_leistung_in_kW: float,
-                              spannungsebene: Spannungsebene) -> (float, float):
+    Implementiertes Preisblatt für Dortmunder Netz GmbH (siehe netzentgelte/DTM_2024.json).
+    @return: 2-Tupel: Leistungspreis in EUR / kW; Arbeitspreis in ct/kWh.
     '''
+    return netzentgelte(jahresverbrauch_in_kWh, peak_leistung_in_kW, spannungsebene, "DTM")
 
-    Implementiertes Preisblatt für Netzgesellschaft Düsseldorf mbH.
-    Quelle: https://netz-duesseldorf.de/media/mam-upload/2023-12-20--preisblatt-nne-strom-2024.pdf
 
-    @param jahresverbrauch_in_kWh: Jahresverbrauch in kWh
-    @param peak_leistung_in_kW: Höchster aufgetretener Peak im Jahr bzw. erwartete Peak.
-    @param spannungsebene: Spannungsebene, an der die Anlage angeschlossen ist.
+def _netzentgelte_duesseldorf(jahresverbrauch_in_kWh: ArrayLike, peak_leistung_in_kW: ArrayLike,
+                              spannungsebene: Spannungsebene) -> (ArrayLike, ArrayLike):
+    '''
+    Implementiertes Preisblatt für Netzgesellschaft Düsseldorf mbH (siehe netzentgelte/DUS_2024.json).
     @return: 2-Tupel: Leistungspreis in EUR / kW; Arbeitspreis in ct/kWh.
     '''
+    return netzentgelte(jahresverbrauch_in_kWh, peak_leistung_in_kW, spannungsebene, "DUS")
 
-    # Jahresverbrauch < 100 000 kWh? (darüber registrierte Leistungsmessung angenommen)
-    if jahresverbrauch_in_kWh < 100000:
-        return 0, 8.27
-        # Ignoriert wird hier der Grundpreis für Kunden ohne Leistungsmessung (12,- EUR / a)
-    else:
-        # Leistungsmessung vorhanden
-
-        # Jahresbenutzungdauer ergibt sich als Quotient aus der im Jahr entnommenen Arbeit in kWh und der zugehörigen Jah-
-        # reshöchstleistung in kW
-
-        jahresbenutzungsdauer_in_h = jahresverbrauch_in_kWh / peak_leistung_in_kW
-        # print("Jahresbenutzungsdauer in h: ", jahresbenutzungsdauer_in_h)
-        if jahresbenutzungsdauer_in_h < 2500:
-            if spannungsebene == Spannungsebene.HS:
-                return 16.08, 4.15
-            elif spannungsebene == Spannungsebene.UHM:
-                return 16.40, 5.65
-            elif spannungsebene == Spannungsebene.MS:
-                return 18.54, 5.70
-            elif spannungsebene == Spannungsebene.UMN:
-                return 16.15, 6.55
-            elif spannungsebene == Spannungsebene.NIS:
-                return 19.49, 6.53
-            else:
-                raise ValueError("Spannungsebene nicht bekannt")
-        else:
-            if spannungsebene == Spannungsebene.HS:
-                return 103.63, 0.65
-            elif spannungsebene == Spannungsebene.UHM:
-                return 143.39, 0.57
-            elif spannungsebene == Spannungsebene.MS:
-                return 119.61, 1.66
-            elif spannungsebene == Spannungsebene.UMN:
-                return 145.88, 1.36
-            elif spannungsebene == Spannungsebene.NIS:
-                return 89.99, 3.71
-            else:
-                raise ValueError("Spannungsebene nicht bekannt")
-
-
-def stromkosten_2024(jahresverbrauch_in_kWh: float,
-                     peak_leistung_in_kW: float,
+
+def stromkosten_2024(jahresverbrauch_in_kWh: ArrayLike,
+                     peak_leistung_in_kW: ArrayLike,
                      spannungsebene: Spannungsebene,
                      ort: Literal["BER", "DUS", "DTM"],
                      kat_konzession: Literal["TK_SL", "TK", "SVK"],
                      marge_in_ct: float = 3,
-                     ) -> float:
+                     ) -> ArrayLike:
 
     '''
 
     Bestimmung der festen und variablen Stromkosten für Deutschland/den gegebenen Ort der Abnahme im Jahr 2024,
     ohne weitere Vergünstigungen; ohne den Börsenstrompreis, für die gegebenen Einflussparameter.
+    Jahresverbrauch und Peak können auch als Arrays übergeben werden (vektorisierte Auswertung für viele Kandidaten).
 
     @param jahresverbrauch_in_kWh: Jahresverbrauch in kWh
     @param peak_leistung_in_kW: Der höchste aufgetretene Peak im Jahr bzw. erwartete Peak.
     @param kat_konzession: Kundenkategorie für Berechnung der Konzessionsabgabe. TK_SL für Tarifkunde schwachlast, TK für Tarifkunde, SVK für Sondervertragskunde
     @param marge_in_ct: Höhe der Marge des Versorgers/Lieferanten, in ct/kWh. Typischerweise was zwischen 1 und 5 ct
-    @param ort: UN/LOCODE des Ortes, für den die Stromkosten berechnet werden sollen. Aktuell sind nur bestimmte Orte implementiert.
+    @param ort: UN/LOCODE des Ortes, für den die Stromkosten berechnet werden sollen. Aktuell sind nur die Orte implementiert, für die ein Preisblatt im Ordner "netzentgelte" liegt.
     @return:
     Summe aller Stromkosten in EUR/kWh, ohne den Variablen Marktpreis (Anteil "Beschaffung & Vertrieb"), Messstellenbetrieb und den Leistungspreis der Netzentgelte (Euro/kW des höchsten Peaks)
 
@@ -165,6 +166,8 @@ def stromkosten_2024(jahresverbrauch_in_kWh: float,
     if kat_konzession not in ["TK_SL", "TK", "SVK"]:
         raise ValueError("Kategorie für Konzessionsabgabe nicht bekannt. Mögliche Werte sind: TK_SL (Tarifkunde Schwachlast), TK (Tarifkunde) oder SVK (Sondervertragskunde), aber übergeben wurde: ", kat_konzession)
 
+    skalar = np.ndim(jahresverbrauch_in_kWh) == 0 and np.ndim(peak_leistung_in_kW) == 0
+    jahresverbrauch_in_kWh = np.asarray(jahresverbrauch_in_kWh, dtype=float)
 
     # Preise in EUR am Ende. Weil aber meist überall von ct/kWh gesprochen wird, rechnen wir erst in ct und am ende /100
     preis_add = 0
@@ -175,14 +178,8 @@ def stromkosten_2024(jahresverbrauch_in_kWh: float,
 
     # 1.3 Konzessionsabgabe https://www.gesetze-im-internet.de/kav/BJNR000120992.html
     # gemeindegroesse_in_tsd_einwohner: Größe der Gemeinde, in der das System sich befindet. Bspw. bei 1000 Einwohnern wäre der Wert 1.
-
-    if ort == "BER":
-        gemeindegroesse_in_tsd_einwohner = 3645
-    elif ort == "DUS":
-        gemeindegroesse_in_tsd_einwohner = 619
-
-    elif ort == "DTM":
-        gemeindegroesse_in_tsd_einwohner = 595
+    # Wird zusammen mit den Netzentgelten im Preisblatt des Ortes hinterlegt.
+    gemeindegroesse_in_tsd_einwohner = preisblatt(ort, 2024)["gemeindegroesse_in_tsd_einwohner"]
 
     # ===
 
@@ -210,28 +207,24 @@ def stromkosten_2024(jahresverbrauch_in_kWh: float,
     # Für den Verbrauch über 1 Mio kWh 0.05 ct/kWh
     # Basierend auf dem Jahresverbrauch wird hieraus ein gewichteter Preis pro kWh berechnet
     # nur für Anforderungen in der TCO (Keine Aufteilung auf den Teil über und 1 Mio. EUR), kein Güteverlust
-    menge_unter_1e6 = min(jahresverbrauch_in_kWh, 1e6)
-    menge_ueber_1e6 = max(0.0, jahresverbrauch_in_kWh - 1e6)
-
-    # print("menge <1e6: ", menge_unter_1e6)
-    # print("menge >1e6: ", menge_ueber_1e6)
-    if jahresverbrauch_in_kWh == 0:
-        # Edge Case, falls kein lokaler elektrischer Verbrauch (bspw. wenn nur H2-Bedarf)
-        # Selbst wenn BDEW-Jahresbedarf > 0 hab ich in der GUI tlw. fälle, wo hier der =0 Fall eintritt (vermutlich wenn alles durch lokale Produktion gedeckt)
-        anteil_unter_1e6 = 0
-        anteil_ueber_1e6 = 0
-    else:
-        anteil_unter_1e6 = menge_unter_1e6 / jahresverbrauch_in_kWh
-        anteil_ueber_1e6 = menge_ueber_1e6 / jahresverbrauch_in_kWh
+    menge_unter_1e6 = np.minimum(jahresverbrauch_in_kWh, 1e6)
+    menge_ueber_1e6 = np.maximum(0.0, jahresverbrauch_in_kWh - 1e6)
 
-    preis_add += anteil_unter_1e6 * 0.643
-    preis_add += anteil_ueber_1e6 * 0.05
+    # Edge Case, falls kein lokaler elektrischer Verbrauch (bspw. wenn nur H2-Bedarf): Anteile sind dann 0
+    # Selbst wenn BDEW-Jahresbedarf > 0 hab ich in der GUI tlw. fälle, wo hier der =0 Fall eintritt (vermutlich wenn alles durch lokale Produktion gedeckt)
+    kein_verbrauch = jahresverbrauch_in_kWh == 0
+    nenner = np.where(kein_verbrauch, 1.0, jahresverbrauch_in_kWh)
+    anteil_unter_1e6 = np.where(kein_verbrauch, 0.0, menge_unter_1e6 / nenner)
+    anteil_ueber_1e6 = np.where(kein_verbrauch, 0.0, menge_ueber_1e6 / nenner)
+
+    preis_add = preis_add + anteil_unter_1e6 * 0.643
+    preis_add = preis_add + anteil_ueber_1e6 * 0.05
 
     # 3. Energiebereitstellung
     # 3.1 und 3.2 Beschaffung und Vertrieb => Marktpreis, wird an anderer Stelle aufgeschlagen
 
     # 3.3 Marge
-    preis_add += marge_in_ct
+    preis_add = preis_add + marge_in_ct
 
     # 4. Infrastrukturkosten
 
@@ -239,23 +232,14 @@ def stromkosten_2024(jahresverbrauch_in_kWh: float,
     # Nicht bilanziert: Leistungspreis [Euro/kW]
     # erfolgt erst NACH Bilanzierung der variablen Stromkosten pro kWh
 
-    # Regional unterschiedlich. Hier können weitere Orte hinzugefügt werden
-    if ort == "DUS":
-        preis_add += _netzentgelte_duesseldorf(jahresverbrauch_in_kWh=jahresverbrauch_in_kWh,
-                                               peak_leistung_in_kW=peak_leistung_in_kW, spannungsebene=spannungsebene)[1]
-    elif ort == "BER":
-        raise NotImplementedError
-
-    elif ort == "DTM":
-        preis_add += _netzentgelte_dortmund(jahresverbrauch_in_kWh=jahresverbrauch_in_kWh,
-                                               peak_leistung_in_kW=peak_leistung_in_kW, spannungsebene=spannungsebene)[1]
-
-    else:
-        raise ValueError(f"Für den {ort} sind keine Netzentgelte hinterlegt.")
+    # Regional unterschiedlich, aus dem Preisblatt des Ortes (weitere Orte: Datei im Ordner "netzentgelte" ergänzen)
+    preis_add = preis_add + netzentgelte(jahresverbrauch_in_kWh=jahresverbrauch_in_kWh,
+                                         peak_leistung_in_kW=peak_leistung_in_kW,
+                                         spannungsebene=spannungsebene, ort=ort, jahr=2024)[1]
 
     # 4.2 Messung & Messstellenbetrieb
     # Annahme: Kosten vergleichsweise klein oder über die Netzentgelte mit abgerechnet, daher hier vorerst rausgelassen.
     # Müsste vermutlich eh "je Zählstelle" bilanziert werden und nicht über den Strompreis.
 
-    return preis_add / 100  # EUR/kWh
-
+    preis_eur = preis_add / 100  # EUR/kWh
+    return float(preis_eur) if skalar else preis_eur
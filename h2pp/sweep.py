@@ -0,0 +1,240 @@
+'''
+
+Parameterstudien (Sensitivitätsanalysen) ohne temporäre Konfigurationsdateien.
+
+Jeder Punkt einer Studie ist eine Kopie der (nicht aufbereiteten) Basiskonfiguration, in der einzelne Werte über
+Schlüsselpfade ersetzt sind, bspw. ("electrolyzer", "fixed_p") oder "electrolyzer.fixed_p". Die Punkte werden im Speicher
+erzeugt und parallel im dauerhaften Prozesspool ausgewertet (optimizer.optimize_prepared, siehe worker_pool.py).
+
+Die Aufbereitung (prep_sim_config_dict: Zeitreihen, PV, BDEW, Strompreise) hängt nur von den Einträgen in
+PREPARATION_KEYS ab. Sie erfolgt daher nur einmal je Kombination dieser Einträge, alle Punkte mit gleichen Einträgen
+nutzen dieselben aufbereiteten Zeitreihen. Bei den meisten Studien (Preise, Wirkungsgrade, Komponenten) ist dies genau
+eine Aufbereitung. Der Pool hält die zuletzt verwendeten Aufbereitungen auch über mehrere Studien hinweg.
+
+- sweep: 1-D-Studien, Gitter über mehrere Schlüsselpfade (bspw. Paar-Sensitivitäten) und Szenariolisten, Ergebnis als
+  pandas DataFrame mit einer Zeile je Punkt
+- evaluate_configs: Auswertung einer Liste vollständiger Konfigurationen (bspw. mehrere Szenarien als eigene dicts)
+- iter_evaluations: Auswertung von Konfigurationen aus verschiedenen Ordnern und mit verschiedenen modes, die Ergebnisse
+  werden geliefert, sobald sie fertig sind (siehe batch.py)
+
+Skripte, die Studien parallel auswerten, benötigen unter Windows und macOS (die Prozesse werden dort mit "spawn"
+gestartet) den Schutz if __name__ == "__main__":, bspw. mit dem Skript in einer Funktion main(), die nur dort aufgerufen
+wird (siehe MA_Fallbeispiele/04_Sensitivitaetsanalysen).
+
+'''
+
+import copy
+import itertools
+import os
+import traceback
+from concurrent.futures import as_completed, wait
+from typing import Any, Dict, Iterator, List, Literal, Sequence, Tuple
+
+import pandas as pd
+
+from h2pp import instrumentation, worker_pool
+from h2pp.optimizer import optimize_prepared, prepare_config, preparation_signature, with_unprepared_entries
+from h2pp.shared_config import SharedConfigHandle, attach_config
+
+# Einträge des Berichts der Multi-Fidelity-Optimierung, die als Spalten in die Ergebnisse übernommen werden
+MULTI_FIDELITY_COLUMNS = ("fidelity_gap_mean", "fidelity_gap_max", "rank_correlation")
+
+
+def _key_path(key_path) -> Tuple:
+    if isinstance(key_path, str):
+        return tuple(key_path.split("."))
+    return tuple(key_path)
+
+
+def column_name(key_path) -> str:
+    """
+    @return: Schlüsselpfad als String mit Punkten als Trennzeichen (Spaltenname in den Ergebnistabellen)
+    """
+    return ".".join(str(key) for key in _key_path(key_path))
+
+
+def set_by_key_path(config: Dict, key_path, value):
+    """
+    Setzt einen Wert in einem verschachtelten dict (inplace).
+
+    @param key_path: Liste/Tupel von Schlüsseln oder String mit Punkten als Trennzeichen, bspw. "electrolyzer.fixed_p"
+    """
+    keys = _key_path(key_path)
+    for key in keys[:-1]:
+        config = config[key]
+    config[keys[-1]] = value
+
+
+def apply_overrides(config: Dict, overrides: Dict) -> Dict:
+    """
+    @param overrides: dict Schlüsselpfad -> Wert
+    @return: Kopie von config mit den ersetzten Werten (config wird nicht verändert)
+    """
+    config = copy.deepcopy(config)
+    for key_path, value in overrides.items():
+        set_by_key_path(config, key_path, value)
+    return config
+
+
+class _PreparationError(str):
+    # Traceback einer fehlgeschlagenen Aufbereitung (statt der aufbereiteten Konfiguration der Gruppe)
+    pass
+
+
+def _prepare(config, config_file_path, catch_errors) -> Dict:
+    try:
+        return prepare_config(config, config_file_path)
+    except Exception:
+        if not catch_errors:
+            raise
+        return _PreparationError(traceback.format_exc())
+
+
+def _evaluate_point(task):
+    """
+    Wertet einen Punkt aus: aufbereitete Konfiguration seiner Gruppe plus alle übrigen Einträge des Punktes. Muss auf
+    Modulebene liegen, damit er an die Prozesse übergeben werden kann; im Prozess wird die aufbereitete Konfiguration
+    aus dem gemeinsamen Speicher eingebunden (siehe shared_config.py).
+
+    @return: 3-Tupel: EvaluationResult, dict mit dem Entwurf und None, bzw. bei einem Fehler (nur mit catch_errors)
+        None, None und der Traceback
+    """
+    prepared_config, config, mode, pop_size, n_gen, catch_errors, kwargs = task
+    if isinstance(prepared_config, _PreparationError):
+        return None, None, prepared_config
+    if isinstance(prepared_config, SharedConfigHandle):
+        prepared_config = attach_config(prepared_config)
+
+    sim_config_dict = with_unprepared_entries(prepared_config, config)
+    try:
+        eval_res, design = optimize_prepared(sim_config_dict, mode=mode, pop_size=pop_size, n_gen=n_gen,
+                                             print_progress=False, **kwargs)
+    except Exception:
+        if not catch_errors:
+            raise
+        return None, None, traceback.format_exc()
+
+    return eval_res, design, None
+
+
+def iter_evaluations(points: List[Tuple[Dict, str, str]], max_workers=None, pop_size=50, n_gen=100,
+                     catch_errors=False, **kwargs) -> Iterator[Tuple[int, Tuple]]:
+    """
+    Wertet Punkte aus, mit einer Aufbereitung je Kombination der Einträge in PREPARATION_KEYS (und Ordner der
+    Konfiguration), und liefert die Ergebnisse, sobald sie fertig sind (bspw. zum Speichern in batch.py).
+
+    @param points: Liste von 3-Tupeln: nicht aufbereitete Konfiguration, Pfad ihrer JSON Datei bzw. einer Datei im
+        selben Ordner (nur der Ordner wird für relative Pfadangaben benötigt, es wird nichts geschrieben), mode
+        (wie bei optimizer.optimize_h2pp)
+    @param max_workers: Anzahl der Prozesse des dauerhaften Pools (Standard: Anzahl der CPUs, siehe
+        worker_pool.get_pool); 1 wertet alle Punkte nacheinander in diesem Prozess aus
+    @param pop_size, n_gen, kwargs: wie bei optimizer.optimize_h2pp
+    @param catch_errors: True, um Fehler einzelner Punkte als Ergebnis zu liefern, statt die Auswertung abzubrechen
+    @return: Iterator über 2-Tupel (Index des Punktes, Ergebnis wie bei _evaluate_point), in der Reihenfolge der
+        Fertigstellung
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count()
+
+    def signature(point):
+        config, config_file_path, _ = point
+        return preparation_signature(config) + os.path.dirname(os.path.abspath(config_file_path))
+
+    groups = {}
+    for point in points:
+        groups.setdefault(signature(point), point)
+    group_index = {key: i for i, key in enumerate(groups)}
+
+    configs = [config for config, _, _ in points]
+    if max_workers > 1:
+        # Parallelisierung nur über die Punkte, nicht zusätzlich über die Perioden je Punkt
+        configs = [{**config, "max_workers_periods": 1} for config in configs]
+
+    def tasks(prepared_configs):
+        return [(prepared_configs[group_index[signature(point)]], config, point[2], pop_size, n_gen, catch_errors,
+                 kwargs) for point, config in zip(points, configs)]
+
+    if max_workers == 1 or len(points) <= 1:
+        prepared_configs = [_prepare(config, config_file_path, catch_errors)
+                            for config, config_file_path, _ in groups.values()]
+        for i, task in enumerate(tasks(prepared_configs)):
+            yield i, _evaluate_point(task)
+        return
+
+    # Dauerhafter Pool: Prozesse und zuletzt verwendete Aufbereitungen bleiben für folgende Aufrufe erhalten
+    worker_pool.get_pool(max_workers)
+    with worker_pool.prepared_config_handles([(config, config_file_path) for config, config_file_path, _
+                                              in groups.values()], catch_errors=catch_errors) as handles:
+        handles = [_PreparationError(handle) if isinstance(handle, str) else handle for handle in handles]
+        futures = {worker_pool.submit(_evaluate_point, task): i for i, task in enumerate(tasks(handles))}
+        try:
+            for future in as_completed(futures):
+                yield futures[future], instrumentation.from_worker(future.result())
+        finally:
+            # Bei Abbruch (bspw. KeyboardInterrupt) keine weiteren Punkte starten und auf die laufenden warten, bevor
+            # der gemeinsame Speicher freigegeben werden kann
+            for future in futures:
+                future.cancel()
+            wait(futures)
+
+
+def evaluate_configs(configs: List[Dict], config_file_path: str,
+                     mode: Literal["normal", "battery_ref", "power_grid_only_ref"] = "normal", max_workers=None,
+                     pop_size=50, n_gen=100, **kwargs) -> List[Dict]:
+    """
+    Wertet eine Liste (nicht aufbereiteter) Konfigurationen aus (siehe iter_evaluations).
+
+    @param config_file_path: siehe iter_evaluations
+    @param mode, max_workers, pop_size, n_gen, kwargs: siehe iter_evaluations
+    @return: Liste mit einem dict je Konfiguration: Entwurf (p_el, p_fc, m_tank, compress_before_storing, c_battery),
+        npv_total, das TCO Objekt (tco) und mit "multi_fidelity" in der Konfiguration die beobachtete Abweichung
+        (MULTI_FIDELITY_COLUMNS, siehe optimizer.multi_fidelity_minimize)
+    """
+    results = [None] * len(configs)
+    for i, (eval_res, design, _) in iter_evaluations([(config, config_file_path, mode) for config in configs],
+                                                     max_workers=max_workers, pop_size=pop_size, n_gen=n_gen,
+                                                     **kwargs):
+        results[i] = {**design, "npv_total": eval_res.tco.npv_total, "tco": eval_res.tco}
+        if eval_res.multi_fidelity_report is not None:
+            results[i].update({key: eval_res.multi_fidelity_report[key] for key in MULTI_FIDELITY_COLUMNS})
+    return results
+
+
+def sweep(base_config: Dict, config_file_path: str, axes: Dict[Any, Sequence] = None,
+          scenarios: Dict[str, Dict] = None, mode: Literal["normal", "battery_ref", "power_grid_only_ref"] = "normal",
+          max_workers=None, pop_size=50, n_gen=100, **kwargs) -> pd.DataFrame:
+    """
+    Parameterstudie über alle Kombinationen der Werte in axes (Gitter), je Szenario.
+
+    Beispiele:
+    - 1-D: axes={"aufschlag_strom_manuell_ct": np.linspace(0, 25, 10)}
+    - Paar: axes={"electrolyzer.fixed_p": [100, 500], "aufschlag_strom_manuell_ct": np.linspace(0, 25, 10)}
+    - Szenarien: scenarios={"Basis": {}, "Ohne Entgelte": {"nur_beschaffungskosten": True}}
+
+    @param base_config: nicht aufbereitete Konfiguration (geparste JSON Datei), wird nicht verändert
+    @param config_file_path: siehe evaluate_configs
+    @param axes: dict Schlüsselpfad -> Werte
+    @param scenarios: dict Name -> dict Schlüsselpfad -> Wert (Standard: nur die Basiskonfiguration)
+    @param mode, max_workers, pop_size, n_gen, kwargs: siehe evaluate_configs
+    @return: DataFrame mit einer Zeile je Punkt: Szenario (falls angegeben), je Schlüsselpfad eine Spalte mit dem Wert,
+        Entwurf (p_el, p_fc, m_tank, compress_before_storing, c_battery), npv_total und das TCO Objekt (tco)
+    """
+    axes = axes or {}
+    if scenarios is None:
+        scenario_overrides = {None: {}}
+    else:
+        scenario_overrides = scenarios
+
+    points = []
+    configs = []
+    for scenario, overrides in scenario_overrides.items():
+        for values in itertools.product(*axes.values()):
+            point_overrides = {**overrides, **dict(zip(axes.keys(), values))}
+            configs.append(apply_overrides(base_config, point_overrides))
+            points.append(({"scenario": scenario} if scenarios is not None else {})
+                          | {column_name(key_path): value for key_path, value in zip(axes.keys(), values)})
+
+    results = evaluate_configs(configs, config_file_path, mode=mode, max_workers=max_workers, pop_size=pop_size,
+                               n_gen=n_gen, **kwargs)
+
+    return pd.DataFrame([point | result for point, result in zip(points, results)])
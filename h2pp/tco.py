@@ -14,30 +14,31 @@ import pandas as pd
 import numpy as np
 import math
 import os
-from matplotlib import pyplot as plt
-import plotly.express as px
-import plotly.graph_objects as go
+from plotly.colors import qualitative
 
-# Disable MathJax for Kaleido so that we will not get the "loading MathJax..." message on our PDF exports
-import plotly.io as pio
-from plotly.subplots import make_subplots
+# matplotlib und plotly (bis auf die Farbpaletten) werden erst in den Plot-Funktionen importiert, damit reine
+# Auswertungen (bspw. in Prozesspools) sie nicht laden müssen.
 
-pio.kaleido.scope.mathjax = None
+
+def _configure_plotly():
+    # Disable MathJax for Kaleido so that we will not get the "loading MathJax..." message on our PDF exports
+    import plotly.io as pio
+    pio.kaleido.scope.mathjax = None
 
 
 # Color Mappings to have the same colors for the categories in all plots
 h2pp_color_mappings = {
-                    "Elektrolyseur": px.colors.qualitative.Plotly[0],
-                    "Brennstoffzelle": px.colors.qualitative.Plotly[1],
-                    "Tank_LP": px.colors.qualitative.Plotly[3],
-                    "Batterie": px.colors.qualitative.Plotly[3],
-                    "HRS_Infrastruktur": px.colors.qualitative.Plotly[2],
-                    "Electricity_Buy": px.colors.qualitative.Plotly[9],
-                    "OMC_EL_BZ_LPTank": px.colors.qualitative.Plotly[6],
-                    "OMC_HRS_Infra": px.colors.qualitative.Plotly[8],
-                    "H2_Buy": px.colors.qualitative.Plotly[5],
-                    "Electricity_Sell": px.colors.qualitative.Plotly[4],
-                    "Heat_Savings": px.colors.qualitative.Plotly[7],
+                    "Elektrolyseur": qualitative.Plotly[0],
+                    "Brennstoffzelle": qualitative.Plotly[1],
+                    "Tank_LP": qualitative.Plotly[3],
+                    "Batterie": qualitative.Plotly[3],
+                    "HRS_Infrastruktur": qualitative.Plotly[2],
+                    "Electricity_Buy": qualitative.Plotly[9],
+                    "OMC_EL_BZ_LPTank": qualitative.Plotly[6],
+                    "OMC_HRS_Infra": qualitative.Plotly[8],
+                    "H2_Buy": qualitative.Plotly[5],
+                    "Electricity_Sell": qualitative.Plotly[4],
+                    "Heat_Savings": qualitative.Plotly[7],
                 }
 
 h2pp_groupings = {
@@ -612,6 +613,8 @@ class TCO:
         """plots the time development of a unit cost
         kwargs:
             figsize: sets the size of the figure"""
+        from matplotlib import pyplot as plt
+
         fig, ax1 = plt.subplots()
         plt.title(title)
         ax1.set_xlabel(xlabel='Jahr', fontsize=10)
@@ -639,6 +642,8 @@ class TCO:
                                                         'period_cumulated',
                                                **kwargs):
         # TODO this is eflips-tco legacy code, never used in the project, only left in for now
+        from matplotlib import pyplot as plt
+
         fig, ax1 = plt.subplots()
         ax1.set_xlabel(xlabel='Jahr', fontsize=10)
         ax1.set_ylabel(ylabel='Mio. €', fontsize=10)
@@ -669,6 +674,8 @@ class TCO:
         @param include_title: bool, gibt an, ob der Plot mit einem Titel versehen werden soll
         @return: Plotly figure
         """
+        import plotly.express as px
+        _configure_plotly()
 
         # Transformiere das DataFrame, sodass die Jahre die Zeilen und die Typen die Spalten sind
         # Melt the DataFrame in order to perform bar plot
@@ -743,6 +750,8 @@ class TCO:
                                                 xlimit=None, file_format=".png",
                                                 **kwargs):
         # TODO this is eflips-tco legacy code, never used in the project, only left in for now
+        from matplotlib import pyplot as plt
+
         fig, ax1 = plt.subplots()
         ax1.set_xlabel(xlabel='Jahr', fontsize=10)
         ax1.set_ylabel(ylabel='Mio. €', fontsize=10)
@@ -784,6 +793,8 @@ class TCO:
             kwargs:
             colors: dict with components as keys and colors as value
         """
+        from matplotlib import pyplot as plt
+
         fig, ax1 = plt.subplots()
         ax1.set_xlabel(xlabel=xlabel, fontsize=10)
         ax1.set_ylabel(ylabel='Mio. €', fontsize=10)
@@ -838,6 +849,8 @@ class TCO:
     def plot_sum_separated(self, plot_percentage=False, saveplot=False,
                            filename='sum_separated', annotate=False):
         # TODO this is eflips-tco legacy code, never used in the project, only left in for now
+        from matplotlib import pyplot as plt
+
         fig, ax1 = plt.subplots()
         if plot_percentage is False:
             ax1.set_ylabel(ylabel='Mio. €', fontsize=10)
@@ -887,6 +900,10 @@ def plot_donut_tco_fractions(list_of_tcos, list_of_hover_labels, list_of_short_l
     :param list_of_short_labels:
     :return: The plotly figure
     """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    _configure_plotly()
+
     number_of_tcos = len(list_of_tcos)
     # Create subplots: use 'domain' type for Pie subplot
     fig = make_subplots(rows=1, cols=number_of_tcos, specs=[[{'type': 'domain'}]*number_of_tcos])
@@ -932,6 +949,8 @@ def plot_multiple_tco_costs_and_revenue_bars(list_of_tcos, list_of_names):
     :param list_of_names: list of names for the TCO objects, used as labels in the plot, should have the same length as list_of_tcos and contain the names in the same order
     :return: The plotly figure
     """
+    import plotly.express as px
+    _configure_plotly()
 
     x_npv_values = []
     y_tco_item = []
@@ -972,6 +991,8 @@ def plot_multiple_tco_total_bars(list_of_tcos, list_of_names):
     :param list_of_names: list of names for the TCO objects, used as labels in the plot, should have the same length as list_of_tcos and contain the names in the same order
     :return: The plotly figure
     """
+    import plotly.express as px
+    _configure_plotly()
 
     x_npv_values = []
     y_tco_item = []
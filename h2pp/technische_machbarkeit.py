@@ -16,26 +16,33 @@ import json
 import math
 import os
 import warnings
+from typing import Literal
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 from oemof import solph
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from oemof.tools.debugging import SuspiciousUsageWarning
 from oemof.solph import views
 
 from h2pp import helperFunctions
 from h2pp.generators import Jahreszeit, create_electrolyzer, create_fuel_cell_chp, create_simple_inverter, \
-    create_h2_storage, convert_kWh_to_kg_H2
-from h2pp.optimizer import prep_sim_config_dict
+    create_h2_storage, convert_kWh_to_kg_H2, convert_kg_H2_to_kWh
+from h2pp.optimizer import prep_sim_config_dict, prep_whole_year_time_series
 from h2pp.helperFunctions import get_max_depth
-from matplotlib import pyplot as plt
 
 # switch on SuspiciousUsageWarning
 warnings.filterwarnings("always", category=SuspiciousUsageWarning)
 
+# Zeitreihen, die für die Simulation der Notstromversorgung benötigt werden (Wasserstofferzeuger und -verbraucher werden ignoriert)
+BACKUP_SUPPLY_TS_KEYS = ['dc_generators_all_ts', 'ac_generators_all_ts', 'ac_consumers_all_ts', 'dc_consumers_all_ts']
+
 def _calculate_fc_power_and_tank_mass(parsed_json, file_path,
                                       freq_in_min,
-                                      plot_fc_and_tank=False):
+                                      plot_fc_and_tank=False,
+                                      jahreszeit: Jahreszeit = Jahreszeit.WINTER,
+                                      method: Literal["numpy", "lp"] = "numpy"):
 
     """
     Berechnet eine obere Schranke für die Brennstoffzellenleistung und den Tank.
@@ -43,6 +50,8 @@ def _calculate_fc_power_and_tank_mass(parsed_json, file_path,
     Bestimmt zu jedem Zeitpunkt die Leistung der Brennstoffzelle und den Füllstand des Tanks (wobei der Tank zum Simulationsstart als Füllstand die berechnete obere Schranke hat und sukzessive entleert wird).
     :param parsed_json:
     :param freq_in_min:
+    :param jahreszeit: Jahreszeit, deren typische Woche betrachtet wird. Standardmäßig der "worst case" Winter.
+    :param method: siehe _simulate_backup_supply
     :return:
     """
 
@@ -50,19 +59,169 @@ def _calculate_fc_power_and_tank_mass(parsed_json, file_path,
     # Note that the function will mutate the dict inplace, as dictionaries are passed by reference in Python by default
     prep_sim_config_dict(parsed_json=parsed_json, config_file_path=file_path)
 
-    # From here on the script has huge similarities to the run_simulation function in the simulator.py file
-    # however we still "reimplement" the important parts here to keep the run_simulation function still readable...
+    week_ts = {key: parsed_json[key][jahreszeit.name] for key in BACKUP_SUPPLY_TS_KEYS}
 
-    # Baue das Energysystem auf und simuliere es mit einer "ausreichend großen Größe" für Brennstoffzelle und Tank.
-    # "ausreichend groß" = orientiert an einer absolut oberen Schranke, die sich u.a. aus den maximalen Verbrauchsspitzen ergibt.
+    return _simulate_backup_supply(week_ts, _backup_supply_parameters(parsed_json), freq_in_min, plot_fc_and_tank,
+                                   method=method)
 
-    # Do everything for a "worst case" winter scenario
-    # TODO: even better would be an repetitive "coldest winter day" scenario.
-    jahreszeit = Jahreszeit.WINTER
 
+def _backup_supply_parameters(parsed_json) -> dict:
+    """
+    Extrahiert die für die Simulation der Notstromversorgung nötigen Parameter aus der (aufbereiteten) Konfiguration,
+    damit nicht die komplette Konfiguration an Worker-Prozesse übergeben werden muss.
+    """
+    return {
+        "electrolyzer": parsed_json["electrolyzer"],
+        "fuelcell": parsed_json["fuelcell"],
+        "inverter_efficiency": parsed_json["inverter_efficiency"],
+    }
+
+
+def _simulate_backup_supply(week_ts, parsed_json, freq_in_min, plot_fc_and_tank=False,
+                            method: Literal["numpy", "lp"] = "numpy"):
+    """
+    Simuliert die Notstromversorgung (Inselbetrieb) für eine Woche (+ 2 Tage) mit den übergebenen Zeitreihen.
+    :param week_ts: dict mit den Zeitreihen für eine Woche (Schlüssel siehe BACKUP_SUPPLY_TS_KEYS), im Format der
+        typischen Wochen (7 Tage, geschlossenes Intervall)
+    :param parsed_json: Parameter für Elektrolyseur, Brennstoffzelle und Inverter (siehe _backup_supply_parameters)
+    :param method: "numpy": direkte Zeitschrittsimulation ohne Solver (_simulate_backup_supply_numpy),
+        "lp": Simulation mit oemof/CBC (_simulate_backup_supply_lp), bspw. zur Validierung
+    :return: Leistung der Brennstoffzelle und Tankfüllstand (kg) zu jedem Zeitpunkt der 9 Tage
+    """
     if (24*60) % freq_in_min != 0:
         raise ValueError(f"Base simulation interval {freq_in_min} is not a divisor of 24*60 minutes!")
 
+    if method == "numpy":
+        bz_el, tank_fuellstand_kg = _simulate_backup_supply_numpy(week_ts, parsed_json, freq_in_min)
+    elif method == "lp":
+        bz_el, tank_fuellstand_kg = _simulate_backup_supply_lp(week_ts, parsed_json, freq_in_min)
+    else:
+        raise ValueError(f"Unknown method {method} for the simulation of the backup supply!")
+
+    if plot_fc_and_tank:
+        from matplotlib import pyplot as plt
+
+        # Lets plot the bz_el and tank_fuellstand_kg in a diagram (separate y-axis for each.)
+        fig, ax1 = plt.subplots()
+
+        color = 'tab:red'
+        ax1.set_xlabel('time')
+        ax1.set_ylabel('Brennstoffzelle (kW)', color=color)
+        ax1.plot(bz_el, color=color)
+        ax1.tick_params(axis='y', labelcolor=color)
+
+        ax2 = ax1.twinx()
+        color = 'tab:blue'
+        ax2.set_ylabel('Tankfüllung (kg)', color=color)
+        ax2.plot(tank_fuellstand_kg, color=color)
+        ax2.tick_params(axis='y', labelcolor=color)
+
+        plt.show()
+
+        print("DONE")
+
+    # return Fuel Cell Power draw and the tank mass (starting from the calculated upper bound) at each timestep for the 9 days
+    return bz_el, tank_fuellstand_kg
+
+
+def _extend_week_to_nine_days(week_ts, freq_in_min):
+    """
+    Verlängert die Zeitreihen auf 9 tage, indem wir die ersten 2 tage nochmal ranhängen (achtung, letzter Eintrag muss
+    vorher rausgeschmissen werden "closed interval" (sonst doppelt)
+    :return: die 9-Tage-Zeitreihen in der Reihenfolge dc-Erzeuger, ac-Erzeuger, ac-Verbraucher, dc-Verbraucher
+    """
+    num_steps = ((24 * 60 * 2) // freq_in_min) + 1 # +1 wegen closed interval des simulation time index wieder. unten dann tatsächlich nur bis num_steps, weil der index bei 0 beginnt
+    return tuple(np.concatenate((np.asarray(week_ts[key])[:-1], np.asarray(week_ts[key])[:num_steps]))
+                 for key in BACKUP_SUPPLY_TS_KEYS)
+
+
+def _backup_supply_upper_bounds(consumed_ac_electricity_ts, consumed_dc_electricity_ts, inv_eff, eta_fc_el, freq_in_min):
+    """
+    Obere Schranken für die Brennstoffzellenleistung (kW) und die Tankgröße (kg) der Notstromversorgung.
+    """
+    # calculate "upper bound" for the necessary fuel cell power output
+    # as we directly specify the output power, the only thing that needs to be scaled is the AC power (AC/DC conversion necessary)
+    # (fuel cell outputs DC energy)
+    consumption_dc_equiv_total_ts = ((consumed_ac_electricity_ts / inv_eff) + consumed_dc_electricity_ts)
+    fc_upper_bound_power = np.max(consumption_dc_equiv_total_ts)
+
+    # Max tank capacity depends on the consumers again; we can only ensure feasibility if we make the tank big enough to cover the full demand over the week (+2 days) alone
+    el_upper_bound_sum_kwh = np.sum(consumption_dc_equiv_total_ts) / (freq_in_min / 60)  # in kWh
+    kwhs_needed_tank = el_upper_bound_sum_kwh / eta_fc_el
+    m_tank_min = convert_kWh_to_kg_H2(kwhs_needed_tank)
+
+    return fc_upper_bound_power, m_tank_min
+
+
+def _simulate_backup_supply_numpy(week_ts, parsed_json, freq_in_min, refill_tank=False):
+    """
+    Direkte Zeitschrittsimulation der Notstromversorgung ohne Solver. Bildet dieselbe Einsatzreihenfolge ab wie das LP
+    in _simulate_backup_supply_lp:
+    1. Lokale Erzeugung deckt den Verbrauch (AC/DC-Ausgleich über die Inverter).
+    2. Überschüsse gehen (umgerechnet auf DC) in den Elektrolyseur, begrenzt durch seine Leistung und den freien
+       Platz im Tank; der Rest wird abgeregelt.
+    3. Die Brennstoffzelle deckt das verbleibende Defizit aus dem (zu Beginn vollen) Tank.
+
+    Die Brennstoffzellenleistung ist damit in jedem Zeitschritt eindeutig bestimmt. Beim Tankfüllstand ist das LP nicht
+    eindeutig: Im Tank gespeicherter Wasserstoff hat dort keinen Wert, Überschüsse können daher ohne Kosten statt im
+    Elektrolyseur auch über die Inverterverluste (AC -> DC -> AC ...) "verbrannt" werden, was CBC in der Regel auch tut.
+    :param refill_tank: False (Standard): kein Nachfüllen des Tanks, entspricht der vom LP gelieferten Lösung
+        (konservativ). True: Überschüsse werden wie oben beschrieben elektrolysiert (realistischer Betrieb, kleinere
+        nötige Tankmasse).
+    :return: Leistung der Brennstoffzelle und Tankfüllstand (kg) zu jedem Zeitpunkt der 9 Tage (wie im LP)
+    """
+    generator_dc_electricity_ts, generator_ac_electricity_ts, consumed_ac_electricity_ts, consumed_dc_electricity_ts = \
+        _extend_week_to_nine_days(week_ts, freq_in_min)
+
+    inv_eff = parsed_json["inverter_efficiency"]
+    eta_fc_el = parsed_json["fuelcell"]["efficiency_electric"]
+    wirkungsgrad_elektrolyseur = parsed_json["electrolyzer"]["efficiency"]
+    leistung_elektrolyseur = parsed_json["electrolyzer"]["fixed_p"]  # kW (H2-Ausgangsleistung)
+    interval_h = freq_in_min / 60
+
+    _, m_tank_min = _backup_supply_upper_bounds(consumed_ac_electricity_ts, consumed_dc_electricity_ts, inv_eff,
+                                                eta_fc_el, freq_in_min)
+    tank_capacity_kwh = convert_kg_H2_to_kWh(m_tank_min + 10)
+
+    # Bilanz je Bus; AC-Überschüsse kommen nur mit Verlust auf den DC-Bus, AC-Defizite kosten mehr DC-Leistung
+    net_ac = generator_ac_electricity_ts - consumed_ac_electricity_ts
+    net_dc = generator_dc_electricity_ts - consumed_dc_electricity_ts
+    net_dc_equiv = net_dc + np.where(net_ac >= 0, net_ac * inv_eff, net_ac / inv_eff)
+
+    bz_el = np.maximum(-net_dc_equiv, 0)
+    if refill_tank:
+        elektrolyse_h2 = np.minimum(np.maximum(net_dc_equiv, 0) * wirkungsgrad_elektrolyseur, leistung_elektrolyseur)
+    else:
+        elektrolyse_h2 = np.zeros_like(bz_el)
+
+    # Tankfüllstand mit Obergrenze: kumulierte Änderung, "gespiegelt" am vollen Tank (Elektrolyse wird abgeregelt,
+    # sobald der Tank voll ist). Der Tank startet voll.
+    delta_kwh = (elektrolyse_h2 - bz_el / eta_fc_el) * interval_h
+    cumulated = np.concatenate(([0], np.cumsum(delta_kwh)))
+    storage_content = tank_capacity_kwh + cumulated - np.maximum.accumulate(cumulated)
+
+    if np.min(storage_content) < 0:
+        raise ValueError("The tank is not sufficient to cover the demand during the backup supply simulation!")
+
+    # wie im LP: letzter Zeitschritt (Wiederholung des Starts) wird nicht betrachtet
+    bz_el = bz_el[:-1]
+    tank_fuellstand_kg = storage_content[:-2] / 33.3  # gleiche Umrechnung wie beim Auslesen der LP-Ergebnisse
+
+    return bz_el, tank_fuellstand_kg
+
+
+def _simulate_backup_supply_lp(week_ts, parsed_json, freq_in_min):
+    """
+    Simulation der Notstromversorgung als LP mit oemof/CBC.
+    :return: Leistung der Brennstoffzelle und Tankfüllstand (kg) zu jedem Zeitpunkt der 9 Tage
+    """
+
+    # From here on the script has huge similarities to the run_simulation function in the simulator.py file
+    # however we still "reimplement" the important parts here to keep the run_simulation function still readable...
+
+    # Baue das Energysystem auf und simuliere es mit einer "ausreichend großen Größe" für Brennstoffzelle und Tank.
+    # "ausreichend groß" = orientiert an einer absolut oberen Schranke, die sich u.a. aus den maximalen Verbrauchsspitzen ergibt.
+
     my_index = pd.date_range(start='2020-01-01',
                                  end='2020-01-10',
                                  inclusive='both',  # rechtsoffenes intervall
@@ -90,21 +249,9 @@ def _calculate_fc_power_and_tank_mass(parsed_json, file_path,
     # Initialize the time series for the producers of electricity and hydrogen...
     # (Attention, here we assume that we have no explicit other hydrogen producers, e.g. a steam reformer or so -
     # we assume these will also be affected by the power loss(?) TODO later check, as we never had such systems in our examples/use cases)
-    generator_dc_electricity_ts = parsed_json['dc_generators_all_ts'][jahreszeit.name]
-    generator_ac_electricity_ts = parsed_json['ac_generators_all_ts'][jahreszeit.name]
-
-    # ==================
-
-    consumed_ac_electricity_ts = parsed_json['ac_consumers_all_ts'][jahreszeit.name]
-    consumed_dc_electricity_ts = parsed_json['dc_consumers_all_ts'][jahreszeit.name]
-
-
-    # Verlängern die Zeitreihen auf 9 tage, indem wir die ersten 2 tage nochmal ranhängen (achtung, letzter Eintrag muss vorher rausgeschmissen werden "closed interval" (sonst doppelt)
-    num_steps = ((24 * 60 * 2) // freq_in_min) + 1 # +1 wegen closed interval des simulation time index wieder. unten dann tatsächlich nur bis num_steps, weil der index bei 0 beginnt
-    consumed_ac_electricity_ts = np.concatenate((consumed_ac_electricity_ts[:-1], consumed_ac_electricity_ts[:num_steps]))
-    consumed_dc_electricity_ts = np.concatenate((consumed_dc_electricity_ts[:-1], consumed_dc_electricity_ts[:num_steps]))
-    generator_ac_electricity_ts = np.concatenate((generator_ac_electricity_ts[:-1], generator_ac_electricity_ts[:num_steps]))
-    generator_dc_electricity_ts = np.concatenate((generator_dc_electricity_ts[:-1], generator_dc_electricity_ts[:num_steps]))
+    # Verlängern die Zeitreihen auf 9 tage (siehe _extend_week_to_nine_days)
+    generator_dc_electricity_ts, generator_ac_electricity_ts, consumed_ac_electricity_ts, consumed_dc_electricity_ts = \
+        _extend_week_to_nine_days(week_ts, freq_in_min)
 
     electricity_dc_generators = solph.components.Source(label='Electricity_DC_Generation_Ges', outputs={bel_dc: solph.Flow(
         fix=generator_dc_electricity_ts, nominal_value=1
@@ -143,14 +290,11 @@ def _calculate_fc_power_and_tank_mass(parsed_json, file_path,
     my_energysystem.add(create_simple_inverter(input_bus=bel_dc, output_bus=bel_ac, efficiency=inv_eff, label='Inverter_DC_AC'))
 
 
-    # calculate "upper bound" for the necessary fuel cell power output
-    # as we directly specify the output power, the only thing that needs to be scaled is the AC power (AC/DC conversion necessary)
-    # (fuel cell outputs DC energy)
-    consumption_dc_equiv_total_ts = ((consumed_ac_electricity_ts / inv_eff) + consumed_dc_electricity_ts)
-    fc_upper_bound_power = np.max(consumption_dc_equiv_total_ts)
-
     eta_fc_el = parsed_json["fuelcell"]["efficiency_electric"]
 
+    fc_upper_bound_power, m_tank_min = _backup_supply_upper_bounds(consumed_ac_electricity_ts, consumed_dc_electricity_ts,
+                                                                   inv_eff, eta_fc_el, freq_in_min)
+
     # add a bus acting as a penalty bottleneck to tell the optimizer that local consumption of e.g. PV is better than utilizing tank/fuel cell
     # furthermore (and this is even more important) to prevent the electrolyzer from directly utilizing the electricity from the fuel cell to produce H2 again with the electrolyzer (would be an energy-costly "loop").
     bel_penalty_dc = solph.buses.Bus(label='bel_penalty_dc')
@@ -169,11 +313,7 @@ def _calculate_fc_power_and_tank_mass(parsed_json, file_path,
                                                       outputs={bel_dc: solph.Flow()}))
 
     # Adding the tank.
-    # Max tank capacity depends on the consumers again; we can only ensure feasibility if we make the tank big enough to cover the full demand over the week (+2 days) alone
-    el_upper_bound_sum_kwh = np.sum(consumption_dc_equiv_total_ts) / (freq_in_min / 60)  # in kWh
-    kwhs_needed_tank = el_upper_bound_sum_kwh / eta_fc_el
-    m_tank_min = convert_kWh_to_kg_H2(kwhs_needed_tank)
-
+    # Max tank capacity: see _backup_supply_upper_bounds
     my_energysystem.add(create_h2_storage(bus_h2=bhydr_30, storage_capacity_in_kg=m_tank_min + 10, # incl. 10 kg reserve
                                           initial_storage_level=1.0)) # tank needs to start full
 
@@ -215,27 +355,6 @@ def _calculate_fc_power_and_tank_mass(parsed_json, file_path,
     SC = views.node(results, 'H2Tank')['sequences'][column_name]
     tank_fuellstand_kg = SC.values[:-2] / 33.3  # 33.3 kWh pro kg H2 # TODO dynamische eingabe -> evtl. die CONV_RATE_kWh_to_kg_H2 in der generators.py bzw. die Konvertierungsfunktionen da nutzen
 
-    if plot_fc_and_tank:
-        # Lets plot the bz_el and tank_fuellstand_kg in a diagram (separate y-axis for each.)
-        fig, ax1 = plt.subplots()
-
-        color = 'tab:red'
-        ax1.set_xlabel('time')
-        ax1.set_ylabel('Brennstoffzelle (kW)', color=color)
-        ax1.plot(bz_el, color=color)
-        ax1.tick_params(axis='y', labelcolor=color)
-
-        ax2 = ax1.twinx()
-        color = 'tab:blue'
-        ax2.set_ylabel('Tankfüllung (kg)', color=color)
-        ax2.plot(tank_fuellstand_kg, color=color)
-        ax2.tick_params(axis='y', labelcolor=color)
-
-        plt.show()
-
-        print("DONE")
-
-    # return Fuel Cell Power draw and the tank mass (starting from the calculated upper bound) at each timestep for the 9 days
     return bz_el, tank_fuellstand_kg
 
 
@@ -243,8 +362,6 @@ def _get_minimum_needed_parameter(bz_el, tank_fuellstand_kg, blackout_interval_d
     # todo here we might check if freq_in_min is a divisor of 24*60*7 and blackout_interval_duration_n_steps is also a valid value
 
     # collect the needed fuel cell power value and min tank mass for each possible starting timestep of the blackout:
-    fc_powers = []
-    tank_masses = []
 
     # Bestimmen für jeden Startzeitpunkt t0 (nur über die ersten 7 Tage nötig, danach redundant):
     # über den Zeitraum t0, t1 (je nach Input bis zu t1=t0+2Tage):
@@ -254,19 +371,50 @@ def _get_minimum_needed_parameter(bz_el, tank_fuellstand_kg, blackout_interval_d
     #       => Überlegung: die größtmögliche Differenz die sich zwischen einem lokalen Max (kann auch Start sein) und
     #       einem zeitlich DANACH folgendem lokalen Min ergibt, ist die minimal nötige Tankkapazität (siehe get_max_depth Funktion)
 
-    for interval_start in range(0, (24 * 60 * 7) // freq_in_min):
-        end = interval_start + blackout_interval_duration_n_steps  # closed interval, must have enough tank content etc. at the end of the interval/beginning of next
-        fc_power_max = np.max(bz_el[interval_start:end + 1])
-        tank_ts = tank_fuellstand_kg[interval_start:end + 1]
+    # Alle Fenster (eine Zeile je Startzeitpunkt) werden als View auf die Zeitreihen gebildet und auf einmal ausgewertet.
+    # closed interval, must have enough tank content etc. at the end of the interval/beginning of next
+    n_starts = (24 * 60 * 7) // freq_in_min
+    window_length = blackout_interval_duration_n_steps + 1
+    fc_windows = sliding_window_view(np.asarray(bz_el), window_length)[:n_starts]
+    tank_windows = sliding_window_view(np.asarray(tank_fuellstand_kg), window_length)[:n_starts]
 
-        max_tank_discharge_depth = get_max_depth(tank_ts)
+    fc_powers = np.max(fc_windows, axis=1)
+    tank_masses = get_max_depth(tank_windows)
 
-        fc_powers.append(fc_power_max)
-        tank_masses.append(max_tank_discharge_depth)
+    return list(fc_powers), list(tank_masses)
 
-    return fc_powers, tank_masses
 
-def blackout_check_multi_plot(file_path: str, scenario_name: str):
+def _get_minimum_needed_parameter_all_durations(bz_el, tank_fuellstand_kg, max_blackout_duration_n_steps: int,
+                                                freq_in_min: int) -> (np.ndarray, np.ndarray):
+    """
+    Vectorized variant of _get_minimum_needed_parameter for ALL blackout durations from 1 to
+    max_blackout_duration_n_steps intervals at once.
+
+    For every start, the window of the longest duration is taken (as a view on the time series). The needed fuel cell
+    power for all shorter durations is then the running maximum along the window, the needed tank mass the running
+    maximum of the drawdown (running maximum of the tank level minus the tank level) along the window. Thus, all
+    durations x starts are computed in one pass instead of one get_max_depth call per duration and start.
+
+    @return: 2-tuple of matrices (durations x starts), row i contains the values for a blackout duration of i+1
+        intervals (same values as _get_minimum_needed_parameter for this duration):
+        - the needed fuel cell power in kW
+        - the needed tank mass in kg
+    """
+    n_starts = (24 * 60 * 7) // freq_in_min
+    window_length = max_blackout_duration_n_steps + 1
+    fc_windows = sliding_window_view(np.asarray(bz_el), window_length)[:n_starts]
+    tank_windows = sliding_window_view(np.asarray(tank_fuellstand_kg), window_length)[:n_starts]
+
+    fc_power_matrix = np.maximum.accumulate(fc_windows, axis=1)
+
+    tank_drawdown = np.maximum.accumulate(tank_windows, axis=1) - tank_windows
+    tank_mass_matrix = np.maximum.accumulate(tank_drawdown, axis=1)
+
+    # column 0 corresponds to a "blackout" of duration 0 (only the starting point) -> not needed
+    return fc_power_matrix[:, 1:].T, tank_mass_matrix[:, 1:].T
+
+
+def blackout_check_multi_plot(file_path: str, scenario_name: str, method: Literal["numpy", "lp"] = "numpy"):
 
     """
     Runs the blackout check using the given JSON config file and plots the needed fuel cell power (kW) and tank mass (kg)
@@ -275,6 +423,7 @@ def blackout_check_multi_plot(file_path: str, scenario_name: str):
 
     @param file_path: The file path of the JSON config file to use for the simulation
     @param scenario_name:
+    @param method: "numpy" (direct simulation without solver) or "lp" (oemof/CBC), see _simulate_backup_supply
     @return: 2-tuple of:
         - a generated plotly figure showing the results (fuel cell power and tank mass needed to overcome a blackout of different durations) and
         - (a simplified) matplotlib plot, containing only the needed tank mass over the time (redundant, only for potential better visualization)
@@ -288,21 +437,14 @@ def blackout_check_multi_plot(file_path: str, scenario_name: str):
     # freq_in_min, 2*freq_in_min, ... 24*60*2
     list_of_all_durations = [freq_in_min * i for i in range(1, (24*60*2 // freq_in_min) + 1)]
 
-    list_of_needed_fc_power = []
-    list_of_needed_tank_mass = []
-
-    bz_el, tank_fuellstand_kg = _calculate_fc_power_and_tank_mass(parsed_json, file_path, freq_in_min)
+    bz_el, tank_fuellstand_kg = _calculate_fc_power_and_tank_mass(parsed_json, file_path, freq_in_min, method=method)
 
-    for duration in list_of_all_durations:
-        blackout_interval_duration_n_steps = duration // freq_in_min
-        fc_powers, tank_masses = _get_minimum_needed_parameter(bz_el, tank_fuellstand_kg,
-                                                               blackout_interval_duration_n_steps, freq_in_min)
+    # Needed parameters for all durations (rows) and all starting points (columns), maximum over the starting points
+    fc_power_matrix, tank_mass_matrix = _get_minimum_needed_parameter_all_durations(
+        bz_el, tank_fuellstand_kg, max_blackout_duration_n_steps=len(list_of_all_durations), freq_in_min=freq_in_min)
 
-        required_fc_power = np.max(fc_powers)
-        required_tank_mass = np.max(tank_masses)
-        list_of_needed_fc_power.append(required_fc_power)
-        list_of_needed_tank_mass.append(required_tank_mass)
-        print(duration)
+    list_of_needed_fc_power = list(np.max(fc_power_matrix, axis=1))
+    list_of_needed_tank_mass = list(np.max(tank_mass_matrix, axis=1))
 
     list_of_all_durations_in_h = [d / 60 for d in list_of_all_durations]
 
@@ -310,6 +452,7 @@ def blackout_check_multi_plot(file_path: str, scenario_name: str):
     # plot the fc_powers and tank_masses against the blackout duration. One plot for each; in the same figure.
     import plotly.express as px
     import plotly.graph_objects as go
+    from matplotlib import pyplot as plt
 
     fig = go.Figure()
 
@@ -349,11 +492,146 @@ def blackout_check_multi_plot(file_path: str, scenario_name: str):
     plt.ylabel("Nötige Masse an H2 [kg]")
     return fig, plt
 
-def blackout_check(blackout_duration_min: int, file_path: str):
+def _backup_supply_worker(task):
+    """
+    Worker für blackout_check_all_periods (muss auf Modulebene liegen, damit er an die Prozesse übergeben werden kann).
+    Simuliert die Notstromversorgung für einen Zeitraum und gibt für jede Dauer der Stromunterbrechung das Maximum
+    über alle Startzeitpunkte zurück.
+    """
+    period_name, week_ts, backup_parameters, freq_in_min, max_blackout_duration_n_steps, method = task
+
+    bz_el, tank_fuellstand_kg = _simulate_backup_supply(week_ts, backup_parameters, freq_in_min, method=method)
+    fc_power_matrix, tank_mass_matrix = _get_minimum_needed_parameter_all_durations(
+        bz_el, tank_fuellstand_kg, max_blackout_duration_n_steps=max_blackout_duration_n_steps, freq_in_min=freq_in_min)
+
+    return period_name, np.max(fc_power_matrix, axis=1), np.max(tank_mass_matrix, axis=1)
+
+
+def blackout_check_all_periods(file_path: str, include_real_weeks: bool = False, max_workers: int = None,
+                               method: Literal["numpy", "lp"] = "numpy") -> dict:
+    """
+    Runs the blackout check (see blackout_check_multi_plot) not only for the typical winter week, but for the typical
+    weeks of all seasons and - optionally - for every real week of the year. The simulations of the single periods are
+    independent of each other and are therefore run in parallel in a process pool.
+
+    The results are aggregated to worst-case envelopes: for each blackout duration the maximum of the needed fuel cell
+    power and tank mass over all periods (and all starting points within each period).
+
+    @param file_path: The file path of the JSON config file to use for the simulation
+    @param include_real_weeks: True: additionally simulate every complete (real) week of the calendar year, see
+        optimizer.prep_whole_year_time_series (only sensible if the config contains 'whole_year' time series).
+    @param max_workers: Number of worker processes (None: number of processors, 1: run serially without a pool)
+    @param method: "numpy" (direct simulation without solver) or "lp" (oemof/CBC), see _simulate_backup_supply.
+        With "numpy" the simulations are so cheap that they are always run serially.
+    @return: dict with
+        - 'durations_in_h': the considered blackout durations (base simulation interval up to two days)
+        - 'fc_power_per_period' / 'tank_mass_per_period': dict period name -> needed fuel cell power [kW] / tank mass
+          [kg] for each duration
+        - 'fc_power_envelope' / 'tank_mass_envelope': maximum over all periods for each duration
+        - 'fc_power_worst_period' / 'tank_mass_worst_period': name of the period defining the envelope for each duration
+    """
+
+    with open(file_path) as user_file:
+        parsed_json = json.load(user_file)
+
+    freq_in_min = parsed_json["base_sim_interval"]
+    max_blackout_duration_n_steps = (24 * 60 * 2) // freq_in_min
+
+    # the whole year time series are created first, as prep_sim_config_dict mutates the dict inplace
+    if include_real_weeks:
+        whole_year_ts = prep_whole_year_time_series(parsed_json, config_file_path=file_path)
+
+    prep_sim_config_dict(parsed_json=parsed_json, config_file_path=file_path)
+    backup_parameters = _backup_supply_parameters(parsed_json)
+
+    periods = {}
+    for jahreszeit in [Jahreszeit.SOMMER, Jahreszeit.UEBERGANG, Jahreszeit.WINTER]:
+        periods[jahreszeit.name] = {key: parsed_json[key][jahreszeit.name] for key in BACKUP_SUPPLY_TS_KEYS}
+
+    if include_real_weeks:
+        weeks_per_key = {key: helperFunctions.split_into_weeks(whole_year_ts[key], whole_year_ts['calendar'],
+                                                               parsed_json["sim_start_of_week"])
+                         for key in BACKUP_SUPPLY_TS_KEYS}
+        for week_idx, (week_start, _) in enumerate(weeks_per_key[BACKUP_SUPPLY_TS_KEYS[0]]):
+            periods[f"Woche ab {week_start:%Y-%m-%d}"] = {key: weeks_per_key[key][week_idx][1]
+                                                          for key in BACKUP_SUPPLY_TS_KEYS}
+
+    tasks = [(name, week_ts, backup_parameters, freq_in_min, max_blackout_duration_n_steps, method)
+             for name, week_ts in periods.items()]
+
+    if max_workers == 1 or method == "numpy":
+        period_results = [_backup_supply_worker(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            period_results = list(executor.map(_backup_supply_worker, tasks))
+
+    period_names = [name for name, _, _ in period_results]
+    fc_power_per_period = {name: fc_powers for name, fc_powers, _ in period_results}
+    tank_mass_per_period = {name: tank_masses for name, _, tank_masses in period_results}
+
+    fc_power_all = np.vstack(list(fc_power_per_period.values()))
+    tank_mass_all = np.vstack(list(tank_mass_per_period.values()))
+
+    return {
+        'durations_in_h': np.arange(1, max_blackout_duration_n_steps + 1) * freq_in_min / 60,
+        'fc_power_per_period': fc_power_per_period,
+        'tank_mass_per_period': tank_mass_per_period,
+        'fc_power_envelope': np.max(fc_power_all, axis=0),
+        'tank_mass_envelope': np.max(tank_mass_all, axis=0),
+        'fc_power_worst_period': [period_names[i] for i in np.argmax(fc_power_all, axis=0)],
+        'tank_mass_worst_period': [period_names[i] for i in np.argmax(tank_mass_all, axis=0)],
+    }
+
+
+def plot_blackout_envelope(results: dict, include_title=True):
+    """
+    Plots the worst-case envelopes of blackout_check_all_periods (needed fuel cell power and tank mass over the blackout
+    duration) together with the curves of the typical season weeks.
+
+    @param results: return value of blackout_check_all_periods
+    @param include_title: True/False: Whether to include a title in the plot or not.
+    @return: Plotly figure containing the plot.
+    """
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(x=results['durations_in_h'], y=results['fc_power_envelope'], mode='lines',
+                             name='Brennstoffzellenleistung [kW] (Maximum)', line=dict(color='red', width=3)))
+    fig.add_trace(go.Scatter(x=results['durations_in_h'], y=results['tank_mass_envelope'], mode='lines',
+                             name='Tankmasse [kg] (Maximum)', line=dict(color='blue', width=3)))
+
+    for jahreszeit in [Jahreszeit.SOMMER, Jahreszeit.UEBERGANG, Jahreszeit.WINTER]:
+        fig.add_trace(go.Scatter(x=results['durations_in_h'], y=results['fc_power_per_period'][jahreszeit.name],
+                                 mode='lines', name=f'Brennstoffzellenleistung [kW] ({jahreszeit.value})',
+                                 line=dict(color='red', dash='dot', width=1)))
+        fig.add_trace(go.Scatter(x=results['durations_in_h'], y=results['tank_mass_per_period'][jahreszeit.name],
+                                 mode='lines', name=f'Tankmasse [kg] ({jahreszeit.value})',
+                                 line=dict(color='blue', dash='dot', width=1)))
+
+    fig.update_layout(
+        title='Fuel Cell Power and Tank Mass needed to overcome a blackout of different durations '
+              f'(worst case over {len(results["fc_power_per_period"])} periods)' if include_title else None,
+        xaxis_title='Dauer der Stromunterbrechung [h]',
+        yaxis_title='Leistung [kW] / Masse [kg]',
+        template='plotly_white',
+        xaxis=dict(
+            tickmode='linear',
+            dtick=4),
+        font=dict(
+            size=12
+        )
+    )
+
+    return fig
+
+
+def blackout_check(blackout_duration_min: int, file_path: str, method: Literal["numpy", "lp"] = "numpy"):
     """
     For one given blackout duration, calculate the needed fuel cell power and tank mass to overcome the blackout.
     @param blackout_duration_min: The duration of the blackout in minutes. Must be a multiple of the base simulation interval.
     @param file_path: The file path of the JSON config file to use for the simulation
+    @param method: "numpy" (direct simulation without solver) or "lp" (oemof/CBC), see _simulate_backup_supply
     @return: A 2-tuple of:
         - a list of the Fuel Cell Power required to overcome the blackout at each possible starting point inside the week (one item in the list per starting point)
         - a list of the Tank Capacity required to overcome the blackout at each possible starting point inside the week (one item in the list per starting point)
@@ -376,7 +654,7 @@ def blackout_check(blackout_duration_min: int, file_path: str):
 
 
     # 2. Simulate the energy system and calculate the fuel cell power and the tank mass needed
-    bz_el, tank_fuellstand_kg = _calculate_fc_power_and_tank_mass(parsed_json, file_path, freq_in_min)
+    bz_el, tank_fuellstand_kg = _calculate_fc_power_and_tank_mass(parsed_json, file_path, freq_in_min, method=method)
 
 
     fc_powers, tank_masses = _get_minimum_needed_parameter(bz_el, tank_fuellstand_kg, blackout_interval_duration_n_steps, freq_in_min)
@@ -0,0 +1,391 @@
+'''
+
+Dauerhafter Prozesspool für wiederholte Optimierungen und Parameterstudien.
+
+Ein neuer Prozess muss zunächst oemof.solph, pyomo, pandas, plotly, pvlib und pymoo importieren (einige Sekunden) und die
+Konfiguration aufbereiten (Zeitreihen, PV, BDEW, Strompreise). Bei vielen kurzen Optimierungen (GUI, Skripte mit
+mehreren modes oder Studien) überwiegt dieser Aufwand. Dieses Modul hält daher:
+
+- einen Prozesspool (get_pool), dessen Prozesse einmal gestartet werden, die schweren Module importiert haben und über
+  alle Aufrufe hinweg bestehen bleiben (bis shutdown_pool bzw. zum Ende des Programms),
+- die zuletzt verwendeten aufbereiteten Konfigurationen (MAX_CACHED_CONFIGS) im gemeinsamen Speicher (siehe
+  shared_config.py). Der Schlüssel sind die Einträge in optimizer.PREPARATION_KEYS, der Ordner der Konfiguration sowie
+  Änderungszeit und Größe der referenzierten Dateien; geänderte CSV-Dateien werden also neu aufbereitet.
+
+Verwendung im selben Prozess: optimize (bspw. in Skripten), sweep.iter_evaluations nutzt den Pool ebenfalls.
+
+Verwendung über Prozessgrenzen (bspw. aus den Background-Callbacks der Dash GUI, die jeweils in einem neuen Prozess
+laufen): Der Pool wird als Dienst gestartet, der über einen Unix Socket (Windows: Named Pipe) erreichbar ist,
+
+    python -m h2pp.worker_pool [--max-workers N] [--address PFAD]
+
+und optimize_h2pp_via_service schickt die Optimierung an diesen Dienst (ohne laufenden Dienst: optimizer.optimize_h2pp
+im aufrufenden Prozess). Dienst und Aufrufer authentifizieren sich gegenseitig mit einem Schlüssel, bevor Anfragen
+entpickelt werden: dem Inhalt der Umgebungsvariable H2PP_POOL_AUTHKEY bzw., falls diese nicht gesetzt ist, einem
+zufälligen Schlüssel, den der Dienst beim Start in eine nur für den eigenen Benutzer lesbare Datei schreibt (Adresse mit
+Endung .key, unter Windows im temporären Ordner). Der Socket wird ebenfalls nur für den eigenen Benutzer angelegt.
+
+'''
+
+import argparse
+import atexit
+import contextlib
+import json
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import traceback
+import warnings
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import resource_tracker
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Literal, Tuple
+
+from h2pp import instrumentation
+from h2pp.optimizer import (PREPARATION_KEYS, optimize_h2pp, optimize_prepared, prepare_config, preparation_signature,
+                            referenced_files, result_figures, with_unprepared_entries)
+from h2pp.shared_config import SharedConfigHandle, attach_config, share_config
+
+# Anzahl der aufbereiteten Konfigurationen, die (über die gerade verwendeten hinaus) im gemeinsamen Speicher gehalten
+# werden
+MAX_CACHED_CONFIGS = 4
+
+_pool = None
+_pool_max_workers = None
+_lock = threading.RLock()
+
+# Schlüssel -> dict mit "preparation" (Future der aufbereiteten Konfiguration), "handle" (SharedConfigHandle, sobald
+# geteilt), "stack" (gibt den gemeinsamen Speicher frei) und "users" (Anzahl der laufenden Verwendungen)
+_cached_configs = OrderedDict()
+
+
+def default_address() -> str:
+    if sys.platform == "win32":
+        return r"\\.\pipe\h2pp_worker_pool"
+    return os.path.join(tempfile.gettempdir(), f"h2pp_worker_pool_{os.getuid()}.sock")
+
+
+def _authkey_path(address: str) -> str:
+    if sys.platform == "win32":
+        return os.path.join(tempfile.gettempdir(), os.path.basename(address) + ".key")
+    return address + ".key"
+
+
+def _authkey(address: str):
+    # Schlüssel aus H2PP_POOL_AUTHKEY bzw. der Schlüsseldatei des Dienstes (None: kein Dienst gestartet)
+    authkey = os.environ.get("H2PP_POOL_AUTHKEY")
+    if authkey:
+        return authkey.encode()
+
+    path = _authkey_path(address)
+    if not os.path.exists(path):
+        return None
+    if sys.platform != "win32":
+        stat = os.stat(path)
+        if stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+            raise ValueError(f"The key file {path} must belong to the current user and must not be accessible to "
+                             f"other users.")
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def _new_authkey(address: str) -> bytes:
+    # Schlüssel für den Dienst: H2PP_POOL_AUTHKEY bzw. ein neuer zufälliger Schlüssel in der Schlüsseldatei (nur für den
+    # eigenen Benutzer lesbar; O_EXCL, damit keine Datei eines anderen Benutzers verwendet wird)
+    authkey = os.environ.get("H2PP_POOL_AUTHKEY")
+    if authkey:
+        return authkey.encode()
+
+    path = _authkey_path(address)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(path)
+    authkey = secrets.token_bytes(32)
+    with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as file:
+        file.write(authkey)
+    return authkey
+
+
+def _warm_up():
+    # Initializer der Prozesse: h2pp.optimizer (und damit oemof.solph, pyomo, pandas) ist mit diesem Modul bereits
+    # importiert, sobald der Prozess die Funktion entpickelt hat. Der genetische Algorithmus, die Plots und die
+    # PVGIS-Abfrage importieren ihre Module erst bei Bedarf (siehe validierungs_skripte/importzeit.py); sie werden daher
+    # hier geladen, damit nicht die erste Aufgabe jedes Prozesses darauf wartet (zusammen etwa 2 s).
+    import pvlib
+    import plotly.graph_objects
+    import plotly.subplots
+    import pymoo.core.mixed
+    import pymoo.optimize
+    import requests.exceptions
+    import timezonefinder
+
+
+def get_pool(max_workers=None) -> ProcessPoolExecutor:
+    """
+    @param max_workers: Anzahl der Prozesse (Standard: Anzahl der CPUs); ein bestehender Pool mit einer anderen Anzahl
+        wird ersetzt
+    @return: den dauerhaften Prozesspool (wird beim ersten Aufruf gestartet)
+    """
+    global _pool, _pool_max_workers
+    if max_workers is None:
+        max_workers = os.cpu_count()
+
+    with _lock:
+        if _pool is not None and _pool_max_workers != max_workers:
+            _pool.shutdown(wait=True)
+            _pool = None
+        if _pool is None:
+            if sys.platform != "win32":
+                # Die Prozesse sollen den resource_tracker dieses Prozesses erben. Sonst startet jeder Prozess beim
+                # Einbinden des gemeinsamen Speichers einen eigenen, der den Speicher beim Ende des Prozesses löscht.
+                resource_tracker.ensure_running()
+            _pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_warm_up)
+            _pool_max_workers = max_workers
+            # Prozesse sofort starten (mit "spawn" werden sie sonst erst bei Bedarf gestartet)
+            for _ in range(max_workers):
+                _pool.submit(_warm_up)
+        return _pool
+
+
+def submit(fn, *args) -> Future:
+    """
+    Wie get_pool().submit, ersetzt aber einen defekten Pool (bspw. nach einem abgestürzten Prozess). Das Ergebnis des
+    Futures ist mit instrumentation.from_worker auszupacken.
+    """
+    global _pool
+    # Während einer Aufzeichnung (instrumentation.profile) schreibt jeder Prozess sein eigenes Profil, während einer
+    # Messung (instrumentation.collect) gibt er seine Timings mit dem Ergebnis zurück (siehe instrumentation.from_worker)
+    fn = instrumentation.in_worker(fn)
+    try:
+        return get_pool(_pool_max_workers).submit(fn, *args)
+    except BrokenProcessPool:
+        with _lock:
+            _pool = None
+        return get_pool(_pool_max_workers).submit(fn, *args)
+
+
+def shutdown_pool():
+    """
+    Beendet den Pool und gibt den gemeinsamen Speicher aller zwischengespeicherten Konfigurationen frei.
+    """
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+        while _cached_configs:
+            _cached_configs.popitem(last=False)[1]["stack"].close()
+
+
+atexit.register(shutdown_pool)
+
+
+def _cache_key(parsed_json: Dict, config_file_path: str) -> str:
+    config_dir = os.path.dirname(os.path.abspath(config_file_path))
+    files = referenced_files({key: parsed_json.get(key) for key in PREPARATION_KEYS}, config_dir)
+    return preparation_signature(parsed_json) + config_dir + json.dumps(files)
+
+
+def _acquire(parsed_json: Dict, config_file_path: str) -> str:
+    # Startet die Aufbereitung im Pool, falls die Konfiguration nicht zwischengespeichert ist
+    key = _cache_key(parsed_json, config_file_path)
+    with _lock:
+        if key not in _cached_configs:
+            _cached_configs[key] = {"preparation": submit(prepare_config, parsed_json, config_file_path),
+                                    "handle": None, "stack": contextlib.ExitStack(), "users": 0}
+        _cached_configs.move_to_end(key)
+        _cached_configs[key]["users"] += 1
+    return key
+
+
+def _handle(key: str) -> SharedConfigHandle:
+    # Wartet auf die Aufbereitung und teilt die Konfiguration (einmal je Schlüssel); Fehler der Aufbereitung werden
+    # weitergegeben und nicht zwischengespeichert
+    entry = _cached_configs[key]
+    try:
+        prepared_config = instrumentation.from_worker(entry["preparation"].result())
+    except Exception:
+        with _lock:
+            if _cached_configs.get(key) is entry:
+                del _cached_configs[key]
+        raise
+
+    with _lock:
+        if entry["handle"] is None:
+            entry["handle"] = entry["stack"].enter_context(share_config(prepared_config))
+        return entry["handle"]
+
+
+def _release(key: str):
+    with _lock:
+        if key in _cached_configs:
+            _cached_configs[key]["users"] -= 1
+        unused = [unused_key for unused_key, entry in _cached_configs.items() if entry["users"] == 0]
+        for unused_key in unused[:max(len(_cached_configs) - MAX_CACHED_CONFIGS, 0)]:
+            _cached_configs.pop(unused_key)["stack"].close()
+
+
+@contextlib.contextmanager
+def prepared_config_handles(configs: List[Tuple[Dict, str]], catch_errors=False):
+    """
+    Aufbereitete Konfigurationen im gemeinsamen Speicher, zwischengespeichert über Aufrufe hinweg. Die Aufbereitungen
+    laufen parallel im Pool.
+
+    @param configs: Liste von 2-Tupeln: nicht aufbereitete Konfiguration, Pfad ihrer JSON Datei
+    @param catch_errors: True, um statt einer fehlgeschlagenen Aufbereitung deren Traceback (str) zu liefern
+    @return: Kontextmanager, der eine Liste von SharedConfigHandle liefert; die Verweise sind bis zum Verlassen des
+        with-Blocks gültig
+    """
+    keys = []
+    try:
+        for parsed_json, config_file_path in configs:
+            keys.append(_acquire(parsed_json, config_file_path))
+
+        handles = []
+        for key in keys:
+            try:
+                handles.append(_handle(key))
+            except Exception:
+                if not catch_errors:
+                    raise
+                handles.append(traceback.format_exc())
+        yield handles
+    finally:
+        for key in keys:
+            _release(key)
+
+
+def _optimize_in_worker(task):
+    handle, parsed_json, mode, pop_size, n_gen, with_figures, kwargs = task
+    sim_config_dict = with_unprepared_entries(attach_config(handle), parsed_json)
+    eval_res, design = optimize_prepared(sim_config_dict, mode=mode, pop_size=pop_size, n_gen=n_gen,
+                                         print_progress=False, **kwargs)
+    return eval_res, design, result_figures(sim_config_dict, eval_res, design) if with_figures else None
+
+
+def optimize(parsed_json: Dict, config_file_path: str,
+             mode: Literal["normal", "battery_ref", "power_grid_only_ref"] = "normal", pop_size=50, n_gen=100,
+             with_figures=False, **kwargs) -> Tuple:
+    """
+    Optimierung wie optimizer.optimize_prepared in einem Prozess des Pools, mit zwischengespeicherter Aufbereitung.
+    Kann aus mehreren Threads gleichzeitig aufgerufen werden.
+
+    @param parsed_json: nicht aufbereitete Konfiguration (geparste JSON Datei)
+    @param config_file_path: Pfad der JSON Datei (für relative Pfadangaben)
+    @param with_figures: True, um auch die Plots zu erzeugen (siehe optimizer.result_figures)
+    @return: 3-Tupel: EvaluationResult, dict mit dem Entwurf und dict mit den Plots (bzw. None)
+    """
+    with prepared_config_handles([(parsed_json, config_file_path)]) as (handle,):
+        return instrumentation.from_worker(
+            submit(_optimize_in_worker, (handle, parsed_json, mode, pop_size, n_gen, with_figures, kwargs)).result())
+
+
+def _serve_connection(connection):
+    with connection:
+        while True:
+            try:
+                request = connection.recv()
+            except EOFError:
+                return
+            try:
+                connection.send(("ok", optimize(**request)))
+            except Exception:
+                connection.send(("error", traceback.format_exc()))
+
+
+def serve(address: str = None, max_workers=None):
+    """
+    Startet den Pool als Dienst (siehe Modulbeschreibung) und beantwortet Anfragen bis zum Abbruch (Strg+C). Jede
+    Verbindung wird in einem eigenen Thread bedient, Anfragen mehrerer Aufrufer laufen also parallel.
+    """
+    address = address or default_address()
+    if sys.platform != "win32" and os.path.exists(address):
+        # Socket eines beendeten Dienstes
+        authkey = _authkey(address)
+        with contextlib.suppress(OSError, AuthenticationError), Client(address, authkey=authkey):
+            raise ValueError(f"A worker pool is already listening on {address}.")
+        os.remove(address)
+
+    get_pool(max_workers)
+    authkey = _new_authkey(address)
+
+    # Socket nur für den eigenen Benutzer anlegen (umask vor dem Binden, damit er zu keinem Zeitpunkt für andere
+    # zugänglich ist)
+    previous_umask = os.umask(0o177) if sys.platform != "win32" else None
+    try:
+        listener = Listener(address, authkey=authkey)
+    finally:
+        if previous_umask is not None:
+            os.umask(previous_umask)
+
+    try:
+        with listener:
+            print(f"h2pp worker pool with {_pool_max_workers} processes listening on {address}")
+            while True:
+                try:
+                    connection = listener.accept()
+                except (AuthenticationError, EOFError, ConnectionError) as error:
+                    # Aufrufer ohne gültigen Schlüssel
+                    warnings.warn(f"Rejected connection to the worker pool: {error!r}")
+                    continue
+                threading.Thread(target=_serve_connection, args=(connection,), daemon=True).start()
+    finally:
+        if "H2PP_POOL_AUTHKEY" not in os.environ:
+            with contextlib.suppress(OSError):
+                os.remove(_authkey_path(address))
+
+
+def optimize_h2pp_via_service(config_file_full_path: str,
+                              mode: Literal["normal", "battery_ref", "power_grid_only_ref"] = "normal", pop_size=50,
+                              n_gen=100, address: str = None, **kwargs) -> Tuple:
+    """
+    Wie optimizer.optimize_h2pp (gleiche Parameter und Rückgabe), aber im Dienst (siehe serve), falls einer läuft;
+    sonst im aufrufenden Prozess.
+
+    @param address: Adresse des Dienstes (Standard: default_address())
+    """
+    with open(config_file_full_path) as user_file:
+        parsed_json = json.load(user_file)
+
+    address = address or default_address()
+    authkey = _authkey(address)
+    try:
+        # Ohne Schlüssel läuft kein Dienst
+        connection = Client(address, authkey=authkey) if authkey is not None else None
+    except (FileNotFoundError, ConnectionRefusedError):
+        connection = None
+    if connection is None:
+        return optimize_h2pp(config_file_full_path, mode=mode, pop_size=pop_size, n_gen=n_gen, **kwargs)
+
+    with connection:
+        connection.send(dict(parsed_json=parsed_json, config_file_path=os.path.abspath(config_file_full_path),
+                             mode=mode, pop_size=pop_size, n_gen=n_gen, with_figures=True, **kwargs))
+        status, result = connection.recv()
+    if status == "error":
+        raise RuntimeError(f"Optimization in the worker pool failed:\n{result}")
+
+    eval_res, _, figs = result
+    return eval_res.tco, figs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m h2pp.worker_pool",
+                                     description="Keeps a pool of worker processes with all heavy modules imported "
+                                                 "and recently prepared configs cached, and serves optimizations "
+                                                 "(see optimize_h2pp_via_service).")
+    parser.add_argument("--address", default=None, help=f"socket path or pipe name (default: {default_address()})")
+    parser.add_argument("--max-workers", type=int, default=None, help="number of processes (default: all CPUs)")
+    args = parser.parse_args(argv)
+
+    try:
+        serve(address=args.address, max_workers=args.max_workers)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import json
+import time
+
+import numpy as np
+
+from h2pp import helperFunctions
+from h2pp.dispatch import battery_dispatch_dp
+from h2pp.generators import Jahreszeit
+from h2pp.optimizer import prep_sim_config_dict
+from h2pp.simulation import run_simulation
+
+# Vergleich der Einsatzplanung der Batterie über dynamische Programmierung (diskretisierter Ladezustand) mit dem LP
+# (oemof/CBC) im Batterie-Referenzfall. Die Kosten der DP liegen durch die Diskretisierung etwas über dem LP-Optimum.
+
+file_path = "../MA_Fallbeispiele/Fallstudie Exemplarisches Industrieareal/config_microgrid.json"
+
+with open(file_path) as user_file:
+    parsed_json = json.load(user_file)
+
+prep_sim_config_dict(parsed_json=parsed_json, config_file_path=file_path)
+parsed_json.setdefault("battery", {"soc_min": 0.1, "soc_max": 0.9})
+
+capacities = [200., 1000., 5000.]
+
+
+def energiekosten(sim_results):
+    return sim_results["el_grid_source_total_cost_spot_price_only"] - sim_results["el_grid_sink_total_cost"]
+
+
+for jahreszeit in [Jahreszeit.SOMMER, Jahreszeit.UEBERGANG, Jahreszeit.WINTER]:
+    start = time.perf_counter()
+    results_dp = battery_dispatch_dp(parsed_json, jahreszeit, capacities)
+    dauer_dp = time.perf_counter() - start
+
+    for capacity, res_dp in zip(capacities, results_dp):
+        start = time.perf_counter()
+        res_lp = run_simulation(parsed_json, jahreszeit, c_battery=capacity)
+        dauer_lp = time.perf_counter() - start
+
+        deg_lp = helperFunctions.get_lfp_battery_percent_degradation(res_lp["battery_sequence_soc"])
+        deg_dp = helperFunctions.get_lfp_battery_percent_degradation(res_dp["battery_sequence_soc"])
+
+        print(f"{jahreszeit.name}, {capacity:.0f} kWh: Energiekosten LP {energiekosten(res_lp):.2f} €, "
+              f"DP {energiekosten(res_dp):.2f} €; Degradation LP {deg_lp:.2e}, DP {deg_dp:.2e}; "
+              f"max. Abweichung SOC {np.max(np.abs(res_lp['battery_sequence_soc'] - res_dp['battery_sequence_soc'])):.2f} "
+              f"(LP: {dauer_lp:.2f} s)")
+
+    print(f"{jahreszeit.name}: DP für {len(capacities)} Kapazitäten: {dauer_dp:.2f} s")
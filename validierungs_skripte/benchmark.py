@@ -0,0 +1,360 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Repository-Wurzel, damit das Skript ohne PYTHONPATH läuft
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_root)
+
+from h2pp import instrumentation
+from h2pp.generators import Jahreszeit
+from h2pp.optimizer import CapexParameters, OpexParameters, calculate_tco, eval_scenario, optimize_prepared, \
+    prep_sim_config_dict, prepare_config
+from h2pp.simulation import run_simulation
+from h2pp.technische_machbarkeit import blackout_check_multi_plot
+
+# Benchmarks für Aufbereitung, Simulation, Auswertung, GA, TCO und Notstromversorgung mit synthetischen Daten (werden
+# bei jedem Lauf in ein temporäres Verzeichnis geschrieben, keine Netzwerkzugriffe und keine BDEW-Datei nötig).
+#
+#   python validierungs_skripte/benchmark.py                     # alle Fälle, Vergleich mit benchmark_baseline.json
+#   python validierungs_skripte/benchmark.py --quick             # kleinere Auswahl (ca. 1 min)
+#   python validierungs_skripte/benchmark.py --output ergebnis.json
+#   python validierungs_skripte/benchmark.py --save-baseline     # aktuellen Lauf als Baseline speichern
+#   python validierungs_skripte/benchmark.py --solvers cbc glpk appsi_highs
+#
+# Je Fall wird das Minimum über die Wiederholungen mit der Baseline verglichen (das Minimum schwankt deutlich weniger als
+# der Median); langsamer als der Faktor --threshold und zugleich um mehr als --noise-floor Sekunden gilt als
+# Verschlechterung (Exit-Code 1, erst ab MIN_REPEATS_FOR_GATE Wiederholungen). Zusätzlich wird je Fall ein Ergebniswert
+# (NPV, Zielfunktion, ...) gespeichert, um Änderungen der Ergebnisse zu erkennen. Die Zeiten hängen vom Rechner ab; die Baseline ist daher nach
+# einem Rechnerwechsel mit --save-baseline neu zu erstellen. Je Fall werden außerdem die Schritte aus instrumentation.py
+# (Aufbereitung, Modellaufbau, Solver, ...) erfasst.
+#
+# Solver: Mit --solvers wird dasselbe LP (gleiche Konfiguration und Auslegung) mit jedem verfügbaren Solver gelöst
+# ("solver" in der Konfiguration, siehe run_simulation), nicht installierte Solver werden übersprungen.
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Faktor, ab dem ein Fall als langsamer gilt (Minimum gegenüber Baseline)
+THRESHOLD = 1.3
+
+# Absolute Differenz in s, unterhalb der ein Fall unabhängig vom Faktor nicht als langsamer bzw. schneller gilt (kurze
+# Fälle schwanken relativ stark)
+NOISE_FLOOR_S = 0.05
+
+# Mindestanzahl gemessener Läufe, ab der ein langsamerer Fall als Verschlechterung gilt (ein einzelner Lauf schwankt auf
+# einem ausgelasteten Rechner um 30 bis 70 %; mit weniger Läufen wird nur markiert)
+MIN_REPEATS_FOR_GATE = 3
+
+# Relative Abweichung, ab der ein Ergebniswert als verändert gilt
+RESULT_TOLERANCE = 1e-6
+
+SEASONS = [Jahreszeit.SOMMER, Jahreszeit.UEBERGANG, Jahreszeit.WINTER]
+
+# Auslegungen für die Simulation einzelner Wochen: Name -> Parameter von run_simulation
+TOPOLOGIES = {
+    "netz": {},
+    "batterie": {"c_battery": 2000.0},
+    "h2": {"p_el": 500.0, "p_fc": 150.0, "m_tank": 400.0},
+    "h2_verdichtet": {"p_el": 500.0, "p_fc": 150.0, "m_tank": 400.0, "compress_before_storing": True},
+}
+
+
+def write_synthetic_data(directory: str):
+    """
+    Schreibt reproduzierbare synthetische Eingangsdaten (feste Seeds): Börsenstrompreis im Format von netztransparenz.de
+    (stündlich), Jahreszeitreihen für PV und Last (15 min) und einen Tagesverlauf für den H2-Bedarf.
+    """
+    rng = np.random.default_rng(0)
+
+    hours = pd.date_range("2023-01-01", "2023-12-31 23:00", freq="h")
+    price_ct = (8 + 3 * np.sin(2 * np.pi * (hours.hour - 6) / 24) + 2 * np.cos(2 * np.pi * hours.dayofyear / 365)
+                + rng.normal(0, 1.5, len(hours)))
+    pd.DataFrame({
+        "Datum": hours.strftime("%d.%m.%Y"),
+        "von": hours.strftime("%H:%M"),
+        "Zeitzone von": "CET",
+        "bis": (hours + pd.Timedelta(hours=1)).strftime("%H:%M"),
+        "Zeitzone bis": "CET",
+        "Spotmarktpreis in ct/kWh": [f"{value:.3f}".replace(".", ",") for value in price_ct],
+    }).to_csv(os.path.join(directory, "strompreis.csv"), sep=";", index=False)
+
+    quarter_hours = pd.date_range("2023-01-01", "2023-12-31 23:45", freq="15min")
+    hour_of_day = quarter_hours.hour + quarter_hours.minute / 60
+    daylight = np.clip(np.sin(np.pi * (hour_of_day - 6) / 12), 0, None)
+    season = 0.6 + 0.4 * np.sin(2 * np.pi * (quarter_hours.dayofyear - 80) / 365)
+    pv = daylight * season * rng.uniform(0.5, 1.0, len(quarter_hours))
+    load = (0.6 + 0.3 * (quarter_hours.dayofweek < 5) * (hour_of_day > 7) * (hour_of_day < 18)
+            + rng.normal(0, 0.05, len(quarter_hours)))
+    for name, values in [("pv", pv), ("last", load)]:
+        pd.DataFrame({"datetime": quarter_hours, "value": values}).to_csv(os.path.join(directory, f"{name}.csv"),
+                                                                          index=False)
+
+    one_day = pd.date_range("2020-01-01", "2020-01-02", freq="15min", tz="UTC")
+    fcev = np.where((one_day.hour >= 7) & (one_day.hour < 19), rng.uniform(0, 5, len(one_day)), 0)
+    pd.DataFrame({"datetime": one_day, "value": fcev}).to_csv(os.path.join(directory, "fcev.csv"), index=False)
+
+
+def synthetic_config(n_components: int = 3, interval_in_min: int = 60) -> dict:
+    """
+    Konfiguration mit n_components Erzeugern und Verbrauchern (abwechselnd PV/konstant bzw. Last/H2/konstant, aus
+    Jahres- und Tageszeitreihen) und Grenzen für den GA.
+    """
+    generators = []
+    consumers = []
+    for i in range(n_components):
+        if i % 2 == 0:
+            kind = i // 2 % 3
+            if kind == 0:
+                consumers.append({"name": f"last_{i}", "energy_type": "electricity_ac", "calculation_type": "time_series",
+                                  "parameters": {"contains": "whole_year", "file_path": "last.csv"}})
+            elif kind == 1:
+                consumers.append({"name": f"fcev_{i}", "energy_type": "hydrogen", "calculation_type": "time_series",
+                                  "pressure": 700, "parameters": {"contains": "one_day", "file_path": "fcev.csv"}})
+            else:
+                consumers.append({"name": f"konstant_{i}", "energy_type": "electricity_dc",
+                                  "calculation_type": "constant_power", "parameters": {"power_value": 20}})
+        elif i // 2 % 2 == 0:
+            generators.append({"name": f"pv_{i}", "energy_type": "electricity_dc", "calculation_type": "time_series",
+                               "parameters": {"contains": "whole_year", "file_path": "pv.csv"}})
+        else:
+            generators.append({"name": f"konstant_{i}", "energy_type": "electricity_ac",
+                               "calculation_type": "constant_power", "parameters": {"power_value": 10}})
+
+    return {
+        "base_sim_interval": interval_in_min,
+        "inverter_efficiency": 0.95,
+        "h2_price_per_kg_350bar": 12.85,
+        "h2_price_per_kg_700bar": 13.85,
+        "heat_price_per_kWh": 0.16,
+        "sim_start_of_week": 2,
+        "spannungsebene": "MS",
+        "ort": "DTM",
+        "abzugbetrag_strom_in_ct": 0.184,
+        "kat_konzession": "TK",
+        "strompreis_csv": "strompreis.csv",
+        "aufschlag_strom_manuell_ct": 10,
+        "HRS_Compressor": {"throughput_kg_per_hour": 56, "hp_tank_capacity_kg": 56,
+                           "work_30_to_950_bar_in_kWh_per_kg": 8.0, "work_30_to_50_bar_in_kWh_per_kg": 0.7,
+                           "work_50_to_30_bar_in_kWh_per_kg": 0.3, "work_350_to_700_bar_in_kWh_per_kg": 2.0},
+        "electrolyzer": {"min_p": 100, "max_p": 2000, "efficiency": 0.625},
+        "fuelcell": {"min_p": 25, "max_p": 500, "efficiency_electric": 0.5, "efficiency_thermal": 0.3},
+        "tank": {"min_capacity": 100, "max_capacity": 2000, "compress_before_storing": False,
+                 "throughput_50bar_compressor_kg_per_hour": 550, "density_prop_factor_h2_50bar_to_30bar": 1.32,
+                 "balance_storage_level": True},
+        "battery": {"min_capacity": 100, "max_capacity": 10000, "soc_min": 0.1, "soc_max": 0.9},
+        "generators": generators,
+        "consumers": consumers,
+    }
+
+
+def measure(function, repeats: int) -> dict:
+    """
+    Führt function repeats-mal aus (nach einem nicht gemessenen Aufwärmlauf).
+
+    @return: dict mit den Dauern (min, Median, max in s), dem Ergebniswert des letzten Laufs (Rückgabe von function)
+        und den Schritten/Zählern aus instrumentation.py über alle gemessenen Läufe
+    """
+    function()
+    durations = []
+    with instrumentation.collect() as timings:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = function()
+            durations.append(time.perf_counter() - start)
+    summary = timings.summary()
+    return {"repeats": repeats, "min_s": min(durations), "median_s": statistics.median(durations),
+            "max_s": max(durations), "result": result, "stages": summary["stages"], "counters": summary["counters"]}
+
+
+def available_solvers(names) -> list:
+    from pyomo.opt import SolverFactory
+
+    available = []
+    for name in names:
+        try:
+            if SolverFactory(name).available(exception_flag=False):
+                available.append(name)
+                continue
+        except Exception:
+            pass
+        print(f"Solver {name} nicht verfügbar, wird übersprungen")
+    return available
+
+
+def benchmark_cases(directory: str, quick: bool, solvers) -> dict:
+    """
+    @return: dict Name des Falls -> Funktion ohne Parameter, die den Ergebniswert (float) zurückgibt
+    """
+    config_path = os.path.join(directory, "config.json")
+    cases = {}
+
+    # Aufbereitung: Anzahl Komponenten und Schrittweite
+    for n_components in ([3, 9] if quick else [3, 9, 27]):
+        for interval in ([15, 60] if quick else [1, 5, 15, 60]):
+            def prep(n_components=n_components, interval=interval):
+                config = synthetic_config(n_components, interval)
+                prep_sim_config_dict(config, config_path)
+                return float(config["jahresbedarf_abschaetzung_fuer_strompreis"])
+            cases[f"prep/{n_components}_komponenten/{interval}min"] = prep
+
+    prepared = {interval: prepare_config(synthetic_config(3, interval), config_path)
+                for interval in ([60] if quick else [15, 60])}
+
+    # Eine Woche je Jahreszeit und Auslegung (LP)
+    for interval, sim_config_dict in prepared.items():
+        for topology, design in TOPOLOGIES.items():
+            for season in SEASONS:
+                def simulation(sim_config_dict=sim_config_dict, season=season, design=design):
+                    sim_results = run_simulation(sim_config_dict, season, **design)
+                    return sim_results["solver_statistics"].objective
+                cases[f"run_simulation/{topology}/{season.name}/{interval}min"] = simulation
+
+        def evaluation(sim_config_dict=sim_config_dict):
+            return eval_scenario(500.0, 150.0, 400.0, False, None, sim_config_dict).tco.npv_total
+        cases[f"eval_scenario/h2/{interval}min"] = evaluation
+
+    # Kurzer GA (fester Seed, siehe optimize_prepared)
+    def ga():
+        eval_res, _ = optimize_prepared(prepared[60], mode="normal", pop_size=4, n_gen=2, print_progress=False)
+        return eval_res.tco.npv_total
+    cases["ga/pop_4_gen_2/60min"] = ga
+
+    def tco():
+        capex_params = CapexParameters(cost_data_identifier="STANDARD", p_el=500.0, p_fc=150.0, m_tank=400.0,
+                                       c_battery_refcase_only=None, m_tank_HP=56, battery_lifetime_years=None)
+        opex_params = OpexParameters(total_cost_electricity_buy=1e6, total_cost_h2_buy=1e5,
+                                     total_revenue_heat_sell=-1e4, total_revenue_electricity_sell=-1e4)
+        return calculate_tco(capex_params, {year: opex_params for year in range(2025, 2056)}).npv_total
+    cases["calculate_tco"] = tco
+
+    # Notstromversorgung (liest die Konfiguration aus der Datei)
+    blackout_config_path = os.path.join(directory, "config_blackout.json")
+    blackout_config = synthetic_config(3, 15)
+    blackout_config["electrolyzer"]["fixed_p"] = 500
+    blackout_config["fuelcell"]["fixed_p"] = 150
+    with open(blackout_config_path, "w") as file:
+        json.dump(blackout_config, file)
+
+    def blackout():
+        from matplotlib import pyplot as plt
+
+        fig, _ = blackout_check_multi_plot(blackout_config_path, "benchmark")
+        plt.close("all")
+        return float(max(fig.data[1].y))
+    cases["blackout_check_multi_plot/numpy/15min"] = blackout
+
+    # Dasselbe LP mit verschiedenen Solvern
+    for solver in solvers:
+        for topology in ["batterie", "h2"]:
+            def solve(solver=solver, topology=topology):
+                sim_results = run_simulation({**prepared[60], "solver": solver}, Jahreszeit.WINTER,
+                                             **TOPOLOGIES[topology])
+                return sim_results["solver_statistics"].objective
+            cases[f"solver/{solver}/{topology}/WINTER/60min"] = solve
+
+    return cases
+
+
+def compare(results: dict, baseline: dict, threshold: float, noise_floor_s: float = NOISE_FLOOR_S) -> bool:
+    """
+    Gibt je Fall die kürzeste Dauer im Vergleich zur Baseline aus.
+
+    @param noise_floor_s: Differenzen bis zu dieser Dauer in s gelten nicht als Änderung
+    @return: True, wenn ein Fall langsamer als threshold (um mehr als noise_floor_s und mit mindestens
+        MIN_REPEATS_FOR_GATE Läufen) oder sein Ergebniswert verändert ist
+    """
+    regression = False
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:55s} {result['min_s']:9.4f} s   (nicht in der Baseline)")
+            continue
+        reference = baseline[name]
+        ratio = result["min_s"] / reference["min_s"]
+        difference_s = result["min_s"] - reference["min_s"]
+        flags = []
+        if ratio > threshold and difference_s > noise_floor_s:
+            if result["repeats"] >= MIN_REPEATS_FOR_GATE:
+                flags.append("LANGSAMER")
+                regression = True
+            else:
+                flags.append(f"langsamer? (nur {result['repeats']} Lauf/Läufe)")
+        elif ratio < 1 / threshold and -difference_s > noise_floor_s:
+            flags.append("schneller")
+        if reference["result"] is not None and result["result"] is not None and \
+                abs(result["result"] - reference["result"]) > RESULT_TOLERANCE * max(1.0, abs(reference["result"])):
+            flags.append(f"ERGEBNIS {result['result']:.6g} statt {reference['result']:.6g}")
+            regression = True
+        print(f"{name:55s} {result['min_s']:9.4f} s   Baseline {reference['min_s']:9.4f} s   "
+              f"x{ratio:5.2f} {' '.join(flags)}")
+    return regression
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks mit synthetischen Daten")
+    parser.add_argument("--quick", action="store_true", help="kleinere Auswahl an Fällen")
+    parser.add_argument("--repeats", type=int, default=3, help="gemessene Läufe je Fall (Standard: 3)")
+    parser.add_argument("--filter", default="", help="nur Fälle, deren Name diesen Text enthält")
+    parser.add_argument("--solvers", nargs="*", default=["cbc"],
+                        help="Solver für den Vergleich auf identischen LPs (bspw. cbc glpk appsi_highs)")
+    parser.add_argument("--output", help="Ergebnisse als JSON in diese Datei schreiben")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline für den Vergleich")
+    parser.add_argument("--save-baseline", action="store_true", help="Ergebnisse als Baseline speichern")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"Faktor, ab dem ein Fall als langsamer gilt (Standard: {THRESHOLD})")
+    parser.add_argument("--noise-floor", type=float, default=NOISE_FLOOR_S,
+                        help=f"Differenz in s, unterhalb der ein Fall nicht als langsamer gilt (Standard: "
+                             f"{NOISE_FLOOR_S})")
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        write_synthetic_data(directory)
+        cases = benchmark_cases(directory, args.quick, available_solvers(args.solvers))
+        for name, function in cases.items():
+            if args.filter in name:
+                results[name] = measure(function, args.repeats)
+                print(f"{name:55s} {results[name]['min_s']:9.4f} s")
+
+    import oemof.solph
+    import pyomo
+    output = {
+        "meta": {"python": sys.version.split()[0], "platform": platform.platform(), "processor": platform.processor(),
+                 "cpu_count": os.cpu_count(), "oemof.solph": oemof.solph.__version__, "pyomo": pyomo.__version__,
+                 "quick": args.quick, "repeats": args.repeats},
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(output, file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(output, file, indent=2)
+        print(f"Baseline gespeichert: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"Keine Baseline unter {args.baseline} (erstellen mit --save-baseline)")
+        return
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    print(f"\nVergleich mit {args.baseline} ({baseline['meta']['platform']}, Python {baseline['meta']['python']}):")
+    if compare(results, baseline["results"], args.threshold, args.noise_floor):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import json
+import time
+
+from h2pp.optimizer import eval_scenario, prep_sim_config_dict
+from h2pp.rolling_horizon import run_full_year_rolling_horizon
+
+# Chronologische Jahressimulation mit rollierendem Horizont im Vergleich zur Bewertung über die typischen Wochen.
+# Die übernommenen Flüsse werden nach ganzjahr_rolling_horizon.csv geschrieben.
+
+file_path = "../MA_Fallbeispiele/Fallstudie Exemplarisches Industrieareal/config_microgrid.json"
+design = dict(p_el=228, p_fc=76.5, m_tank=520, compress_before_storing=False, c_battery=None)
+
+with open(file_path) as user_file:
+    parsed_json = json.load(user_file)
+prep_sim_config_dict(parsed_json=parsed_json, config_file_path=file_path)
+eval_typical_weeks = eval_scenario(sim_config_dict=parsed_json, **design)
+
+start = time.perf_counter()
+rh = run_full_year_rolling_horizon(file_path, window_days=7, overlap_days=2, max_workers=None, parallel_passes=2,
+                                   results_file="ganzjahr_rolling_horizon.csv", **design)
+dauer = time.perf_counter() - start
+
+eval_full_year = rh["evaluation"]
+print(f"Fenster: {rh['n_windows']}, davon im Konsistenzdurchlauf erneut gelöst: {rh['n_resolved_windows']} ({dauer:.0f} s)")
+print(f"Tankfüllstand Jahresbeginn / -ende: {rh['tank_level'][0]:.2f} / {rh['tank_level'][-1]:.2f}")
+for label, res in [("Typische Wochen", eval_typical_weeks), ("Ganzes Jahr", eval_full_year)]:
+    print(f"{label}: NPV {res.tco.npv_total:.0f} €, Jahresbezug {res.total_consumption_year_kwh:.0f} kWh, "
+          f"Spitzenlast {res.peak_power_year_kW:.1f} kW")
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+
+# Prüft die Importzeit des Auswertungspfads (h2pp.optimizer mit eval_scenario) in einem frischen Interpreter und dass
+# dabei keine Plot-, PVGIS/Geo- oder GA-Bibliotheken geladen werden (diese werden erst in den Funktionen importiert, die
+# sie benötigen). Beendet sich mit Exit-Code 1, wenn das Budget überschritten oder eines der Module geladen wird.
+
+# Budget in Sekunden (Minimum über mehrere Läufe; vor der Umstellung auf verzögerte Importe ca. 3 s, danach ca. 1,1 s)
+IMPORT_BUDGET_S = 2.0
+ANZAHL_LAEUFE = 3
+
+# Module, die beim Import des Auswertungspfads nicht geladen werden dürfen
+NICHT_ERLAUBT = ["matplotlib", "plotly.express", "kaleido", "scipy.signal", "scipy.stats", "pvlib", "timezonefinder",
+                 "pymoo.core.mixed", "pymoo.optimize", "h2pp.oemof_visio_energy_system_graph"]
+
+MESSUNG = f"""
+import sys, time
+start = time.perf_counter()
+from h2pp.optimizer import eval_scenario, prepare_config
+dauer = time.perf_counter() - start
+print(dauer)
+print(",".join(m for m in {NICHT_ERLAUBT!r} if m in sys.modules))
+"""
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+env = {**os.environ, "PYTHONPATH": repo_root + os.pathsep + os.environ.get("PYTHONPATH", "")}
+
+dauern = []
+for _ in range(ANZAHL_LAEUFE):
+    ausgabe = subprocess.run([sys.executable, "-c", MESSUNG], env=env, capture_output=True, text=True, check=True)
+    dauer, geladen = ausgabe.stdout.splitlines()
+    dauern.append(float(dauer))
+
+print(f"Import h2pp.optimizer: {min(dauern):.2f} s (Läufe: {', '.join(f'{d:.2f}' for d in dauern)}; "
+      f"Budget {IMPORT_BUDGET_S:.1f} s)")
+
+fehler = False
+if min(dauern) > IMPORT_BUDGET_S:
+    print(f"Importzeit überschreitet das Budget von {IMPORT_BUDGET_S:.1f} s!")
+    fehler = True
+if geladen:
+    print(f"Beim Import geladen, obwohl nur für Plots/PVGIS/GA benötigt: {geladen}")
+    fehler = True
+
+if fehler:
+    sys.exit(1)
+print("OK")
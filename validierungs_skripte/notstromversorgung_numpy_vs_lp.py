@@ -0,0 +1,54 @@
+import json
+import time
+
+import numpy as np
+
+from h2pp.optimizer import prep_sim_config_dict
+from h2pp.technische_machbarkeit import BACKUP_SUPPLY_TS_KEYS, _backup_supply_parameters, _simulate_backup_supply, \
+    _simulate_backup_supply_numpy
+
+# Vergleich der direkten Zeitschrittsimulation der Notstromversorgung mit dem LP (oemof/CBC)
+# Abweichungen in der Größenordnung der Solver-Toleranz sind zu erwarten.
+
+file_path = "../MA_Fallbeispiele/Fallstudie Exemplarisches Industrieareal/config_microgrid.json"
+
+with open(file_path) as user_file:
+    parsed_json = json.load(user_file)
+
+prep_sim_config_dict(parsed_json=parsed_json, config_file_path=file_path)
+freq_in_min = parsed_json["base_sim_interval"]
+backup_parameters = _backup_supply_parameters(parsed_json)
+
+for jahreszeit in ["SOMMER", "UEBERGANG", "WINTER"]:
+    week_ts = {key: parsed_json[key][jahreszeit] for key in BACKUP_SUPPLY_TS_KEYS}
+
+    start = time.perf_counter()
+    bz_el_lp, tank_lp = _simulate_backup_supply(week_ts, backup_parameters, freq_in_min, method="lp")
+    dauer_lp = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bz_el_np, tank_np = _simulate_backup_supply(week_ts, backup_parameters, freq_in_min, method="numpy")
+    dauer_np = time.perf_counter() - start
+
+    print(f"{jahreszeit}: max. Abweichung BZ-Leistung {np.max(np.abs(bz_el_lp - bz_el_np)):.2e} kW, "
+          f"Tankfüllstand {np.max(np.abs(tank_lp - tank_np)):.2e} kg "
+          f"(LP: {dauer_lp:.2f} s, numpy: {dauer_np * 1000:.2f} ms)")
+
+
+# Künstliche Woche mit deutlichen Überschüssen: das LP nutzt den Elektrolyseur hier nicht (der Wasserstoff hat im LP keinen
+# Wert, Überschüsse werden kostenlos über die Inverterverluste abgebaut), mit refill_tank=True wird der Tank nachgefüllt.
+n = (24 * 60 * 7) // freq_in_min + 1
+t = np.arange(n)
+week_ts = {'dc_generators_all_ts': np.maximum(0, 400 * np.sin((t % 96) / 96 * 2 * np.pi - 1.5)),
+           'ac_generators_all_ts': np.where(t % 200 < 30, 300., 0.),
+           'ac_consumers_all_ts': np.full(n, 120.),
+           'dc_consumers_all_ts': np.full(n, 50.)}
+
+bz_el_lp, tank_lp = _simulate_backup_supply(week_ts, backup_parameters, freq_in_min, method="lp")
+bz_el_np, tank_np = _simulate_backup_supply_numpy(week_ts, backup_parameters, freq_in_min, refill_tank=False)
+bz_el_refill, tank_refill = _simulate_backup_supply_numpy(week_ts, backup_parameters, freq_in_min, refill_tank=True)
+
+print(f"Überschuss-Woche: max. Abweichung BZ-Leistung {np.max(np.abs(bz_el_lp - bz_el_np)):.2e} kW, "
+      f"Tankfüllstand {np.max(np.abs(tank_lp - tank_np)):.2e} kg")
+print(f"Tankentnahme über 9 Tage ohne / mit Nachfüllen: {tank_np[0] - tank_np[-1]:.1f} kg / "
+      f"{tank_refill[0] - tank_refill[-1]:.1f} kg")